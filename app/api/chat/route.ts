@@ -12,6 +12,14 @@ export async function POST(req: NextRequest) {
       body: JSON.stringify(body),
     });
 
+    if (res.status === 429) {
+      const retryAfter = res.headers.get("retry-after") ?? "1";
+      return new Response(
+        JSON.stringify({ error: "Server busy", retryAfter: Number(retryAfter) }),
+        { status: 429, headers: { "Retry-After": retryAfter } }
+      );
+    }
+
     if (!res.ok || !res.body) {
       return new Response(
         JSON.stringify({ error: "Chat request failed" }),
@@ -24,6 +32,7 @@ export async function POST(req: NextRequest) {
         "Content-Type": "text/event-stream",
         "Cache-Control": "no-cache",
         Connection: "keep-alive",
+        "X-Run-Id": res.headers.get("x-run-id") ?? "",
       },
     });
   } catch {
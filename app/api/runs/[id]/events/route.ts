@@ -0,0 +1,39 @@
+import { NextRequest } from "next/server";
+
+const BACKEND_URL = process.env.BACKEND_URL || "http://localhost:8000";
+
+// Attach to a running (or just finished) chat run as an extra viewer.
+export async function GET(
+  req: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  try {
+    const { id } = await params;
+    const lastEventId = req.headers.get("last-event-id") ?? "";
+
+    const res = await fetch(
+      `${BACKEND_URL}/api/runs/${encodeURIComponent(id)}/events`,
+      { headers: lastEventId ? { "Last-Event-ID": lastEventId } : {} }
+    );
+
+    if (!res.ok || !res.body) {
+      return new Response(
+        JSON.stringify({ error: "Run not found" }),
+        { status: res.status }
+      );
+    }
+
+    return new Response(res.body, {
+      headers: {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        Connection: "keep-alive",
+      },
+    });
+  } catch {
+    return new Response(
+      JSON.stringify({ error: "Backend unavailable" }),
+      { status: 503 }
+    );
+  }
+}
@@ -0,0 +1,47 @@
+import { NextRequest } from "next/server";
+
+const BACKEND_URL = process.env.BACKEND_URL || "http://localhost:8000";
+
+// Stored session state; forwards If-None-Match and ?fields= so polling a
+// finished report costs a 304.
+export async function GET(
+  req: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  try {
+    const { id } = await params;
+    const fields = req.nextUrl.searchParams.get("fields");
+    const ifNoneMatch = req.headers.get("if-none-match");
+
+    const url = new URL(`${BACKEND_URL}/api/sessions/${encodeURIComponent(id)}`);
+    if (fields) url.searchParams.set("fields", fields);
+
+    const res = await fetch(url, {
+      headers: ifNoneMatch ? { "If-None-Match": ifNoneMatch } : {},
+      cache: "no-store",
+    });
+
+    const headers: Record<string, string> = { "Cache-Control": "no-cache" };
+    const etag = res.headers.get("etag");
+    if (etag) headers.ETag = etag;
+
+    if (res.status === 304) {
+      return new Response(null, { status: 304, headers });
+    }
+    if (!res.ok) {
+      return new Response(
+        JSON.stringify({ error: "Session request failed" }),
+        { status: res.status }
+      );
+    }
+
+    return new Response(res.body, {
+      headers: { ...headers, "Content-Type": "application/json" },
+    });
+  } catch {
+    return new Response(
+      JSON.stringify({ error: "Backend unavailable" }),
+      { status: 503 }
+    );
+  }
+}
@@ -0,0 +1,34 @@
+import { NextRequest } from "next/server";
+
+const BACKEND_URL = process.env.BACKEND_URL || "http://localhost:8000";
+
+// Status of the session's latest run, so a viewer can attach to it instead
+// of starting another turn.
+export async function GET(
+  _req: NextRequest,
+  { params }: { params: Promise<{ id: string }> }
+) {
+  try {
+    const { id } = await params;
+
+    const res = await fetch(
+      `${BACKEND_URL}/api/sessions/${encodeURIComponent(id)}/run`,
+      { cache: "no-store" }
+    );
+
+    if (!res.ok) {
+      return new Response(
+        JSON.stringify({ error: "No run for this session" }),
+        { status: res.status }
+      );
+    }
+
+    const data = await res.json();
+    return Response.json(data);
+  } catch {
+    return new Response(
+      JSON.stringify({ error: "Backend unavailable" }),
+      { status: 503 }
+    );
+  }
+}
@@ -3,18 +3,185 @@
 import { useEffect, useRef, useState } from "react";
 import { useSearchParams, useRouter } from "next/navigation";
 import { AgentResult, AGENTS } from "@/lib/agents";
+import { parseAgentResult } from "@/lib/agent-widget-config";
 import { ValidationDashboard } from "@/components/dashboard/validation-dashboard";
 
+// Only what the report renders; the backend skips serializing the rest.
+const SESSION_FIELDS = "agent_results,agent_timeouts,dispatched_agents";
+
+interface SessionReport {
+  agent_results?: Record<string, unknown>;
+  agent_timeouts?: Record<string, number>;
+  dispatched_agents?: string[];
+}
+
+function storedResult(agentId: string, stored: unknown): AgentResult {
+  const rawContent =
+    typeof stored === "string" ? stored : JSON.stringify(stored);
+  return {
+    agentId,
+    status: "done",
+    content: parseAgentResult(agentId, rawContent) ?? {
+      summary: rawContent.slice(0, 200),
+      bullets: [],
+      rawContent,
+    },
+  };
+}
+
+function resultsFromSession(doc: SessionReport): AgentResult[] {
+  const dispatched = new Set(doc.dispatched_agents ?? []);
+  return AGENTS.map((a): AgentResult => {
+    const stored = doc.agent_results?.[a.id];
+    if (stored !== undefined) return storedResult(a.id, stored);
+    const deadline = doc.agent_timeouts?.[a.id];
+    if (deadline !== undefined) {
+      return { agentId: a.id, status: "timeout", timeout: { deadline } };
+    }
+    return { agentId: a.id, status: dispatched.has(a.id) ? "loading" : "idle" };
+  });
+}
+
+// Calls onEvent(name, data) for each event of an SSE response body.
+async function readEvents(
+  res: Response,
+  onEvent: (name: string, data: Record<string, unknown>) => void
+) {
+  const reader = res.body!.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let currentEvent = "";
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop() ?? "";
+
+    for (const line of lines) {
+      if (line.startsWith("event: ")) {
+        currentEvent = line.slice(7).trim();
+      } else if (line.startsWith("data: ")) {
+        const raw = line.slice(6).trim();
+        if (!raw) continue;
+        try {
+          onEvent(currentEvent || "message", JSON.parse(raw));
+        } catch {
+          // Ignore parse errors in the stream
+        }
+        currentEvent = "";
+      }
+    }
+  }
+}
+
 export function ReportContent() {
   const searchParams = useSearchParams();
   const router = useRouter();
   const query = searchParams.get("q") ?? "";
+  const sessionId = searchParams.get("session");
+  // X-Run-Id of the turn that was running when the report was opened.
+  const runParam = searchParams.get("run");
 
   const [agentResults, setAgentResults] = useState<AgentResult[]>([]);
   const abortRef = useRef<AbortController | null>(null);
   const hasStarted = useRef(false);
+  const etagRef = useRef<string | null>(null);
+
+  // A report for a chat session: read the stored results, and if a turn is
+  // still running, follow it as an extra viewer instead of starting another.
+  useEffect(() => {
+    if (!sessionId) return;
+
+    const controller = new AbortController();
+    const { signal } = controller;
+
+    const loadSession = async () => {
+      const res = await fetch(
+        `/api/session/${encodeURIComponent(sessionId)}?fields=${SESSION_FIELDS}`,
+        {
+          headers: etagRef.current ? { "If-None-Match": etagRef.current } : {},
+          cache: "no-store",
+          signal,
+        }
+      );
+      if (res.status === 304) return;
+      if (!res.ok) throw new Error("Session request failed");
+      etagRef.current = res.headers.get("etag");
+      setAgentResults(resultsFromSession(await res.json()));
+    };
+
+    // False if the run is gone (replaced by a later turn).
+    const followRun = async (runId: string) => {
+      const res = await fetch(`/api/runs/${encodeURIComponent(runId)}/events`, {
+        signal,
+      });
+      if (!res.ok || !res.body) return false;
+      await readEvents(res, (name, data) => {
+        const agentId = data.agentId as string | undefined;
+        if (!agentId) return;
+        setAgentResults((prev) =>
+          prev.map((r): AgentResult => {
+            if (r.agentId !== agentId) return r;
+            switch (name) {
+              case "agent_start":
+                return { ...r, status: "loading" as const };
+              case "agent_result":
+                return storedResult(agentId, data.content);
+              case "agent_timeout":
+                return {
+                  ...r,
+                  status: "timeout" as const,
+                  timeout: { deadline: data.deadline as number },
+                };
+              default:
+                return r;
+            }
+          })
+        );
+      });
+      return true;
+    };
+
+    (async () => {
+      try {
+        await loadSession();
+        if (runParam && (await followRun(runParam))) {
+          await loadSession();
+          return;
+        }
+        const status = await fetch(
+          `/api/session/${encodeURIComponent(sessionId)}/run`,
+          { cache: "no-store", signal }
+        );
+        if (!status.ok) return;
+        const run = await status.json();
+        if (run.status !== "queued" && run.status !== "running") return;
+        await followRun(run.run_id);
+        // The stored results are the final word if the stream ended early.
+        await loadSession();
+      } catch (err: unknown) {
+        if (err instanceof Error && err.name !== "AbortError") {
+          setAgentResults((prev) =>
+            prev.map((r) =>
+              r.status === "loading"
+                ? { ...r, status: "error", error: "Analysis failed" }
+                : r
+            )
+          );
+        }
+      }
+    })();
+
+    return () => {
+      controller.abort();
+    };
+  }, [sessionId, runParam]);
 
   useEffect(() => {
+    if (sessionId) return;
     if (!query.trim() || query.trim().length < 5) {
       router.replace("/");
       return;
@@ -105,9 +272,9 @@ export function ReportContent() {
     return () => {
       controller.abort();
     };
-  }, [query, router]);
+  }, [query, router, sessionId]);
 
-  if (!query.trim()) return null;
+  if (!query.trim() && !sessionId) return null;
 
   return (
     <main className="relative min-h-screen bg-background">
@@ -0,0 +1,341 @@
+"""Per-specialist deadlines and hedged duplicate runs.
+
+One slow specialist used to hold the whole turn: the synthesis waited for
+every result and the SSE stream stayed open. agents.yaml now gives each
+agent a deadline, and can opt it into hedging:
+
+    defaults:
+      deadline: 90        # s a specialist run may take; null for no limit
+      hedge: false
+    agents:
+      competition:
+        deadline: 60
+        hedge: true
+
+When a run passes its deadline the turn goes on without it. The server
+emits ``agent_timeout``, and the synthesis is told which analysis is
+missing.
+
+With ``hedge``, once an agent has ``HEDGE_MIN_SAMPLES`` completed runs,
+a duplicate run starts if the first is still going after their p95. This
+only happens while the p95 is inside the deadline. The first run to finish
+wins. A failed duplicate is ignored. Hedging trades at most one extra run
+on the slowest ~5% of calls for a tail latency close to the p95.
+
+``latencies`` learns the per-agent run times (successful runs only) and
+counts hedges and timeouts for ``/api/metrics``. Direct dispatch enforces
+all this in ``main._run_specialist``, where the losing run is cancelled.
+In the default dispatch mode ``task_deadline_middleware`` wraps the
+orchestrator's ``task`` calls. Its runs are tagged in their stream
+metadata (``task_call_id``, ``hedge``) so the server streams widgets from
+the first run only and from neither once the call is settled. A sync run
+cannot be cancelled from outside its thread; a losing or timed-out one is
+stopped at its next step or token instead (``stopped`` in the metrics).
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from agents.stats import ms, percentile
+
+HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW = int(os.environ.get("HEDGE_WINDOW", "200"))
+
+
+def parse_deadline(value, where: str) -> float | None:
+    """A deadline in seconds from agents.yaml; None means no limit."""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise ValueError(f"{where}: expected a positive number of seconds or null, got {value!r}")
+    return float(value)
+
+
+class DeadlineExceeded(Exception):
+    """A specialist run passed its deadline."""
+
+
+class Abandoned(Exception):
+    """Raised inside a losing or timed-out run to stop it."""
+
+
+def timeout_message(label: str, deadline: float) -> str:
+    """What the orchestrator is told in place of a timed-out analysis."""
+    return (
+        f"The {label} specialist did not finish within its {deadline:g} s deadline. "
+        "Do not dispatch it again; synthesize from the other results and say "
+        "that this analysis is missing."
+    )
+
+
+class LatencyTracker:
+    """Per-agent run times, and the hedges and timeouts they led to."""
+
+    def __init__(self, window: int = HEDGE_WINDOW, min_samples: int = HEDGE_MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._runs: dict[str, deque] = defaultdict(lambda: deque(maxlen=window))
+        self._counts: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, agent: str, seconds: float, hedged: bool = False):
+        """A successful run; ``hedged`` when the duplicate finished first."""
+        with self._lock:
+            self._runs[agent].append(seconds)
+            if hedged:
+                self._counts[agent]["hedge_wins"] += 1
+
+    def hedge_delay(self, agent: str, deadline: float | None) -> float | None:
+        """When to start a duplicate run: the learned p95, if there are
+        enough samples and it falls inside the deadline."""
+        with self._lock:
+            runs = self._runs.get(agent)
+            if runs is None or len(runs) < self.min_samples:
+                return None
+            p95 = percentile(runs, 0.95)
+        return p95 if deadline is None or p95 < deadline else None
+
+    def hedged(self, agent: str):
+        with self._lock:
+            self._counts[agent]["hedges"] += 1
+
+    def timed_out(self, agent: str):
+        with self._lock:
+            self._counts[agent]["timeouts"] += 1
+
+    def stopped(self, agent: str):
+        """A losing or timed-out run stopped before it finished."""
+        with self._lock:
+            self._counts[agent]["stopped"] += 1
+
+    def info(self) -> dict:
+        with self._lock:
+            agents = {
+                agent: {
+                    "runs": len(runs),
+                    "p50_ms": ms(percentile(runs, 0.5)),
+                    "p95_ms": ms(percentile(runs, 0.95)),
+                }
+                for agent, runs in self._runs.items()
+            }
+            for agent, counts in self._counts.items():
+                agents.setdefault(agent, {"runs": 0}).update(counts)
+            return {"hedge_min_samples": self.min_samples, "agents": agents}
+
+
+latencies = LatencyTracker()
+
+
+@dataclass(frozen=True)
+class Outcome:
+    """The winning run's result, how long it took, and whether it was the duplicate."""
+
+    value: object
+    seconds: float
+    hedged: bool = False
+
+
+def _start(call: Callable[[], object], name: str) -> concurrent.futures.Future:
+    """Run ``call`` on a daemon thread, in a copy of the caller's context
+    (LangGraph keeps the run's config in a context variable)."""
+    future: concurrent.futures.Future = concurrent.futures.Future()
+    context = contextvars.copy_context()
+
+    def run():
+        try:
+            future.set_result(context.run(call))
+        except BaseException as exc:  # noqa: BLE001 — delivered to the waiter
+            future.set_exception(exc)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return future
+
+
+def _next_wait(now: float, end: float | None, hedge_at: float | None) -> float | None:
+    waits = [t for t in (end, hedge_at) if t is not None]
+    return max(0.0, min(waits) - now) if waits else None
+
+
+def race(
+    call: Callable[[bool], object],
+    deadline: float | None,
+    hedge_after: float | None = None,
+    on_hedge: Callable[[], None] | None = None,
+    name: str = "specialist",
+) -> Outcome:
+    """``call(False)`` within ``deadline`` s; ``call(True)`` is started
+    alongside it after ``hedge_after`` s.
+
+    Raises DeadlineExceeded at the deadline. A failure is raised only when no
+    other run is left to wait for. Runs still going when this returns are
+    left on their daemon threads, so ``call`` should stop itself once the
+    race is settled (``task_deadline_middleware`` does).
+    """
+    start = time.monotonic()
+    end = None if deadline is None else start + deadline
+    hedge_at = None if hedge_after is None else start + hedge_after
+    runs = {_start(lambda: call(False), name): (False, start)}
+    while True:
+        done, _ = concurrent.futures.wait(
+            runs, _next_wait(time.monotonic(), end, hedge_at), concurrent.futures.FIRST_COMPLETED
+        )
+        now = time.monotonic()
+        for future in done:
+            hedged, started = runs.pop(future)
+            if future.exception() is None:
+                return Outcome(future.result(), now - started, hedged)
+            if not runs:
+                raise future.exception()
+        if end is not None and now >= end:
+            raise DeadlineExceeded(f"{name} passed its {deadline:g} s deadline")
+        if hedge_at is not None and now >= hedge_at:
+            hedge_at = None
+            runs[_start(lambda: call(True), f"{name}-hedge")] = (True, now)
+            if on_hedge is not None:
+                on_hedge()
+
+
+async def arace(
+    call: Callable[[bool], Awaitable],
+    deadline: float | None,
+    hedge_after: float | None = None,
+    on_hedge: Callable[[], None] | None = None,
+) -> Outcome:
+    """``race`` for coroutines; losing and timed-out runs are cancelled."""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    end = None if deadline is None else start + deadline
+    hedge_at = None if hedge_after is None else start + hedge_after
+    runs = {asyncio.ensure_future(call(False)): (False, start)}
+    try:
+        while True:
+            done, _ = await asyncio.wait(
+                runs, timeout=_next_wait(loop.time(), end, hedge_at), return_when=asyncio.FIRST_COMPLETED
+            )
+            now = loop.time()
+            for task in done:
+                hedged, started = runs.pop(task)
+                if task.exception() is None:
+                    return Outcome(task.result(), now - started, hedged)
+                if not runs:
+                    raise task.exception()
+            if end is not None and now >= end:
+                raise DeadlineExceeded(f"passed the {deadline:g} s deadline")
+            if hedge_at is not None and now >= hedge_at:
+                hedge_at = None
+                runs[asyncio.ensure_future(call(True))] = (True, now)
+                if on_hedge is not None:
+                    on_hedge()
+    finally:
+        for task in runs:
+            task.cancel()
+
+
+def task_deadline_middleware(
+    agent_defs: list[dict],
+    labels: dict[str, str] | None = None,
+    tracker: LatencyTracker | None = None,
+):
+    """Orchestrator middleware enforcing each specialist's deadline (and
+    hedge) on its ``task`` calls.
+
+    A timed-out call comes back as an error ToolMessage that tells the
+    orchestrator to go on without it, with ``artifact["timeout"]`` for the
+    server.
+    """
+    from langchain.agents.middleware import AgentMiddleware
+    from langchain_core.callbacks import BaseCallbackHandler
+    from langchain_core.messages import ToolMessage
+
+    defs = {d["name"]: d for d in agent_defs}
+    labels = labels or {}
+    tracker = latencies if tracker is None else tracker
+
+    def plan(request) -> tuple[str, float | None, float | None] | None:
+        call = request.tool_call
+        agent_def = defs.get(call["args"].get("subagent_type", "")) if call["name"] == "task" else None
+        if agent_def is None:
+            return None
+        deadline = agent_def.get("deadline")
+        hedge_after = tracker.hedge_delay(agent_def["name"], deadline) if agent_def.get("hedge") else None
+        if deadline is None and hedge_after is None:
+            return None
+        return agent_def["name"], deadline, hedge_after
+
+    class StopWhenSettled(BaseCallbackHandler):
+        """Raises Abandoned at a run's next step or token once its race is settled."""
+
+        raise_error = True
+        run_inline = True
+
+        def __init__(self, agent: str, settled: threading.Event):
+            self.agent = agent
+            self.settled = settled
+            self.stopped = False
+
+        def check(self, *args, **kwargs):
+            if self.settled.is_set():
+                if not self.stopped:
+                    self.stopped = True
+                    tracker.stopped(self.agent)
+                raise Abandoned(self.agent)
+
+        on_chain_start = on_chat_model_start = on_llm_new_token = on_tool_start = check
+
+    def attempt(request, agent: str, hedged: bool, settled: threading.Event):
+        """``request`` with its run tagged for the server's stream filter and
+        stopped once ``settled`` is set."""
+        tool = request.tool.with_config(
+            metadata={"task_call_id": request.tool_call["id"], "hedge": hedged},
+            callbacks=[StopWhenSettled(agent, settled)],
+        )
+        return request.override(tool=tool)
+
+    def timed_out(request, agent: str, deadline: float) -> ToolMessage:
+        tracker.timed_out(agent)
+        return ToolMessage(
+            timeout_message(labels.get(agent, agent), deadline),
+            tool_call_id=request.tool_call["id"],
+            name="task",
+            status="error",
+            artifact={"timeout": {"deadline": deadline}},
+        )
+
+    class TaskDeadlines(AgentMiddleware):
+        def wrap_tool_call(self, request, handler):
+            guarded = plan(request)
+            if guarded is None:
+                return handler(request)
+            agent, deadline, hedge_after = guarded
+            settled = threading.Event()
+            try:
+                outcome = race(lambda hedged: handler(attempt(request, agent, hedged, settled)),
+                               deadline, hedge_after, on_hedge=lambda: tracker.hedged(agent), name=f"task-{agent}")
+            except DeadlineExceeded:
+                return timed_out(request, agent, deadline)
+            finally:
+                settled.set()
+            tracker.record(agent, outcome.seconds, outcome.hedged)
+            return outcome.value
+
+        async def awrap_tool_call(self, request, handler):
+            guarded = plan(request)
+            if guarded is None:
+                return await handler(request)
+            agent, deadline, hedge_after = guarded
+            settled = threading.Event()  # arace cancels the other runs itself
+            try:
+                outcome = await arace(lambda hedged: handler(attempt(request, agent, hedged, settled)),
+                                      deadline, hedge_after, on_hedge=lambda: tracker.hedged(agent))
+            except DeadlineExceeded:
+                return timed_out(request, agent, deadline)
+            tracker.record(agent, outcome.seconds, outcome.hedged)
+            return outcome.value
+
+    return TaskDeadlines()
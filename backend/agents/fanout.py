@@ -0,0 +1,155 @@
+"""Server-side ("direct") dispatch of the specialist agents.
+
+By default (``DISPATCH_MODE=llm``) the orchestrator decides when to dispatch
+and writes a ``task`` call, long ``description`` and all, for each of the six
+specialists before any of them starts: a whole serial LLM generation on the
+critical path. With ``DISPATCH_MODE=direct`` the orchestrator only converses
+and calls ``record_answers`` to say which questions are answered. The server
+starts each specialist itself, with the user's own messages as context, as
+soon as the required questions and the questions whose ``triggers_agents``
+name it are answered, and leaves it running in the background while the
+interview goes on. When the orchestrator marks the interview complete the
+rest are started, and once every result is in (or its specialist's
+deadline has passed) the orchestrator is handed all of them; its only
+remaining job is the synthesis.
+"""
+
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from agents.deadlines import timeout_message
+from agents.promptcache import prompt_cache_middleware
+from agents.providers import provider_guard_middleware
+from agents.registry import ConfigSnapshot, registry
+from agents.routing import chat_model
+from agents.widgetgen import PARALLEL, parallel_widget_graph, research_prompt
+
+if TYPE_CHECKING:
+    from langgraph.graph.state import CompiledStateGraph
+
+LLM = "llm"
+DIRECT = "direct"
+DISPATCH_MODE = os.environ.get("DISPATCH_MODE", LLM)
+
+# First line of the message that hands the specialist results to the orchestrator.
+RESULTS_HEADER = "[Specialist results]"
+
+
+def record_answers(question_ids: list[str], interview_complete: bool = False) -> str:
+    """Record which of the "Questions to Cover" the user has answered so far.
+
+    Call this after every user message with the ids of ALL answered questions
+    (not only the new ones), e.g. ["idea_core", "target_customer"]. Set
+    interview_complete to true once you have no more questions to ask.
+    """
+    return json.dumps({"recorded": sorted(set(question_ids)), "interview_complete": interview_complete})
+
+
+@dataclass(frozen=True)
+class AnswerRecord:
+    """What one ``record_answers`` call reported."""
+
+    question_ids: frozenset[str]
+    complete: bool = False
+
+
+def answer_record(message, config: ConfigSnapshot | None = None) -> AnswerRecord | None:
+    """Parse a ``record_answers`` tool message; None for any other message.
+
+    Ids that are not in questions.yaml are dropped.
+    """
+    if getattr(message, "name", "") != "record_answers":
+        return None
+    try:
+        data = json.loads(message.content)
+        ids = data["recorded"]
+    except (TypeError, ValueError, KeyError):
+        return None
+    known = {q["id"] for q in (config or registry.get()).questions_raw.get("questions", [])}
+    return AnswerRecord(frozenset(i for i in ids if i in known), bool(data.get("interview_complete")))
+
+
+def pending_specialists(
+    answered: set[str],
+    dispatched: set[str],
+    complete: bool = False,
+    config: ConfigSnapshot | None = None,
+) -> list[str]:
+    """Specialists to start now.
+
+    Nothing starts before every required question is answered. After that a
+    specialist starts once all questions that trigger it are answered, and
+    any still waiting start when the interview is complete.
+    """
+    config = config or registry.get()
+    if not config.required_questions <= answered:
+        return []
+    return [
+        aid for aid in config.agent_ids
+        if aid not in dispatched and (complete or config.agent_triggers[aid] <= answered)
+    ]
+
+
+def gather_context(messages: list[dict]) -> str:
+    """The specialists' brief: everything the user has said, in order."""
+    said = [m["content"] for m in messages if m["role"] == "user"]
+    return "Context from the founder, in their own words:\n\n" + "\n\n".join(
+        f"{i}. {text}" for i, text in enumerate(said, 1)
+    )
+
+
+def results_message(
+    results: dict[str, dict | str], labels: dict[str, str], timeouts: dict[str, float] | None = None
+) -> str:
+    """The orchestrator's synthesis prompt. ``timeouts`` are the specialists
+    given up on at their deadline (agents.deadlines)."""
+    parts = [RESULTS_HEADER]
+    for agent_id, result in results.items():
+        body = json.dumps(result) if isinstance(result, dict) else result
+        parts.append(f"## {labels.get(agent_id, agent_id)} ({agent_id})\n{body}")
+    for agent_id, deadline in (timeouts or {}).items():
+        label = labels.get(agent_id, agent_id)
+        parts.append(f"## {label} ({agent_id})\n{timeout_message(label, deadline)}")
+    return "\n\n".join(parts)
+
+
+_specialists: tuple[int, dict[str, "CompiledStateGraph"]] | None = None
+_specialists_lock = threading.Lock()
+
+
+def build_specialist(agent_def: dict) -> "CompiledStateGraph":
+    """One specialist's graph. With ``widget_mode: parallel`` the agent does
+    the research pass and its widgets are generated concurrently (agents.widgetgen)."""
+    from langchain.agents import create_agent
+
+    parallel = agent_def.get("widget_mode") == PARALLEL
+    model = chat_model(agent_def)
+    # name= tags every chunk with lc_agent_name, which WidgetStreamer keys on.
+    agent = create_agent(
+        model=model,
+        tools=agent_def["tools"],
+        system_prompt=research_prompt(agent_def["system_prompt"]) if parallel else agent_def["system_prompt"],
+        middleware=[provider_guard_middleware(), prompt_cache_middleware(agent_def["name"], tail=True)],
+        name=agent_def["name"],
+    )
+    return parallel_widget_graph(agent_def, agent, model) if parallel else agent
+
+
+def _build_specialists(config: ConfigSnapshot) -> dict[str, "CompiledStateGraph"]:
+    return {d["name"]: build_specialist(d) for d in config.subagent_defs}
+
+
+def get_specialists() -> dict[str, "CompiledStateGraph"]:
+    """One compiled graph per specialist, for the current config version."""
+    global _specialists
+    config = registry.get()
+    cached = _specialists
+    if cached is not None and cached[0] == config.version:
+        return cached[1]
+    with _specialists_lock:
+        if _specialists is None or _specialists[0] != config.version:
+            _specialists = (config.version, _build_specialists(config))
+        return _specialists[1]
@@ -0,0 +1,292 @@
+"""Bounded orchestrator history: compacted tool results and folded old turns.
+
+Every turn on a thread replays its whole checkpointed history into the
+orchestrator's next model call, specialist results (a few thousand tokens
+of JSON each) included. A session's input tokens and latency therefore
+grew with every turn. deepagents' own summarization only starts near the
+model's context window. ``history_middleware`` keeps each request within
+``HISTORY_TOKEN_BUDGET`` tokens (approximate; 0 disables it), in two steps,
+each taken only while the request is still over budget:
+
+1. Tool results of completed turns longer than ``HISTORY_RESULT_TOKENS``
+   are replaced by a reference: the analysis' own ``summary`` and where
+   its full result is kept. The direct-dispatch "[Specialist results]"
+   message is compacted the same way, per specialist.
+2. Turns before the last ``HISTORY_KEEP_TURNS`` are folded into one
+   summary message. It holds the context ledger of the founder's messages
+   (agents.ledger), the analyses already delivered and the orchestrator's
+   last reply among them, cut to ``HISTORY_EXCERPT_CHARS``.
+
+Only the model request is rewritten. The checkpointed thread keeps every
+message, and the specialist results stay fetchable from the session
+(``GET /api/sessions/{id}?fields=agent_results.<agent>``). The turn being
+answered is never touched, so a synthesis always sees the results it was
+asked about.
+
+``history_stats`` sums the tokens before and after compaction per thread
+until the server takes them at the end of the turn (the ``history`` SSE
+event), and in total for ``/api/metrics``.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+
+from agents.fanout import RESULTS_HEADER
+from agents.ledger import build_ledger, render_ledger
+from agents.registry import ConfigSnapshot, registry
+
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", "16000"))
+HISTORY_KEEP_TURNS = int(os.environ.get("HISTORY_KEEP_TURNS", "2"))
+HISTORY_RESULT_TOKENS = int(os.environ.get("HISTORY_RESULT_TOKENS", "400"))
+HISTORY_EXCERPT_CHARS = int(os.environ.get("HISTORY_EXCERPT_CHARS", "600"))
+
+SUMMARY_HEADER = "[Conversation summary]"
+_SUMMARY_FIELD = re.compile(r'"summary"\s*:\s*("(?:[^"\\]|\\.)*")')
+_RESULT_SECTION = re.compile(r"^## (.+) \((\w+)\)$", re.MULTILINE)
+
+
+def count_tokens(messages: list) -> int:
+    from langchain_core.messages.utils import count_tokens_approximately
+
+    return count_tokens_approximately(messages)
+
+
+def _text(content) -> str:
+    if isinstance(content, list):
+        return "".join(b.get("text", "") if isinstance(b, dict) else str(b) for b in content)
+    return content or ""
+
+
+def result_summary(text: str) -> str | None:
+    """The ``summary`` field of a specialist's JSON result, if it has one
+    (found even in fenced or truncated output)."""
+    match = _SUMMARY_FIELD.search(text)
+    if match is None:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+
+def result_reference(agent_id: str | None, label: str, text: str, tokens: int) -> str:
+    """What a compacted result is replaced by."""
+    where = (
+        f"the session's agent_results.{agent_id}" if agent_id
+        else "the checkpointed thread history"
+    )
+    summary = result_summary(text) or text[:HISTORY_EXCERPT_CHARS // 2].rstrip() + "…"
+    return f"[Compacted {label} result, {tokens} tokens; full text in {where}] {summary}"
+
+
+@dataclass(frozen=True)
+class Compaction:
+    """A request's messages after compaction, and what it saved."""
+
+    messages: list
+    tokens_before: int
+    tokens_after: int
+    compacted_results: int = 0
+    folded_messages: int = 0
+
+    @property
+    def saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def _turn_starts(messages: list) -> list[int]:
+    return [i for i, m in enumerate(messages) if getattr(m, "type", "") == "human"]
+
+
+def _task_agents(messages: list) -> dict[str, str]:
+    """tool_call_id -> subagent_type of every ``task`` call."""
+    return {
+        call["id"]: call["args"].get("subagent_type", "")
+        for m in messages
+        for call in getattr(m, "tool_calls", None) or []
+        if call.get("name") == "task"
+    }
+
+
+def _compact_results_message(message, labels: dict[str, str], limit: int):
+    """The direct-dispatch results message with each long section compacted."""
+    text = _text(message.content)
+    heads = list(_RESULT_SECTION.finditer(text))
+    if not heads:
+        return None
+    parts = [text[: heads[0].start()].rstrip()]
+    for head, after in zip(heads, heads[1:] + [None]):
+        body = text[head.end(): after.start() if after else len(text)].strip()
+        agent_id = head.group(2)
+        tokens = len(body) // 4
+        if tokens > limit:
+            body = result_reference(agent_id, labels.get(agent_id, agent_id), body, tokens)
+        parts.append(f"{head.group(0)}\n{body}")
+    return message.model_copy(update={"content": "\n\n".join(parts)})
+
+
+def _compact_results(messages: list, end: int, labels: dict[str, str], limit: int) -> tuple[list, int]:
+    """``messages`` with tool results before ``end`` over ``limit`` tokens compacted."""
+    agents = _task_agents(messages[:end])
+    out, compacted = list(messages), 0
+    for i, message in enumerate(messages[:end]):
+        kind = getattr(message, "type", "")
+        text = _text(message.content)
+        if len(text) // 4 <= limit or text.startswith("[Compacted"):
+            continue
+        if kind == "tool":
+            agent_id = agents.get(message.tool_call_id)
+            label = labels.get(agent_id, agent_id) if agent_id else (message.name or "tool")
+            reference = result_reference(agent_id, label, text, len(text) // 4)
+            out[i] = message.model_copy(update={"content": reference})
+        elif kind == "human" and text.startswith(RESULTS_HEADER):
+            replaced = _compact_results_message(message, labels, limit)
+            if replaced is None:
+                continue
+            out[i] = replaced
+        else:
+            continue
+        compacted += 1
+    return out, compacted
+
+
+def _summary_message(folded: list, config: ConfigSnapshot):
+    """One message standing in for the folded turns."""
+    from langchain_core.messages import HumanMessage
+
+    founder = [m for m in folded if not _text(getattr(m, "content", "")).startswith((RESULTS_HEADER, SUMMARY_HEADER))]
+    parts = [f"{SUMMARY_HEADER} Earlier turns were compacted; the full history is kept on the server."]
+    entries = build_ledger(founder, config)
+    if entries:
+        parts.append(render_ledger(entries, config))
+    dispatched = set(_task_agents(folded).values()) | {
+        head.group(2) for m in folded if m not in founder for head in _RESULT_SECTION.finditer(_text(m.content))
+    }
+    delivered = [config.agent_labels[a] for a in config.agent_ids if a in dispatched]
+    if delivered:
+        parts.append(f"Analyses already delivered: {', '.join(delivered)}.")
+    replies = [m for m in folded if getattr(m, "type", "") == "ai" and _text(m.content).strip()]
+    if replies:
+        reply = _text(replies[-1].content).strip()
+        if len(reply) > HISTORY_EXCERPT_CHARS:
+            reply = reply[:HISTORY_EXCERPT_CHARS].rstrip() + "…"
+        parts.append(f"Your last reply in those turns:\n{reply}")
+    return HumanMessage("\n\n".join(parts))
+
+
+def compact_history(
+    messages: list,
+    budget: int = HISTORY_TOKEN_BUDGET,
+    keep_turns: int = HISTORY_KEEP_TURNS,
+    result_tokens: int = HISTORY_RESULT_TOKENS,
+    config: ConfigSnapshot | None = None,
+) -> Compaction:
+    """``messages`` brought under ``budget`` tokens where the policy allows."""
+    before = count_tokens(messages)
+    if budget <= 0 or before <= budget:
+        return Compaction(messages, before, before)
+    config = config or registry.get()
+    turns = _turn_starts(messages)
+    # Results of the turn being answered are left alone.
+    current = turns[-1] if turns else len(messages)
+    compacted_messages, compacted = _compact_results(messages, current, config.agent_labels, result_tokens)
+    after = count_tokens(compacted_messages)
+    folded = 0
+    keep_turns = max(1, keep_turns)
+    if after > budget and len(turns) > keep_turns and turns[-keep_turns] > 0:
+        folded = turns[-keep_turns]
+        compacted_messages = [_summary_message(messages[:folded], config), *compacted_messages[folded:]]
+        after = count_tokens(compacted_messages)
+    return Compaction(compacted_messages, before, after, compacted, folded)
+
+
+@dataclass
+class _Savings:
+    calls: int = 0
+    compacted_calls: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+    compacted_results: int = 0
+    folded_messages: int = 0
+
+    def add(self, c: Compaction):
+        self.calls += 1
+        self.compacted_calls += c.saved > 0
+        self.tokens_before += c.tokens_before
+        self.tokens_after += c.tokens_after
+        self.compacted_results += c.compacted_results
+        self.folded_messages += c.folded_messages
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "saved": self.tokens_before - self.tokens_after}
+
+
+class HistoryStats:
+    """Compaction savings per thread (until taken) and in total."""
+
+    def __init__(self, max_threads: int = 1024):
+        self.max_threads = max_threads
+        self._total = _Savings()
+        self._pending: OrderedDict[str, _Savings] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, thread_id: str | None, compaction: Compaction):
+        with self._lock:
+            self._total.add(compaction)
+            if thread_id is None:
+                return
+            self._pending.setdefault(thread_id, _Savings()).add(compaction)
+            self._pending.move_to_end(thread_id)
+            while len(self._pending) > self.max_threads:
+                self._pending.popitem(last=False)
+
+    def take(self, thread_id: str) -> dict | None:
+        """The thread's savings since the last ``take``; None if nothing was compacted."""
+        with self._lock:
+            savings = self._pending.pop(thread_id, None)
+        return savings.to_dict() if savings is not None and savings.compacted_calls else None
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"budget": HISTORY_TOKEN_BUDGET, "keep_turns": HISTORY_KEEP_TURNS, **self._total.to_dict()}
+
+
+history_stats = HistoryStats()
+
+
+def _thread_id() -> str | None:
+    from langgraph.config import get_config
+
+    try:
+        return (get_config().get("configurable") or {}).get("thread_id")
+    except RuntimeError:  # called outside a graph run
+        return None
+
+
+def history_middleware(
+    config: ConfigSnapshot | None = None,
+    budget: int | None = None,
+    stats: HistoryStats | None = None,
+):
+    """Orchestrator middleware keeping each model request within ``budget``
+    (``HISTORY_TOKEN_BUDGET`` when None)."""
+    from langchain.agents.middleware import AgentMiddleware
+
+    def prepare(request):
+        limit = HISTORY_TOKEN_BUDGET if budget is None else budget
+        compaction = compact_history(request.messages, limit, HISTORY_KEEP_TURNS, HISTORY_RESULT_TOKENS, config)
+        (history_stats if stats is None else stats).record(_thread_id(), compaction)
+        return request.override(messages=compaction.messages) if compaction.saved > 0 else request
+
+    class BoundedHistory(AgentMiddleware):
+        def wrap_model_call(self, request, handler):
+            return handler(prepare(request))
+
+        async def awrap_model_call(self, request, handler):
+            return await handler(prepare(request))
+
+    return BoundedHistory()
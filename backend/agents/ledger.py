@@ -0,0 +1,133 @@
+"""Context ledger: the founder's answers, keyed by questions.yaml ids.
+
+The orchestrator used to restate the whole interview as the ``description``
+of every ``task`` call, "FULL context" for each of six specialists. That
+is six serial rewrites of the same text in output tokens before any
+specialist could start. Now the orchestrator calls ``record_answers``
+after every user message, in both dispatch modes. Its task descriptions
+are a short instruction: what to focus on, plus anything it concluded
+that the founder did not say.
+
+The ledger is derived from the orchestrator's own message history on
+every dispatch, so it needs no extra state and survives checkpoints. Each
+founder message is keyed by the question ids first recorded after it;
+messages that answered nothing new are kept as additional context.
+``context_ledger_middleware`` appends the rendered ledger to each task's
+description before the subagent and the deadline see it. The result cache
+keys the dispatch on ``dispatch_context``: the brief and the founder's
+words, without the ledger's boilerplate.
+"""
+
+from dataclasses import dataclass, field
+
+from agents.registry import ConfigSnapshot, registry
+
+LEDGER_HEADER = "[Context ledger]"
+
+
+@dataclass
+class LedgerEntry:
+    """One founder message and the questions it was the first to answer."""
+
+    text: str
+    question_ids: list[str] = field(default_factory=list)
+
+
+def _role(message) -> str:
+    if isinstance(message, dict):
+        return message.get("role") or message.get("type", "")
+    return getattr(message, "type", "")
+
+
+def _text(message) -> str:
+    content = message.get("content") if isinstance(message, dict) else getattr(message, "content", "")
+    if isinstance(content, list):
+        content = "".join(b.get("text", "") if isinstance(b, dict) else str(b) for b in content)
+    return content or ""
+
+
+def build_ledger(messages: list, config: ConfigSnapshot | None = None) -> list[LedgerEntry]:
+    """The founder's messages in order, each with the questions it answered.
+
+    A question is credited to the latest founder message before the
+    ``record_answers`` call that first lists it. Unknown ids are dropped.
+    """
+    config = config or registry.get()
+    known = [q["id"] for q in config.questions_raw.get("questions", [])]
+    entries: list[LedgerEntry] = []
+    recorded: set[str] = set()
+    for message in messages:
+        role = _role(message)
+        if role in ("human", "user"):
+            entries.append(LedgerEntry(_text(message)))
+        elif role == "ai" and entries:
+            calls = message.get("tool_calls") if isinstance(message, dict) else getattr(message, "tool_calls", None)
+            for call in calls or []:
+                if call.get("name") != "record_answers":
+                    continue
+                ids = set(call.get("args", {}).get("question_ids") or []) - recorded
+                entries[-1].question_ids += [q for q in known if q in ids]
+                recorded |= ids
+    return entries
+
+
+def render_ledger(entries: list[LedgerEntry], config: ConfigSnapshot | None = None) -> str:
+    """The ledger as the block appended to a specialist's brief."""
+    config = config or registry.get()
+    prompts = {q["id"]: q["prompt"] for q in config.questions_raw.get("questions", [])}
+    parts = [f"{LEDGER_HEADER} The founder's own words, keyed by the interview questions they answer."]
+    for entry in entries:
+        if entry.question_ids:
+            asked = "\n".join(f"Q ({qid}): {prompts[qid]}" for qid in entry.question_ids)
+            parts.append(f"### {', '.join(entry.question_ids)}\n{asked}\n\n{entry.text}")
+        else:
+            parts.append(f"### Additional context\n{entry.text}")
+    return "\n\n".join(parts)
+
+
+def expand_description(description: str, messages: list, config: ConfigSnapshot | None = None) -> str:
+    """``description`` followed by the ledger of ``messages``; unchanged if
+    there are no founder messages or the ledger is already attached."""
+    entries = build_ledger(messages, config)
+    if not entries or LEDGER_HEADER in description:
+        return description
+    return f"{description.strip()}\n\n{render_ledger(entries, config)}"
+
+
+def dispatch_context(description: str, messages: list, config: ConfigSnapshot | None = None) -> str:
+    """What a task dispatch is cached and matched under (agents.resultcache):
+    the orchestrator's own brief and the founder's messages.
+
+    The ledger's headings and question prompts are left out. They are the
+    same in every dispatch, and with short answers they would make two
+    unrelated ideas look like near-duplicates.
+    """
+    brief = description.split(LEDGER_HEADER, 1)[0].strip()
+    return "\n\n".join([brief, *(entry.text for entry in build_ledger(messages, config))])
+
+
+def context_ledger_middleware(config: ConfigSnapshot | None = None):
+    """Orchestrator middleware appending the context ledger to every ``task``
+    call's description."""
+    from langchain.agents.middleware import AgentMiddleware
+
+    def expand(request):
+        call = request.tool_call
+        if call["name"] != "task":
+            return request
+        state = request.state
+        messages = state.get("messages", []) if isinstance(state, dict) else getattr(state, "messages", [])
+        description = call["args"].get("description", "")
+        expanded = expand_description(description, messages, config)
+        if expanded == description:
+            return request
+        return request.override(tool_call={**call, "args": {**call["args"], "description": expanded}})
+
+    class ContextLedger(AgentMiddleware):
+        def wrap_tool_call(self, request, handler):
+            return handler(expand(request))
+
+        async def awrap_tool_call(self, request, handler):
+            return await handler(expand(request))
+
+    return ContextLedger()
@@ -0,0 +1,199 @@
+"""Near-duplicate lookup of past dispatch contexts (MinHash + LSH, offline).
+
+Founders resubmit the same idea with trivial wording changes ("an AI tool
+for freelancers" / "an AI-powered tool for freelancers"), which the exact
+result cache keys apart. ``NearDuplicateIndex`` finds a previous context
+whose estimated Jaccard similarity is at least ``NEAR_DUP_THRESHOLD`` so
+its cached analysis can be reused.
+
+Reuse is off unless ``NEAR_DUP_THRESHOLD`` is set: a reworded idea may
+differ in what matters, and only direct dispatch can rerun the specialist
+behind a reused analysis (``NEAR_DUP_REFRESH``).
+
+- Contexts are lowercased, stripped of punctuation and cut into character
+  5-gram shingles, so a changed word only touches a handful of shingles.
+- Signatures use one-permutation MinHash: each shingle is hashed once and
+  lands in one of ``NUM_PERM`` bins, keeping the minimum per bin, instead
+  of ``NUM_PERM`` separate hash functions. Empty bins (short texts) borrow
+  from the next non-empty bin. Signing costs one blake2b call per shingle.
+- Signatures are split into ``BANDS`` bands; contexts that agree on a whole
+  band share a bucket. A query only compares against the entries in its
+  buckets, so lookup cost does not grow with the index size. With 8 bands
+  of 8 rows, pairs at 0.9 similarity collide with ~99% probability and
+  pairs at 0.5 with ~3%.
+
+Entries are scoped (the caller uses agent id + definition fingerprint) and
+capped at ``NEAR_DUP_MAX_ENTRIES`` per scope, oldest first. An entry
+costs about 1 KB including its bucket slots (benchmarks/bench_neardup.py).
+"""
+
+import hashlib
+import os
+import re
+import threading
+from array import array
+from dataclasses import dataclass
+
+NEAR_DUP_THRESHOLD = float(os.environ.get("NEAR_DUP_THRESHOLD", "0"))
+NEAR_DUP_REFRESH = os.environ.get("NEAR_DUP_REFRESH", "0").lower() in ("1", "true", "yes")
+NEAR_DUP_MAX_ENTRIES = int(os.environ.get("NEAR_DUP_MAX_ENTRIES", "200000"))
+
+NUM_PERM = 64
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+SHINGLE = 5
+
+_MASK32 = 0xFFFFFFFF
+_EMPTY = _MASK32 + 1
+_PUNCT = re.compile(r"[^\w\s]+")
+_WS = re.compile(r"\s+")
+
+
+def shingles(text: str, k: int = SHINGLE) -> set[str]:
+    text = _WS.sub(" ", _PUNCT.sub(" ", text.lower())).strip()
+    if len(text) <= k:
+        return {text} if text else set()
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def signature(text: str) -> array:
+    """One-permutation MinHash signature of ``text`` (NUM_PERM x uint32)."""
+    bins = [_EMPTY] * NUM_PERM
+    for sh in shingles(text):
+        h = int.from_bytes(hashlib.blake2b(sh.encode(), digest_size=8).digest(), "little")
+        b = h % NUM_PERM
+        v = h >> 32
+        if v < bins[b]:
+            bins[b] = v
+    if _EMPTY in bins:
+        if all(v == _EMPTY for v in bins):
+            return array("I", [0] * NUM_PERM)
+        # Rotation densification: an empty bin takes the next non-empty one
+        # (circularly), offset by the distance so borrowed values stay distinct.
+        filled = list(bins)
+        for i in range(NUM_PERM):
+            j, dist = i, 0
+            while bins[j] == _EMPTY:
+                j = (j + 1) % NUM_PERM
+                dist += 1
+            filled[i] = (bins[j] + dist * 0x9E3779B1) & _MASK32
+        bins = filled
+    return array("I", bins)
+
+
+def similarity(a: array, b: array) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def _band_keys(sig: array) -> list[int]:
+    return [hash(tuple(sig[i * ROWS:(i + 1) * ROWS])) for i in range(BANDS)]
+
+
+@dataclass(frozen=True)
+class Match:
+    key: str
+    similarity: float
+
+
+class _Scope:
+    __slots__ = ("entries", "by_key", "buckets", "next_id")
+
+    def __init__(self):
+        self.entries: dict[int, tuple[array, str]] = {}  # insertion order = age
+        self.by_key: dict[str, int] = {}
+        self.buckets: list[dict[int, int | list[int]]] = [{} for _ in range(BANDS)]
+        self.next_id = 0
+
+
+class NearDuplicateIndex:
+    """Per-scope LSH index from context signatures to result-cache keys."""
+
+    def __init__(self, threshold: float = NEAR_DUP_THRESHOLD, max_entries: int = NEAR_DUP_MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.stats = {"queries": 0, "matches": 0, "candidates": 0}
+        self._scopes: dict[str, _Scope] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return 0 < self.threshold <= 1
+
+    def add(self, scope: str, context: str, key: str):
+        """Index ``context`` as the context that produced cache entry ``key``."""
+        if not self.enabled:
+            return
+        sig = signature(context)
+        with self._lock:
+            s = self._scopes.setdefault(scope, _Scope())
+            if key in s.by_key:
+                return
+            entry_id = s.next_id
+            s.next_id += 1
+            s.entries[entry_id] = (sig, key)
+            s.by_key[key] = entry_id
+            for band, bk in zip(s.buckets, _band_keys(sig)):
+                held = band.get(bk)
+                if held is None:
+                    band[bk] = entry_id
+                elif isinstance(held, list):
+                    held.append(entry_id)
+                else:
+                    band[bk] = [held, entry_id]
+            while len(s.entries) > self.max_entries:
+                self._remove(s, next(iter(s.entries)))
+
+    def query(self, scope: str, context: str) -> list[Match]:
+        """Indexed contexts at or above the threshold, most similar first."""
+        if not self.enabled:
+            return []
+        sig = signature(context)
+        with self._lock:
+            self.stats["queries"] += 1
+            s = self._scopes.get(scope)
+            if s is None:
+                return []
+            candidates: set[int] = set()
+            for band, bk in zip(s.buckets, _band_keys(sig)):
+                held = band.get(bk)
+                if held is None:
+                    continue
+                candidates.update(held if isinstance(held, list) else (held,))
+            self.stats["candidates"] += len(candidates)
+            matches = []
+            for entry_id in candidates:
+                other, key = s.entries[entry_id]
+                sim = similarity(sig, other)
+                if sim >= self.threshold:
+                    matches.append(Match(key, sim))
+        if matches:
+            self.stats["matches"] += 1
+        return sorted(matches, key=lambda m: -m.similarity)
+
+    def discard(self, scope: str, key: str):
+        """Forget ``key`` (e.g. its cache entry expired)."""
+        with self._lock:
+            s = self._scopes.get(scope)
+            entry_id = s.by_key.get(key) if s else None
+            if entry_id is not None:
+                self._remove(s, entry_id)
+
+    def __len__(self) -> int:
+        return sum(len(s.entries) for s in self._scopes.values())
+
+    def info(self) -> dict:
+        return {"threshold": self.threshold, "entries": len(self), **self.stats}
+
+    @staticmethod
+    def _remove(s: _Scope, entry_id: int):
+        sig, key = s.entries.pop(entry_id)
+        del s.by_key[key]
+        for band, bk in zip(s.buckets, _band_keys(sig)):
+            held = band.get(bk)
+            if isinstance(held, list):
+                held.remove(entry_id)
+                if len(held) == 1:
+                    band[bk] = held[0]
+            elif held == entry_id:
+                del band[bk]
@@ -1,71 +1,151 @@
-"""Orchestrator agent — conversational Q&A that dispatches to specialist subagents."""
+"""Orchestrator agent — conversational Q&A that dispatches to specialist subagents.
+
+Compiling the deep-agent graph (prompts, subagent defs, tools, middleware)
+takes around a second. ``OrchestratorTemplate`` does it once per config
+version, without a checkpointer; ``create_orchestrator`` then binds a copy
+of that graph to the caller's checkpointer, which takes well under a
+millisecond, so new sessions and CLI resets start instantly.
+
+With ``DISPATCH_MODE=direct`` the template is built without the specialist
+subagents (agents.fanout) or the ``task`` middleware. The orchestrator's
+middleware, in order:
+
+- agents.ledger appends the founder's recorded answers to ``task`` calls.
+- agents.resultcache serves repeated ``task`` calls from the result cache.
+- agents.deadlines bounds ``task`` calls by the specialist's deadline.
+- agents.history keeps each request within a token budget.
+- agents.providers rate-limits, retries and breaks calls per provider.
+- agents.promptcache caches the static system prompt with Anthropic.
+
+Specialists may run on a routed model tier (agents.routing) and generate
+their widgets concurrently (agents.widgetgen).
+"""
+
+import threading
+import time
+from functools import partial
+from typing import TYPE_CHECKING
+
+from agents.deadlines import task_deadline_middleware
+from agents.fanout import DIRECT, DISPATCH_MODE, build_specialist, record_answers
+from agents.history import history_middleware
+from agents.ledger import context_ledger_middleware, dispatch_context
+from agents.promptcache import prompt_cache_middleware
+from agents.providers import init_model, provider_guard_middleware
+from agents.registry import ConfigSnapshot, registry
+from agents.resultcache import task_cache_middleware
+from agents.routing import chat_model
+from agents.specialist import build_subagent_defs
+from agents.tools import resolve_tools
+from agents.widgetgen import PARALLEL
 
-from pathlib import Path
+# deepagents/langgraph (and through them langchain + anthropic) take over a
+# second to import; they are loaded when the first template is compiled.
+# For the same reason each ``*_middleware`` factory defines its
+# ``AgentMiddleware`` subclass when called, not at import time.
+if TYPE_CHECKING:
+    from langgraph.checkpoint.memory import MemorySaver
+    from langgraph.graph.state import CompiledStateGraph
 
-import yaml
-from deepagents import create_deep_agent
-from langgraph.checkpoint.memory import MemorySaver
 
-from agents.specialist import build_subagent_defs, get_agent_labels
-from agents.tools import resolve_tools
+class OrchestratorTemplate:
+    """The orchestrator graph compiled for one config version.
 
-QUESTIONS_PATH = Path(__file__).parent.parent / "config" / "questions.yaml"
+    The compiled graph is never handed out; ``bind`` returns a copy with its
+    own checkpointer, so the template stays immutable and shareable.
+    """
 
+    def __init__(self, config: ConfigSnapshot, mode: str = DISPATCH_MODE):
+        from deepagents import create_deep_agent
+
+        self.version = config.version
+        self.mode = mode
+        direct = mode == DIRECT
+        t0 = time.perf_counter()
+        self._graph = create_deep_agent(
+            name="orchestrator",
+            model=init_model(config.orchestrator_model),
+            system_prompt=config.direct_orchestrator_prompt if direct else config.orchestrator_prompt,
+            tools=resolve_tools(["web_search"]) + [record_answers],
+            subagents=[] if direct else _subagent_specs(build_subagent_defs()),
+            # Direct dispatch checks the result cache itself (main._run_specialist).
+            # Listed last, so the breakpoint sees the system prompt deepagents built.
+            middleware=([] if direct else [
+                # Outermost, so the subagent sees the full brief.
+                context_ledger_middleware(config),
+                task_cache_middleware(build_subagent_defs(), context=partial(dispatch_context, config=config)),
+                # Inside the cache, so a hit is never timed out or hedged.
+                task_deadline_middleware(build_subagent_defs(), config.agent_labels),
+            ])
+            + [
+                history_middleware(config),
+                provider_guard_middleware(),
+                prompt_cache_middleware("orchestrator"),
+            ],
+        )
+        self.build_seconds = time.perf_counter() - t0
 
-def _load_questions_config() -> dict:
-    with open(QUESTIONS_PATH) as f:
-        return yaml.safe_load(f)
+    def bind(self, checkpointer: "MemorySaver | None" = None) -> "CompiledStateGraph":
+        """A ready-to-run orchestrator using ``checkpointer`` (a new one if None)."""
+        if checkpointer is None:
+            from langgraph.checkpoint.memory import MemorySaver
 
+            checkpointer = MemorySaver()
+        return self._graph.copy({"checkpointer": checkpointer})
 
-def _build_orchestrator_prompt(config: dict) -> str:
-    """Combine the base orchestrator prompt with question definitions."""
-    base_prompt = config["orchestrator"]["system_prompt"].strip()
-    questions = config.get("questions", [])
-    agent_labels = get_agent_labels()
 
-    question_block = "\n## Questions to Cover\n\n"
-    for q in questions:
-        required = " (REQUIRED)" if q.get("required") else " (optional)"
-        agents = q.get("triggers_agents", [])
-        agent_names = ", ".join(agent_labels.get(a, a) for a in agents) if agents else "none yet"
-        question_block += (
-            f"- **{q['id']}**{required}: {q['prompt']}\n"
-            f"  Triggers: {agent_names}\n"
-        )
+# Parts of a subagent def that the server enforces; deepagents never sees them.
+_SERVER_KEYS = ("route", "deadline", "hedge", "widget_mode")
 
-    agent_block = "\n## Available Specialist Agents\n\n"
-    for aid, label in agent_labels.items():
-        agent_block += f"- `{aid}`: {label}\n"
 
-    agent_block += (
-        "\nWhen dispatching agents, use the task tool. Provide each agent with "
-        "the FULL context gathered so far. You can dispatch multiple agents in parallel.\n"
-    )
+def _subagent_specs(subagent_defs: list[dict]) -> list[dict]:
+    """deepagents subagent specs: the routed model, the provider guard and the
+    system prompt-cache breakpoint (deepagents already marks the last message).
+    Agents generating widgets in parallel are passed as compiled graphs."""
+    return [
+        {"name": d["name"], "description": d["description"], "runnable": build_specialist(d)}
+        if d.get("widget_mode") == PARALLEL else {
+            **{k: v for k, v in d.items() if k not in _SERVER_KEYS},
+            "model": chat_model(d),
+            "middleware": [
+                *d.get("middleware", []),
+                provider_guard_middleware(),
+                prompt_cache_middleware(d["name"]),
+            ],
+        }
+        for d in subagent_defs
+    ]
 
-    return base_prompt + question_block + agent_block
 
+_templates: dict[str, OrchestratorTemplate] = {}
+_template_lock = threading.Lock()
 
-def create_orchestrator(checkpointer: MemorySaver | None = None):
-    """Create the orchestrator Deep Agent with specialist subagents.
 
-    Returns a compiled LangGraph that can be invoked or streamed.
-    """
-    config = _load_questions_config()
-    system_prompt = _build_orchestrator_prompt(config)
-    subagent_defs = build_subagent_defs()
+def get_template(mode: str = DISPATCH_MODE) -> OrchestratorTemplate:
+    """The template for the current config version, compiling it if needed."""
+    config = registry.get()
+    template = _templates.get(mode)
+    if template is not None and template.version == config.version:
+        return template
+    with _template_lock:
+        template = _templates.get(mode)
+        if template is None or template.version != config.version:
+            template = _templates[mode] = OrchestratorTemplate(config, mode)
+        return template
 
-    model = config["orchestrator"].get("model", "claude-haiku-4-5-20251001")
 
-    if checkpointer is None:
-        checkpointer = MemorySaver()
+def warmup(mode: str = DISPATCH_MODE) -> OrchestratorTemplate:
+    """Compile the template ahead of the first session; returns it so callers
+    can report ``build_seconds``."""
+    return get_template(mode)
 
-    agent = create_deep_agent(
-        name="orchestrator",
-        model=model,
-        system_prompt=system_prompt,
-        tools=resolve_tools(["web_search"]),
-        subagents=subagent_defs,
-        checkpointer=checkpointer,
-    )
 
-    return agent
+def create_orchestrator(checkpointer: "MemorySaver | None" = None, mode: str = DISPATCH_MODE):
+    """Create the orchestrator Deep Agent with specialist subagents.
+
+    ``mode`` is ``"llm"`` (the orchestrator dispatches via the task tool) or
+    ``"direct"`` (the caller dispatches, see agents.fanout); it defaults to
+    ``DISPATCH_MODE``. Returns a compiled LangGraph that can be invoked or
+    streamed.
+    """
+    return get_template(mode).bind(checkpointer)
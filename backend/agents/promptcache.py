@@ -0,0 +1,228 @@
+"""Anthropic prompt-cache breakpoints on the static system prompts.
+
+Every orchestrator turn resends the same prompt (tool schemas, the
+orchestrator prompt with its question and agent blocks, deepagents' own
+instructions), and every specialist call resends its agents.yaml prompt
+with its JSON contract. Anthropic caches a request prefix up to a block
+marked with ``cache_control``, but only at positions that were marked
+when the prefix was written. deepagents marks the last message, which
+moves every turn. A new session, or a specialist given a new brief,
+therefore never finds the shared prefix in the cache.
+
+``prompt_cache_middleware`` marks the last block of the system prompt.
+It is added innermost, after deepagents' middleware has appended its
+instructions, so the breakpoint covers tools + the complete system prompt:
+one write per agent definition per ``PROMPT_CACHE_TTL``, then cache reads
+for every call of every session. With ``tail=True`` (the direct-dispatch
+specialists, which have no deepagents stack) it also marks the last
+message, so a specialist's tool loop reuses its own earlier steps.
+
+Anthropic ignores breakpoints on prefixes below the model's minimum
+cacheable length (``MIN_CACHEABLE_TOKENS``, 4096 on Haiku 4.5). Such a
+system breakpoint can never hit, so it is left off when the estimated
+tools + system prefix is shorter than that. As shipped only the
+orchestrator and gtm's task subagent clear it on Haiku; the direct-dispatch
+specialists (no deepagents instructions) are far below it
+(benchmarks/bench_promptcache.py prints the prefix sizes). The tail
+breakpoint still caches a tool loop's earlier steps once the conversation
+is long enough.
+
+Each call's cache read / write tokens (from ``usage_metadata``) are
+recorded per agent in ``prompt_cache_stats``. ``PROMPT_CACHE=0`` disables
+the system breakpoints.
+"""
+
+import json
+import os
+import threading
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+
+PROMPT_CACHE = os.environ.get("PROMPT_CACHE", "1").lower() not in ("0", "false", "no", "off")
+PROMPT_CACHE_TTL = os.environ.get("PROMPT_CACHE_TTL", "5m")  # or "1h" (writes cost 2x instead of 1.25x)
+
+# Shortest prefix (tokens) Anthropic caches, by model id prefix.
+MIN_CACHEABLE_TOKENS = {
+    "claude-haiku-4-5": 4096,
+    "claude-opus-4-5": 4096,
+    "claude-3-5-haiku": 2048,
+    "claude-3-haiku": 2048,
+}
+DEFAULT_MIN_CACHEABLE_TOKENS = 1024
+
+
+def min_cacheable_tokens(model: str) -> int:
+    return next((n for prefix, n in MIN_CACHEABLE_TOKENS.items() if model.startswith(prefix)),
+                DEFAULT_MIN_CACHEABLE_TOKENS)
+
+
+def prefix_tokens(system_message, tools) -> int:
+    """Estimated tokens (4 characters each) of the tools + system prefix."""
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+
+    content = system_message.content if system_message is not None else ""
+    chars = len(content) if isinstance(content, str) else sum(
+        len(b.get("text", "")) if isinstance(b, dict) else len(b) for b in content
+    )
+    chars += sum(len(json.dumps(convert_to_openai_tool(t))) for t in tools or [])
+    return chars // 4
+
+
+def cache_control(ttl: str = PROMPT_CACHE_TTL) -> dict:
+    return {"type": "ephemeral", "ttl": ttl}
+
+
+def mark_system(system_message, ttl: str = PROMPT_CACHE_TTL):
+    """``system_message`` with a cache breakpoint on its last text block."""
+    from langchain_core.messages import SystemMessage
+
+    content = system_message.content
+    blocks = [{"type": "text", "text": content}] if isinstance(content, str) else [
+        dict(b) if isinstance(b, dict) else {"type": "text", "text": b} for b in content
+    ]
+    for block in reversed(blocks):
+        if block.get("type") == "text" and block.get("text"):
+            block["cache_control"] = cache_control(ttl)
+            break
+    else:
+        return system_message
+    return SystemMessage(content=blocks)
+
+
+@dataclass(frozen=True)
+class CallUsage:
+    """Token usage of one model call. ``input_tokens`` includes cached ones."""
+
+    agent: str
+    input_tokens: int = 0
+    cache_read: int = 0
+    cache_write: int = 0
+    output_tokens: int = 0
+
+    @property
+    def uncached(self) -> int:
+        return self.input_tokens - self.cache_read - self.cache_write
+
+
+def call_usage(agent: str, message) -> CallUsage | None:
+    """Usage of the AI message a model call returned; None if not reported."""
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return None
+    details = usage.get("input_token_details") or {}
+    return CallUsage(
+        agent=agent,
+        input_tokens=usage.get("input_tokens", 0),
+        cache_read=details.get("cache_read") or 0,
+        cache_write=details.get("cache_creation") or 0,
+        output_tokens=usage.get("output_tokens", 0),
+    )
+
+
+@dataclass
+class _Totals:
+    calls: int = 0
+    input_tokens: int = 0
+    cache_read: int = 0
+    cache_write: int = 0
+    output_tokens: int = 0
+
+    def to_dict(self) -> dict:
+        read_share = round(self.cache_read / self.input_tokens, 3) if self.input_tokens else None
+        return {**asdict(self), "cache_read_share": read_share}
+
+
+class PromptCacheStats:
+    """Per-agent totals of model-call usage; ``on_call`` sees every call."""
+
+    def __init__(self, on_call: Callable[[CallUsage], None] | None = None):
+        self.on_call = on_call
+        self._totals: dict[str, _Totals] = {}
+        self._lock = threading.Lock()
+
+    def record(self, usage: CallUsage):
+        with self._lock:
+            t = self._totals.setdefault(usage.agent, _Totals())
+            t.calls += 1
+            t.input_tokens += usage.input_tokens
+            t.cache_read += usage.cache_read
+            t.cache_write += usage.cache_write
+            t.output_tokens += usage.output_tokens
+        if self.on_call is not None:
+            self.on_call(usage)
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": PROMPT_CACHE,
+                "ttl": PROMPT_CACHE_TTL,
+                "agents": {name: t.to_dict() for name, t in self._totals.items()},
+            }
+
+
+prompt_cache_stats = PromptCacheStats()
+
+
+def prompt_cache_middleware(
+    agent: str,
+    tail: bool = False,
+    stats: PromptCacheStats | None = None,
+    enabled: bool = PROMPT_CACHE,
+    ttl: str = PROMPT_CACHE_TTL,
+):
+    """Middleware adding the system (and optionally tail) breakpoint for
+    Anthropic models and recording each call's usage under ``agent``.
+
+    Other providers' requests pass through unchanged but are still counted.
+    """
+    from langchain.agents.middleware import AgentMiddleware
+    from langchain_anthropic import ChatAnthropic
+
+    stats = prompt_cache_stats if stats is None else stats
+    # The prefix is static per agent; remember whether it clears the minimum.
+    cacheable: dict[tuple, bool] = {}
+
+    def system_cacheable(request, models: list) -> bool:
+        content = request.system_message.content
+        key = (
+            tuple(m.model for m in models),
+            len(content) if isinstance(content, str) else len(json.dumps(content)),
+            tuple(getattr(t, "name", None) or str(t) for t in request.tools or []),
+        )
+        if key not in cacheable:
+            minimum = min(min_cacheable_tokens(m.model) for m in models)
+            cacheable[key] = prefix_tokens(request.system_message, request.tools) >= minimum
+        return cacheable[key]
+
+    def prepare(request):
+        # A routed model (agents.routing) is not a ChatAnthropic, so deepagents
+        # leaves its last message unmarked; mark it here.
+        routed = getattr(request.model, "all_anthropic", False)
+        if not enabled or not (routed or isinstance(request.model, ChatAnthropic)):
+            return request
+        models = request.model.models if routed else [request.model]
+        overrides = {}
+        if request.system_message is not None and system_cacheable(request, models):
+            overrides["system_message"] = mark_system(request.system_message, ttl)
+        if tail or routed:
+            overrides["model_settings"] = {**request.model_settings, "cache_control": cache_control(ttl)}
+        return request.override(**overrides) if overrides else request
+
+    def report(response):
+        # The handler returns a ModelResponse, or an AIMessage from a short-circuiting middleware.
+        inner = getattr(response, "model_response", response)
+        for message in reversed(getattr(inner, "result", None) or [inner]):
+            usage = call_usage(agent, message)
+            if usage is not None:
+                stats.record(usage)
+                break
+        return response
+
+    class PromptCacheBreakpoints(AgentMiddleware):
+        def wrap_model_call(self, request, handler):
+            return report(handler(prepare(request)))
+
+        async def awrap_model_call(self, request, handler):
+            return report(await handler(prepare(request)))
+
+    return PromptCacheBreakpoints()
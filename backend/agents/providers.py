@@ -0,0 +1,416 @@
+"""Process-wide rate limiting, retries and circuit breaking per provider.
+
+All six specialists and the orchestrator call Anthropic (and the
+specialists Tavily) at the same moment, from every session at once. Each
+client used to retry on its own, so one 429 burst could fail a whole
+analysis. Every call to a provider now goes through that provider's
+``ProviderGuard``:
+
+- a token bucket (``<PROVIDER>_RPM`` requests per minute, bursts of
+  ``<PROVIDER>_BURST``) shared by all sessions. A caller reserves a token
+  and waits its turn; a 429's ``Retry-After`` holds the whole bucket, not
+  just the caller that got it;
+- retries of throttling, overload, 5xx, timeout and connection errors, up
+  to ``PROVIDER_MAX_RETRIES`` times. A model call that has already streamed
+  a token is not retried, since its partial output is out. The wait is exponential with full
+  jitter (``PROVIDER_RETRY_BASE`` up to ``PROVIDER_RETRY_CAP`` s), or the
+  server's ``Retry-After`` plus a little jitter. A ``Retry-After`` longer
+  than ``PROVIDER_MAX_RETRY_AFTER`` is not waited out. Other errors (bad
+  request, auth) are raised at once;
+- a circuit breaker that opens after ``CIRCUIT_FAILURES`` consecutive
+  failed calls (a call fails once, however many attempts it made). While
+  it is open, calls fail fast with ``CircuitOpen``.
+  After ``CIRCUIT_RESET`` s one probe call is let through, and its outcome
+  closes or re-opens the circuit.
+
+Anthropic calls are guarded by ``provider_guard_middleware`` on the
+orchestrator and every specialist, and by ``guard_for`` on plain model
+calls. Their clients are built with ``max_retries=0`` (``init_model``), so
+this is the only retry layer.
+``web_search`` guards Tavily itself. When the circuit is open or the
+retries run out, it answers with its "unavailable" fallback text instead
+of failing the specialist.
+
+``guards[name].info()`` counts calls, throttled calls and the time spent
+waiting, retries, short-circuited calls and final failures; see
+``/api/metrics``.
+"""
+
+import asyncio
+import contextvars
+import email.utils
+import functools
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+
+PROVIDER_MAX_RETRIES = int(os.environ.get("PROVIDER_MAX_RETRIES", "4"))
+PROVIDER_RETRY_BASE = float(os.environ.get("PROVIDER_RETRY_BASE", "0.5"))
+PROVIDER_RETRY_CAP = float(os.environ.get("PROVIDER_RETRY_CAP", "20"))
+PROVIDER_MAX_RETRY_AFTER = float(os.environ.get("PROVIDER_MAX_RETRY_AFTER", "30"))
+CIRCUIT_FAILURES = int(os.environ.get("CIRCUIT_FAILURES", "5"))
+CIRCUIT_RESET = float(os.environ.get("CIRCUIT_RESET", "30"))
+
+# (requests per minute, burst) when <PROVIDER>_RPM / <PROVIDER>_BURST are unset.
+DEFAULT_LIMITS = {
+    "anthropic": (50.0, 10),
+    "tavily": (100.0, 10),
+}
+
+RETRY_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+# Matched by class name anywhere in the MRO, so the SDKs are never imported here.
+RETRY_ERRORS = frozenset({
+    "APIConnectionError", "APITimeoutError",  # anthropic
+    "UsageLimitExceededError",                # tavily's 429
+    "Timeout", "ConnectionError",             # requests
+    "TimeoutException", "NetworkError",       # httpx
+    "TimeoutError",                           # builtin, tavily
+})
+
+
+class CircuitOpen(Exception):
+    """A provider's circuit is open; the call was not attempted."""
+
+
+def status_code(exc: BaseException) -> int | None:
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def retryable(exc: BaseException) -> bool:
+    """Whether ``exc`` says the provider is busy or unreachable (worth
+    retrying, and counted by the breaker) rather than the request is wrong."""
+    code = status_code(exc)
+    if code is not None:
+        return code in RETRY_STATUSES
+    return any(cls.__name__ in RETRY_ERRORS for cls in type(exc).__mro__)
+
+
+def retry_after(exc: BaseException, now: Callable[[], float] = time.time) -> float | None:
+    """Seconds the server asked to wait (``retry-after-ms`` / ``retry-after``)."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+    except (TypeError, ValueError):
+        return None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - now())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """``rate`` tokens per second, holding up to ``burst``.
+
+    ``reserve()`` takes a token now and returns how long to wait before
+    using it, so callers are served in order and sleep outside the lock.
+    """
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = float(burst)
+        self._stamp = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> float:
+        now = self.clock()
+        if now > self._stamp:
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+        return now
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = self._refill()
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate + (self._stamp - now)
+
+    def hold(self, seconds: float):
+        """Hand out no token for the next ``seconds`` (a server's Retry-After)."""
+        with self._lock:
+            now = self._refill()
+            if now + seconds > self._stamp:
+                self._tokens = min(self._tokens, 0.0)
+                self._stamp = now + seconds
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failures`` in a row -> one probe after ``reset`` s."""
+
+    def __init__(self, failures: int = CIRCUIT_FAILURES, reset: float = CIRCUIT_RESET,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failures = failures
+        self.reset = reset
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._streak = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if self._probing or self.clock() - self._opened_at >= self.reset else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or self.clock() - self._opened_at < self.reset:
+                return False
+            self._probing = True
+            return True
+
+    def success(self):
+        with self._lock:
+            self._streak = 0
+            self._opened_at = None
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self._streak += 1
+            if self._probing or (self._opened_at is None and self._streak >= self.failures):
+                self._opened_at = self.clock()
+                self.opened += 1
+            self._probing = False
+
+
+class ProviderGuard:
+    """Rate limit, retries and circuit breaker in front of one provider."""
+
+    def __init__(
+        self,
+        name: str,
+        rpm: float,
+        burst: int,
+        max_retries: int = PROVIDER_MAX_RETRIES,
+        base: float = PROVIDER_RETRY_BASE,
+        cap: float = PROVIDER_RETRY_CAP,
+        max_retry_after: float = PROVIDER_MAX_RETRY_AFTER,
+        breaker: CircuitBreaker | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Callable[[], float] = random.random,
+    ):
+        self.name = name
+        self.bucket = TokenBucket(rpm / 60, burst, clock)
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+        self.max_retry_after = max_retry_after
+        self.rng = rng
+        self._lock = threading.Lock()
+        self._counts: dict[str, float] = defaultdict(int)
+
+    def _count(self, key: str, amount: float = 1):
+        with self._lock:
+            self._counts[key] += amount
+
+    def _admit(self, attempt: int) -> float:
+        """Seconds to wait before the next attempt; CircuitOpen if the call
+        may not run (checked once per call, so a probe can retry)."""
+        if attempt == 0 and not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpen(f"{self.name} circuit open after repeated failures")
+        wait = self.bucket.reserve()
+        self._count("calls")
+        if wait > 0:
+            self._count("throttled")
+            self._count("throttle_wait_s", wait)
+        return wait
+
+    def _backoff(self, exc: BaseException, attempt: int, may_retry: Callable[[], bool] | None) -> float:
+        """Seconds to wait before retrying after ``exc``; re-raises it if not retrying."""
+        if not retryable(exc):
+            self.breaker.success()  # the provider answered; the request was at fault
+            raise exc
+        asked = retry_after(exc)
+        if (
+            attempt >= self.max_retries
+            or (asked is not None and asked > self.max_retry_after)
+            or (may_retry is not None and not may_retry())
+        ):
+            self.breaker.failure()
+            self._count("failed")
+            raise exc
+        if asked is not None:
+            self.bucket.hold(asked)
+            delay = asked + self.rng() * self.base
+        else:
+            delay = self.rng() * min(self.cap, self.base * 2 ** attempt)
+        self._count("retried")
+        return delay
+
+    def call(
+        self,
+        fn: Callable[[], object],
+        sleep: Callable[[float], None] = time.sleep,
+        may_retry: Callable[[], bool] | None = None,
+    ):
+        """``fn()`` under the guard; a failed attempt is not retried when
+        ``may_retry()`` is false (it already produced output)."""
+        attempt = 0
+        while True:
+            wait = self._admit(attempt)
+            if wait > 0:
+                sleep(wait)
+            try:
+                result = fn()
+            except Exception as exc:
+                sleep(self._backoff(exc, attempt, may_retry))
+                attempt += 1
+                continue
+            self.breaker.success()
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable], may_retry: Callable[[], bool] | None = None):
+        attempt = 0
+        while True:
+            wait = self._admit(attempt)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                result = await fn()
+            except Exception as exc:
+                await asyncio.sleep(self._backoff(exc, attempt, may_retry))
+                attempt += 1
+                continue
+            self.breaker.success()
+            return result
+
+    def info(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            "rpm": round(self.bucket.rate * 60, 1),
+            "burst": self.bucket.burst,
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+            **{k: counts.get(k, 0) for k in ("calls", "throttled", "retried", "short_circuited", "failed")},
+            "throttle_wait_s": round(counts.get("throttle_wait_s", 0.0), 3),
+        }
+
+
+def guard_from_env(name: str) -> ProviderGuard:
+    rpm, burst = DEFAULT_LIMITS.get(name, (60.0, 10))
+    prefix = name.upper()
+    return ProviderGuard(
+        name,
+        rpm=float(os.environ.get(f"{prefix}_RPM", rpm)),
+        burst=int(os.environ.get(f"{prefix}_BURST", burst)),
+    )
+
+
+guards: dict[str, ProviderGuard] = {name: guard_from_env(name) for name in DEFAULT_LIMITS}
+
+
+def init_model(model: str):
+    """A chat model for ``model`` without the client's own retries (the
+    guard retries, within the shared rate limit)."""
+    from langchain.chat_models import init_chat_model
+
+    return init_chat_model(model, max_retries=0)
+
+
+def guard_for(model) -> ProviderGuard | None:
+    """The guard for ``model``'s calls; None for providers without one."""
+    from langchain_anthropic import ChatAnthropic
+
+    if isinstance(model, ChatAnthropic) or getattr(model, "all_anthropic", False):
+        return guards["anthropic"]
+    return None
+
+
+# The StreamWatch of the guarded model call running in this context.
+_stream_watch = contextvars.ContextVar("provider_stream_watch", default=None)
+
+
+@functools.cache
+def _stream_watch_class():
+    """Callback flagging a model call's first streamed output. Registered as
+    a configure hook, so every model run started while ``_stream_watch`` is
+    set reports to it, however deep in the graph."""
+    from langchain_core.callbacks import BaseCallbackHandler
+    from langchain_core.tracers.context import register_configure_hook
+
+    class StreamWatch(BaseCallbackHandler):
+        run_inline = True
+
+        def __init__(self):
+            self.streamed = False
+
+        def on_llm_new_token(self, token, *, chunk=None, **kwargs):
+            message = getattr(chunk, "message", None)
+            if token or getattr(message, "tool_call_chunks", None):
+                self.streamed = True
+
+    register_configure_hook(_stream_watch, inheritable=True)
+    return StreamWatch
+
+
+def provider_guard_middleware(guard: ProviderGuard | None = None):
+    """Middleware sending Anthropic model calls through ``guards["anthropic"]``
+    (or ``guard``).
+
+    Other providers' models pass through unguarded. An attempt that has
+    streamed a token is not retried.
+    """
+    from langchain.agents.middleware import AgentMiddleware
+
+    def guarded(request) -> ProviderGuard | None:
+        g = guard_for(request.model)
+        return g if g is None or guard is None else guard
+
+    class ProviderGuardMiddleware(AgentMiddleware):
+        def wrap_model_call(self, request, handler):
+            g = guarded(request)
+            if g is None:
+                return handler(request)
+            watch = _stream_watch_class()()
+
+            def attempt():
+                token = _stream_watch.set(watch)
+                try:
+                    return handler(request)
+                finally:
+                    _stream_watch.reset(token)
+
+            return g.call(attempt, may_retry=lambda: not watch.streamed)
+
+        async def awrap_model_call(self, request, handler):
+            g = guarded(request)
+            if g is None:
+                return await handler(request)
+            watch = _stream_watch_class()()
+
+            async def attempt():
+                token = _stream_watch.set(watch)
+                try:
+                    return await handler(request)
+                finally:
+                    _stream_watch.reset(token)
+
+            return await g.acall(attempt, may_retry=lambda: not watch.streamed)
+
+    return ProviderGuardMiddleware()
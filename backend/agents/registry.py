@@ -0,0 +1,271 @@
+"""Cached, hot-reloadable view of ``config/agents.yaml`` and ``config/questions.yaml``.
+
+Both files are parsed once into an immutable ``ConfigSnapshot`` holding
+everything derived from them: the subagent definitions (with tools
+resolved), the label map and the assembled orchestrator prompt. Readers
+call ``registry.get()``, which just returns the current snapshot.
+
+``reload()`` stats both files and only re-parses when an mtime or size
+changed; ``watch()`` runs it on a daemon thread so an edited prompt is
+swapped into a running server without a restart and without any parsing
+on the request path. Listeners registered with ``subscribe()`` are called
+with each new snapshot (the server uses this to rebuild the orchestrator).
+A file that fails to parse during a hot reload is reported in
+``last_error`` and the previous snapshot stays in place.
+"""
+
+import os
+import re
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import yaml
+
+from agents.deadlines import parse_deadline
+from agents.routing import parse_prices, parse_route, parse_tiers
+from agents.tools import resolve_tools
+from agents.widgetgen import parse_widget_mode
+
+CONFIG_DIR = Path(__file__).parent.parent / "config"
+AGENTS_PATH = CONFIG_DIR / "agents.yaml"
+QUESTIONS_PATH = CONFIG_DIR / "questions.yaml"
+
+DEFAULT_MODEL = "claude-haiku-4-5-20251001"
+# Seconds between mtime checks when watching; 0 disables hot reload.
+WATCH_INTERVAL = float(os.environ.get("CONFIG_WATCH_INTERVAL", "2"))
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Everything built from one version of the two config files."""
+
+    version: int
+    agents_raw: dict
+    questions_raw: dict
+    subagent_defs: tuple[dict, ...]
+    agent_labels: dict[str, str]
+    orchestrator_prompt: str
+    direct_orchestrator_prompt: str
+    orchestrator_model: str
+    # agent id -> questions that must be answered before it can start early
+    agent_triggers: dict[str, frozenset[str]]
+    # question id -> its ``signals``, compiled (agents.speculative)
+    slot_signals: dict[str, tuple[re.Pattern, ...]]
+
+    @property
+    def agent_ids(self) -> list[str]:
+        return list(self.agent_labels)
+
+    @property
+    def required_questions(self) -> frozenset[str]:
+        return frozenset(q["id"] for q in self.questions_raw.get("questions", []) if q.get("required"))
+
+
+def _load_yaml(path: Path) -> dict:
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+
+def _build_subagent_defs(raw: dict) -> tuple[dict, ...]:
+    """``model`` is the agent's primary model id and ``route`` its tiers
+    (agents.routing); ``deadline`` and ``hedge`` bound its run time (agents.deadlines);
+    ``widget_mode`` is how its widgets are generated (agents.widgetgen)."""
+    defaults = raw.get("defaults", {})
+    default_model = defaults.get("model", DEFAULT_MODEL)
+    default_deadline = parse_deadline(defaults.get("deadline"), where="defaults.deadline")
+    tiers = parse_tiers(raw.get("routing"))
+    prices = parse_prices(raw.get("routing"))
+    defs = []
+    for agent_id, cfg in raw.get("agents", {}).items():
+        route = parse_route(cfg.get("model"), tiers, default_model, prices, where=f"agents.{agent_id}.model")
+        defs.append({
+            "name": agent_id,
+            "description": cfg["description"],
+            "system_prompt": cfg["system_prompt"].strip(),
+            "tools": resolve_tools(cfg.get("tools", [])),
+            "model": route.model,
+            "route": route,
+            "deadline": parse_deadline(cfg["deadline"], where=f"agents.{agent_id}.deadline")
+            if "deadline" in cfg else default_deadline,
+            "hedge": bool(cfg.get("hedge", defaults.get("hedge", False))),
+            "widget_mode": parse_widget_mode(
+                cfg.get("widget_mode", defaults.get("widget_mode")), cfg["system_prompt"],
+                where=f"agents.{agent_id}.widget_mode",
+            ),
+        })
+    return tuple(defs)
+
+
+_RECORD_ANSWERS = (
+    "After every user message, call `record_answers` with the ids of ALL "
+    "questions answered so far."
+)
+
+_TASK_DISPATCH = (
+    f"\n{_RECORD_ANSWERS} The system keeps the user's messages in a context "
+    "ledger keyed by those ids and attaches it to every task, so do NOT restate "
+    "the conversation in `description`: write one or two sentences on what the "
+    "agent should focus on, plus anything you concluded that the user did not "
+    "say. When dispatching agents, use the task tool. You can dispatch multiple "
+    "agents in parallel. Write the `subagent_type` argument before `description` "
+    "so the UI can show the agent starting right away.\n"
+)
+
+# DISPATCH_MODE=direct: the server runs the specialists (see agents.fanout).
+_DIRECT_DISPATCH = (
+    f"\nDo NOT dispatch agents yourself and do not use the task tool. {_RECORD_ANSWERS} "
+    "The system starts each specialist in the background as soon as the "
+    "questions that trigger it are answered, so keep the interview going. When "
+    "you have asked everything you intend to ask, call `record_answers` with "
+    "`interview_complete` set to true and say in one short sentence that the "
+    "analysis is being finalized.\n"
+    "\nA message starting with \"[Specialist results]\" holds their findings. "
+    "Reply to it with the synthesis.\n"
+)
+
+
+def _build_orchestrator_prompt(config: dict, agent_labels: dict[str, str], direct: bool = False) -> str:
+    """Combine the base orchestrator prompt with question definitions.
+
+    ``direct`` swaps the task-tool dispatch instructions for the ones used when
+    the server dispatches the specialists itself.
+    """
+    base_prompt = config["orchestrator"]["system_prompt"].strip()
+    questions = config.get("questions", [])
+
+    question_block = "\n## Questions to Cover\n\n"
+    for q in questions:
+        required = " (REQUIRED)" if q.get("required") else " (optional)"
+        agents = q.get("triggers_agents", [])
+        agent_names = ", ".join(agent_labels.get(a, a) for a in agents) if agents else "none yet"
+        question_block += (
+            f"- **{q['id']}**{required}: {q['prompt']}\n"
+            f"  Triggers: {agent_names}\n"
+        )
+
+    agent_block = "\n## Available Specialist Agents\n\n"
+    for aid, label in agent_labels.items():
+        agent_block += f"- `{aid}`: {label}\n"
+
+    agent_block += _DIRECT_DISPATCH if direct else _TASK_DISPATCH
+
+    return base_prompt + question_block + agent_block
+
+
+def _build_agent_triggers(config: dict, agent_labels: dict[str, str]) -> dict[str, frozenset[str]]:
+    """Invert ``triggers_agents``: the questions each specialist waits for."""
+    triggers: dict[str, set[str]] = {aid: set() for aid in agent_labels}
+    for q in config.get("questions", []):
+        for aid in q.get("triggers_agents") or []:
+            if aid in triggers:
+                triggers[aid].add(q["id"])
+    return {aid: frozenset(qids) for aid, qids in triggers.items()}
+
+
+def _build_slot_signals(config: dict) -> dict[str, tuple[re.Pattern, ...]]:
+    """Compile each question's ``signals`` (case-insensitive regexes)."""
+    signals = {}
+    for q in config.get("questions", []):
+        patterns = q.get("signals") or []
+        try:
+            signals[q["id"]] = tuple(re.compile(p, re.IGNORECASE) for p in patterns)
+        except re.error as exc:
+            raise ValueError(f"questions.{q['id']}.signals: {exc}") from exc
+    return {qid: patterns for qid, patterns in signals.items() if patterns}
+
+
+def _file_stamp(path: Path) -> tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class ConfigRegistry:
+    """Process-wide holder of the current ``ConfigSnapshot``."""
+
+    def __init__(self, agents_path: Path = AGENTS_PATH, questions_path: Path = QUESTIONS_PATH):
+        self.agents_path = agents_path
+        self.questions_path = questions_path
+        self.last_error: Exception | None = None
+        self._snapshot: ConfigSnapshot | None = None
+        self._stamps: tuple | None = None
+        self._lock = threading.Lock()
+        self._listeners: list[Callable[[ConfigSnapshot], None]] = []
+        self._watcher: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def get(self) -> ConfigSnapshot:
+        """The current snapshot; parses the files only on first use."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.reload()
+            snapshot = self._snapshot
+        return snapshot
+
+    def reload(self, force: bool = False) -> bool:
+        """Re-parse if either file changed on disk. Returns True on a swap."""
+        with self._lock:
+            try:
+                stamps = (_file_stamp(self.agents_path), _file_stamp(self.questions_path))
+                if not force and stamps == self._stamps:
+                    return False
+                snapshot = self._build(self._snapshot.version + 1 if self._snapshot else 1)
+            except Exception as exc:
+                if self._snapshot is None:
+                    raise
+                self.last_error = exc
+                return False
+            self._snapshot, self._stamps, self.last_error = snapshot, stamps, None
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener(snapshot)
+            except Exception as exc:
+                self.last_error = exc
+        return True
+
+    def subscribe(self, listener: Callable[[ConfigSnapshot], None]):
+        """Call ``listener(snapshot)`` after every successful hot reload."""
+        self._listeners.append(listener)
+
+    def watch(self, interval: float = WATCH_INTERVAL):
+        """Poll the files every ``interval`` seconds on a daemon thread."""
+        if self._watcher is not None or interval <= 0:
+            return
+        self.get()
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.reload()
+
+        self._watcher = threading.Thread(target=loop, name="config-watch", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def _build(self, version: int) -> ConfigSnapshot:
+        agents_raw = _load_yaml(self.agents_path)
+        questions_raw = _load_yaml(self.questions_path)
+        labels = {aid: cfg["label"] for aid, cfg in agents_raw.get("agents", {}).items()}
+        return ConfigSnapshot(
+            version=version,
+            agents_raw=agents_raw,
+            questions_raw=questions_raw,
+            subagent_defs=_build_subagent_defs(agents_raw),
+            agent_labels=labels,
+            orchestrator_prompt=_build_orchestrator_prompt(questions_raw, labels),
+            direct_orchestrator_prompt=_build_orchestrator_prompt(questions_raw, labels, direct=True),
+            orchestrator_model=questions_raw["orchestrator"].get("model", DEFAULT_MODEL),
+            agent_triggers=_build_agent_triggers(questions_raw, labels),
+            slot_signals=_build_slot_signals(questions_raw),
+        )
+
+
+registry = ConfigRegistry()
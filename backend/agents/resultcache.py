@@ -0,0 +1,370 @@
+"""Content-addressed cache of specialist results.
+
+Re-running an idea, retrying a failed turn or re-running the test suite
+dispatches the same specialist with the same brief and pays full LLM cost
+and latency again. Results are cached under a key derived from:
+
+- the dispatch context (the task description and the founder's messages,
+  or just the founder's messages in direct dispatch), normalized for
+  whitespace,
+- a hash of the agent's agents.yaml entry (system prompt, model tiers, tools), so
+  editing a prompt invalidates only that agent's entries, and
+- the model id.
+
+Two backends share one interface: ``MemoryCache`` (an LRU, per process) and
+``DiskCache`` (one JSON file per entry under ``RESULT_CACHE_DIR``, shared
+between processes and restarts). Both expire entries after
+``RESULT_CACHE_TTL`` seconds and evict least recently used entries beyond
+``RESULT_CACHE_MAX_ENTRIES`` (and ``RESULT_CACHE_MAX_BYTES`` on disk).
+``RESULT_CACHE=memory|disk|off`` picks the backend.
+
+On an exact miss ``lookup`` also asks the near-duplicate index
+(agents.neardup) for a previous context of the same agent definition that
+is at least ``NEAR_DUP_THRESHOLD`` similar, and returns that analysis
+flagged with its similarity.
+
+In the default dispatch mode ``task_cache_middleware`` answers the
+orchestrator's ``task`` calls from the cache; direct dispatch checks it
+before starting a specialist. A request can bypass it (read and write)
+with ``"cache": false`` in the ``/api/chat`` body, which sets
+``configurable.result_cache`` to False.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from agents.neardup import NearDuplicateIndex
+
+RESULT_CACHE = os.environ.get("RESULT_CACHE", "memory")
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", "86400"))
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", "512"))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_DIR = Path(os.environ.get("RESULT_CACHE_DIR", Path(__file__).parent.parent / ".cache" / "results"))
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_context(text: str) -> str:
+    """Whitespace-insensitive form of a dispatch context."""
+    return _WS.sub(" ", text).strip()
+
+
+def agent_fingerprint(agent_def: dict) -> str:
+    """Hash of the parts of an agents.yaml entry that shape its output."""
+    doc = {
+        "system_prompt": agent_def["system_prompt"],
+        "model": agent_def["model"],
+        "tools": sorted(getattr(t, "__name__", str(t)) for t in agent_def.get("tools", [])),
+    }
+    route = agent_def.get("route")
+    if route is not None and route.routed:
+        doc["route"] = [t.model for t in route.tiers]
+    return hashlib.sha256(json.dumps(doc, sort_keys=True).encode()).hexdigest()
+
+
+def cache_key(agent_def: dict, context: str) -> str:
+    parts = [agent_def["name"], agent_def["model"], agent_fingerprint(agent_def), normalize_context(context)]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expired: int = 0
+
+    def to_dict(self) -> dict:
+        total = self.hits + self.misses
+        return {**asdict(self), "hit_rate": round(self.hits / total, 3) if total else None}
+
+
+class ResultCache:
+    """Interface shared by the backends. Values are specialist result texts."""
+
+    name = "off"
+
+    def __init__(self, ttl: float = RESULT_CACHE_TTL, clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        self.stats.misses += 1
+        return None
+
+    def set(self, key: str, value: str):
+        pass
+
+    def __len__(self) -> int:
+        return 0
+
+    def info(self) -> dict:
+        return {"backend": self.name, "entries": len(self), **self.stats.to_dict()}
+
+
+class MemoryCache(ResultCache):
+    """In-process LRU with TTL."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, **kwargs):
+        super().__init__(**kwargs)
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                del self._entries[key]
+                self.stats.expired += 1
+                entry = None
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self.stats.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCache(ResultCache):
+    """One JSON file per entry; file mtime is the LRU clock.
+
+    Writes go through a temp file and ``os.replace`` so concurrent readers
+    (other workers, other processes) never see a partial entry.
+    """
+
+    name = "disk"
+
+    def __init__(
+        self,
+        directory: Path = RESULT_CACHE_DIR,
+        max_entries: int = RESULT_CACHE_MAX_ENTRIES,
+        max_bytes: int = RESULT_CACHE_MAX_BYTES,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> str | None:
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):
+            entry = None
+        with self._lock:
+            if entry is not None and entry["expires"] <= self.clock():
+                path.unlink(missing_ok=True)
+                self.stats.expired += 1
+                entry = None
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+        now = self.clock()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass  # evicted by another writer since the read; the value is still good
+        return entry["value"]
+
+    def set(self, key: str, value: str):
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps({"expires": self.clock() + self.ttl, "value": value}))
+        now = self.clock()
+        os.utime(tmp, (now, now))
+        os.replace(tmp, path)
+        with self._lock:
+            self.stats.stores += 1
+            self._evict()
+
+    def _evict(self):
+        files = []
+        for path in self.directory.glob("*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        while files and (len(files) > self.max_entries or total > self.max_bytes):
+            _, size, path = files.pop(0)
+            path.unlink(missing_ok=True)
+            total -= size
+            self.stats.evictions += 1
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.directory.glob("*.json"))
+
+
+def cache_from_env(backend: str = RESULT_CACHE) -> ResultCache:
+    if backend == "memory":
+        return MemoryCache()
+    if backend == "disk":
+        return DiskCache()
+    if backend == "off":
+        return ResultCache()
+    raise ValueError(f"Unknown RESULT_CACHE backend: {backend!r} (memory, disk or off)")
+
+
+result_cache = cache_from_env()
+
+
+near_index = NearDuplicateIndex()
+
+
+@dataclass(frozen=True)
+class CachedResult:
+    """A cache hit. ``similarity`` < 1 means a near-duplicate context's
+    analysis is being reused."""
+
+    text: str
+    similarity: float = 1.0
+
+    @property
+    def reused(self) -> bool:
+        return self.similarity < 1.0
+
+
+def _scope(agent_def: dict) -> str:
+    return f"{agent_def['name']}:{agent_fingerprint(agent_def)[:16]}"
+
+
+def lookup(
+    agent_def: dict,
+    context: str,
+    cache: ResultCache | None = None,
+    index: NearDuplicateIndex | None = None,
+) -> tuple[str, CachedResult | None]:
+    """``(key, hit)`` for a dispatch: exact match first, then near-duplicate."""
+    cache = result_cache if cache is None else cache
+    index = near_index if index is None else index
+    key = cache_key(agent_def, context)
+    text = cache.get(key)
+    if text is not None:
+        return key, CachedResult(text)
+    for match in index.query(_scope(agent_def), context):
+        text = cache.get(match.key)
+        if text is not None:
+            return key, CachedResult(text, match.similarity)
+        index.discard(_scope(agent_def), match.key)  # expired or evicted
+    return key, None
+
+
+def remember(
+    agent_def: dict,
+    context: str,
+    key: str,
+    text: str,
+    cache: ResultCache | None = None,
+    index: NearDuplicateIndex | None = None,
+):
+    """Store a fresh result and index its context for near-duplicate reuse."""
+    (result_cache if cache is None else cache).set(key, text)
+    (near_index if index is None else index).add(_scope(agent_def), context, key)
+
+
+def cache_enabled(config: dict | None) -> bool:
+    """False when the run's config asks to bypass the cache."""
+    return bool(((config or {}).get("configurable") or {}).get("result_cache", True))
+
+
+def task_cache_middleware(
+    agent_defs: list[dict],
+    cache: ResultCache | None = None,
+    index: NearDuplicateIndex | None = None,
+    context: Callable[[str, list], str] | None = None,
+):
+    """Orchestrator middleware answering ``task`` calls from ``cache``.
+
+    On a hit the subagent never runs; the cached text comes back as the
+    task's ToolMessage, with ``artifact["reused"]`` for a near-duplicate.
+    Misses run normally and are stored unless the result is empty or an
+    error. ``context(description, messages)`` is what a call is keyed and
+    matched under; by default its description.
+    """
+    from langchain.agents.middleware import AgentMiddleware
+    from langchain_core.messages import ToolMessage
+
+    defs = {d["name"]: d for d in agent_defs}
+
+    def check(request) -> tuple[tuple | None, ToolMessage | None]:
+        call = request.tool_call
+        agent_def = defs.get(call["args"].get("subagent_type", "")) if call["name"] == "task" else None
+        config = getattr(request.runtime, "config", None)
+        if agent_def is None or not cache_enabled(config):
+            return None, None
+        description = call["args"].get("description", "")
+        if context is None:
+            brief = description
+        else:
+            state = request.state
+            messages = state.get("messages", []) if isinstance(state, dict) else getattr(state, "messages", [])
+            brief = context(description, messages)
+        key, hit = lookup(agent_def, brief, cache, index)
+        miss = (agent_def, brief, key)
+        if hit is None:
+            return miss, None
+        # The artifact tells the server (not the model) that this was reused.
+        artifact = {"reused": {"similarity": round(hit.similarity, 3)}} if hit.reused else None
+        return miss, ToolMessage(hit.text, tool_call_id=call["id"], name="task", artifact=artifact)
+
+    def store(miss: tuple | None, result):
+        update = getattr(result, "update", None)
+        messages = update.get("messages", []) if isinstance(update, dict) else [result]
+        if not miss or not messages or getattr(messages[-1], "status", "success") == "error":
+            return
+        text = getattr(messages[-1], "content", "")
+        if isinstance(text, str) and text.strip():
+            agent_def, brief, key = miss
+            remember(agent_def, brief, key, text, cache, index)
+
+    class TaskResultCache(AgentMiddleware):
+        def wrap_tool_call(self, request, handler):
+            miss, hit = check(request)
+            if hit is not None:
+                return hit
+            result = handler(request)
+            store(miss, result)
+            return result
+
+        async def awrap_tool_call(self, request, handler):
+            miss, hit = check(request)
+            if hit is not None:
+                return hit
+            result = await handler(request)
+            store(miss, result)
+            return result
+
+    return TaskResultCache()
@@ -0,0 +1,424 @@
+"""Per-agent model routing over tiers, with latency, load and budget fallbacks.
+
+An agent's ``model`` in agents.yaml is one model id, one tier name, or a
+list of tiers tried in order. Tiers are declared under ``routing.tiers``:
+
+    routing:
+      tiers:
+        fast:   {model: claude-haiku-4-5-20251001}
+        strong:
+          model: claude-sonnet-4-5-20250929
+          first_token_timeout: 8    # s without a first token -> next tier
+          max_concurrent: 4         # calls in flight at once, else next tier
+          budget_usd_per_hour: 5    # spend over the last hour, else next tier
+    agents:
+      business_model:
+        model: [strong, fast]
+      customer:
+        model: fast
+
+A list entry may also be a mapping that overrides a tier's rules for one
+agent (``{tier: strong, first_token_timeout: 5}``) or names a model
+directly (``{model: ..., first_token_timeout: 5}``). The last tier always
+runs; its rules are only tracked.
+
+A multi-tier route is served by ``RoutedChatModel``. It skips tiers that
+are over ``max_concurrent`` or ``budget_usd_per_hour`` and streams from the
+first remaining one. If no token arrives within ``first_token_timeout``, or
+the call fails before its first token, it moves on to the next tier. Once a
+tier has produced a token it is committed. An abandoned call is stopped as
+soon as its first token arrives; its input tokens are billed all the same,
+and it counts against its tier's ``max_concurrent`` until then.
+
+Spend is estimated from ``usage_metadata`` with the ``PRICES`` table
+(overridable under ``routing.prices``). ``router`` records, per agent and
+tier, calls, first-token latency, spend and fallbacks by reason. Every
+routed response carries ``response_metadata["route"]`` with the tier used.
+"""
+
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from collections.abc import Callable
+from dataclasses import dataclass, field, replace
+from functools import cache, partial
+
+from agents.providers import init_model
+from agents.stats import ms, percentile
+
+# USD per million tokens (input, output) by model id prefix; first match wins.
+PRICES: dict[str, tuple[float, float]] = {
+    "claude-haiku-4-5": (1.0, 5.0),
+    "claude-sonnet-4": (3.0, 15.0),
+    "claude-opus-4-5": (5.0, 25.0),
+    "claude-opus-4": (15.0, 75.0),
+    "claude-3-5-haiku": (0.8, 4.0),
+}
+# Prompt-cache reads and writes relative to the input price.
+CACHE_READ_RATE = 0.1
+CACHE_WRITE_RATE = 1.25
+
+_RULES = ("first_token_timeout", "max_concurrent", "budget_usd_per_hour")
+BUDGET_WINDOW = 3600.0
+
+
+@dataclass(frozen=True)
+class Tier:
+    name: str
+    model: str
+    first_token_timeout: float | None = None
+    max_concurrent: int | None = None
+    budget_usd_per_hour: float | None = None
+
+
+@dataclass(frozen=True)
+class Route:
+    tiers: tuple[Tier, ...]
+    prices: dict[str, tuple[float, float]] = field(default_factory=lambda: PRICES, compare=False)
+
+    @property
+    def model(self) -> str:
+        """The primary model id."""
+        return self.tiers[0].model
+
+    @property
+    def routed(self) -> bool:
+        return len(self.tiers) > 1
+
+    @property
+    def label(self) -> str:
+        return " > ".join(t.name for t in self.tiers)
+
+
+def _rules(spec: dict, where: str) -> dict:
+    unknown = set(spec) - set(_RULES) - {"model", "tier"}
+    if unknown:
+        raise ValueError(f"{where}: unknown routing keys {sorted(unknown)}; expected {list(_RULES)}")
+    return {k: spec[k] for k in _RULES if spec.get(k) is not None}
+
+
+def parse_tiers(routing: dict | None) -> dict[str, Tier]:
+    tiers = {}
+    for name, spec in ((routing or {}).get("tiers") or {}).items():
+        if isinstance(spec, str):
+            spec = {"model": spec}
+        if not spec.get("model"):
+            raise ValueError(f"routing.tiers.{name}: missing model")
+        tiers[name] = Tier(name=name, model=spec["model"], **_rules(spec, f"routing.tiers.{name}"))
+    return tiers
+
+
+def parse_prices(routing: dict | None) -> dict[str, tuple[float, float]]:
+    overrides = {k: (float(v[0]), float(v[1])) for k, v in ((routing or {}).get("prices") or {}).items()}
+    return {**overrides, **{k: v for k, v in PRICES.items() if k not in overrides}}
+
+
+def parse_route(
+    spec,
+    tiers: dict[str, Tier],
+    default: str,
+    prices: dict[str, tuple[float, float]] | None = None,
+    where: str = "model",
+) -> Route:
+    """Route for an agent's ``model`` value (None means ``default``)."""
+    entries = spec if isinstance(spec, list) else [spec if spec is not None else default]
+    if not entries:
+        raise ValueError(f"{where}: empty tier list")
+
+    def entry(item) -> Tier:
+        if isinstance(item, str):
+            return tiers.get(item) or Tier(name=item, model=item)
+        if isinstance(item, dict) and (item.get("tier") or item.get("model")):
+            rules = _rules(item, where)
+            if item.get("tier"):
+                if item["tier"] not in tiers:
+                    raise ValueError(f"{where}: unknown tier {item['tier']!r}; declared: {sorted(tiers)}")
+                return replace(tiers[item["tier"]], **rules)
+            return Tier(name=item["model"], model=item["model"], **rules)
+        raise ValueError(f"{where}: expected a tier name, model id or mapping, got {item!r}")
+
+    return Route(tuple(entry(item) for item in entries), prices or PRICES)
+
+
+def cost_usd(model: str, usage: dict | None, prices: dict[str, tuple[float, float]] | None = None) -> float:
+    """Estimated cost of one call from its ``usage_metadata``."""
+    if not usage:
+        return 0.0
+    price_in, price_out = next(
+        (p for prefix, p in (prices or PRICES).items() if model.startswith(prefix)), (0.0, 0.0)
+    )
+    details = usage.get("input_token_details") or {}
+    read = details.get("cache_read") or 0
+    write = details.get("cache_creation") or 0
+    fresh = usage.get("input_tokens", 0) - read - write
+    tokens_in = fresh + read * CACHE_READ_RATE + write * CACHE_WRITE_RATE
+    return (tokens_in * price_in + usage.get("output_tokens", 0) * price_out) / 1e6
+
+
+class Router:
+    """Process-wide tier load, spend and per-agent routing outcomes."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, int] = defaultdict(int)
+        self._spend: dict[str, deque] = defaultdict(deque)  # tier -> (time, usd)
+        self._served: dict[str, dict[str, dict]] = defaultdict(dict)
+        self._fallbacks: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def _spent(self, tier: str) -> float:
+        window = self._spend[tier]
+        horizon = self.clock() - BUDGET_WINDOW
+        while window and window[0][0] < horizon:
+            window.popleft()
+        return sum(usd for _, usd in window)
+
+    def acquire(self, tier: Tier, last: bool = False) -> str | None:
+        """Take a slot on ``tier``; returns the reason to skip it instead.
+
+        The last tier of a route is never skipped.
+        """
+        with self._lock:
+            if not last:
+                if tier.max_concurrent is not None and self._in_flight[tier.name] >= tier.max_concurrent:
+                    return "load"
+                if tier.budget_usd_per_hour is not None and self._spent(tier.name) >= tier.budget_usd_per_hour:
+                    return "budget"
+            self._in_flight[tier.name] += 1
+            return None
+
+    def release(self, tier: Tier):
+        with self._lock:
+            self._in_flight[tier.name] -= 1
+
+    def fallback(self, agent: str, tier: Tier, reason: str):
+        with self._lock:
+            self._fallbacks[agent][f"{tier.name}:{reason}"] += 1
+
+    def served(self, agent: str, tier: Tier, first_token_s: float, usd: float):
+        with self._lock:
+            entry = self._served[agent].setdefault(
+                tier.name, {"calls": 0, "spend_usd": 0.0, "first_token": deque(maxlen=512)}
+            )
+            entry["calls"] += 1
+            entry["spend_usd"] += usd
+            entry["first_token"].append(first_token_s)
+            if usd:
+                self._spend[tier.name].append((self.clock(), usd))
+
+    def info(self) -> dict:
+        with self._lock:
+            agents = {}
+            for agent, tiers in self._served.items():
+                agents[agent] = {"tiers": {
+                    name: {
+                        "calls": e["calls"],
+                        "spend_usd": round(e["spend_usd"], 4),
+                        "first_token_ms_p50": ms(percentile(e["first_token"], 0.5)),
+                        "first_token_ms_p95": ms(percentile(e["first_token"], 0.95)),
+                    }
+                    for name, e in tiers.items()
+                }}
+            for agent, counts in self._fallbacks.items():
+                agents.setdefault(agent, {"tiers": {}})["fallbacks"] = dict(counts)
+            return {
+                "agents": agents,
+                "in_flight": {k: v for k, v in self._in_flight.items() if v},
+                "spend_usd_last_hour": {k: round(self._spent(k), 4) for k in list(self._spend)},
+            }
+
+
+router = Router()
+
+
+def chat_model(agent_def: dict):
+    """What to pass as ``model=`` when building ``agent_def``'s graph: the
+    chat model, or a ``RoutedChatModel`` for a multi-tier route."""
+    route: Route | None = agent_def.get("route")
+    if route is None or not route.routed:
+        return init_model(agent_def["model"])
+    return routed_chat_model(agent_def["name"], route)
+
+
+def routed_chat_model(agent: str, route: Route, router_: Router | None = None, models=None):
+    """A chat model serving ``route`` (``models`` overrides the tier models, for tests)."""
+    cls = _routed_model_class()
+    models = list(models) if models is not None else [init_model(t.model) for t in route.tiers]
+    return cls(
+        agent=agent,
+        route=route,
+        models=models,
+        router=router if router_ is None else router_,
+        profile=getattr(models[0], "profile", None),
+    )
+
+
+class _Pump:
+    """Runs a chunk stream on a thread so the first chunk can be awaited with a timeout.
+
+    ``on_done`` is called once the thread has finished with the stream, which
+    for a stream given up on (``cancel``) may be long after its consumer left.
+    """
+
+    _CHUNK, _END, _ERROR = range(3)
+
+    def __init__(self, open_stream: Callable, name: str, on_done: Callable[[], None]):
+        self._queue: queue.Queue = queue.Queue()
+        self._cancelled = threading.Event()
+        self._on_done = on_done
+        threading.Thread(target=self._run, args=(open_stream,), name=name, daemon=True).start()
+
+    def _run(self, open_stream):
+        try:
+            stream = open_stream()
+            try:
+                for chunk in stream:
+                    self._queue.put((self._CHUNK, chunk))
+                    if self._cancelled.is_set():
+                        break
+            finally:
+                getattr(stream, "close", lambda: None)()
+            self._queue.put((self._END, None))
+        except BaseException as exc:  # delivered to the consumer
+            self._queue.put((self._ERROR, exc))
+        finally:
+            self._on_done()
+
+    def next(self, timeout: float | None = None):
+        """The next chunk, None at the end; TimeoutError if none in ``timeout``."""
+        try:
+            kind, value = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError from None
+        if kind == self._ERROR:
+            raise value
+        return value if kind == self._CHUNK else None
+
+    def __iter__(self):
+        while (chunk := self.next()) is not None:
+            yield chunk
+
+    def cancel(self):
+        self._cancelled.set()
+
+
+@cache
+def _routed_model_class():
+    from langchain_anthropic import ChatAnthropic
+    from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+    from langchain_core.outputs import ChatGenerationChunk
+
+    class RoutedChatModel(BaseChatModel):
+        agent: str
+        route: Route
+        models: list
+        router: Router
+        binding: dict | None = None
+
+        @property
+        def _llm_type(self) -> str:
+            return "routed"
+
+        @property
+        def _identifying_params(self) -> dict:
+            return {"agent": self.agent, "route": self.route.label}
+
+        @property
+        def all_anthropic(self) -> bool:
+            """Every tier takes Anthropic request options such as cache_control."""
+            return all(isinstance(m, ChatAnthropic) for m in self.models)
+
+        def bind_tools(self, tools, **kwargs):
+            return self.model_copy(update={"binding": {"tools": tools, **kwargs}})
+
+        def _runnable(self, model, kwargs: dict):
+            opts = {**(self.binding or {}), **kwargs}
+            tools = opts.pop("tools", None)
+            if not isinstance(model, ChatAnthropic):
+                opts.pop("cache_control", None)
+            if tools is not None:
+                return model.bind_tools(tools, **opts)
+            return model.bind(**opts) if opts else model
+
+        def _first(self, runnable, messages, stop, timeout: float | None, release: Callable[[], None]):
+            """``(first chunk, remaining chunks)``; TimeoutError after ``timeout``.
+
+            The tier is streamed without the caller's callbacks: this model
+            reports every chunk itself, and LangGraph's ``messages`` stream
+            would otherwise get each token twice.
+
+            With a ``timeout`` the tier streams on a ``_Pump``, which calls
+            ``release`` when its call has ended: a tier given up on keeps its
+            concurrency slot until the abandoned call drains. Without one,
+            releasing the slot is left to the caller.
+            """
+            def open_stream():
+                return runnable.stream(messages, stop=stop, config={"callbacks": []})
+
+            if timeout is None:
+                stream = iter(open_stream())
+                return next(stream, None), stream
+            pump = _Pump(open_stream, f"route-{self.agent}", release)
+            try:
+                return pump.next(timeout), iter(pump)
+            except TimeoutError:
+                pump.cancel()
+                raise
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            skipped: list[dict] = []
+            last = len(self.route.tiers) - 1
+            for i, (tier, model) in enumerate(zip(self.route.tiers, self.models)):
+                runnable = self._runnable(model, kwargs)
+                reason = self.router.acquire(tier, last=i == last)
+                if reason is None:
+                    timeout = None if i == last else tier.first_token_timeout
+                    try:
+                        t0 = time.perf_counter()
+                        try:
+                            chunk, rest = self._first(
+                                runnable, messages, stop, timeout,
+                                partial(self.router.release, tier),
+                            )
+                        except Exception as exc:
+                            if i == last:
+                                raise
+                            reason = "first_token_timeout" if isinstance(exc, TimeoutError) else "error"
+                        else:
+                            first_token_s = time.perf_counter() - t0
+                            route = {"tier": tier.name, "model": tier.model, "fallbacks": skipped}
+                            if chunk is not None:
+                                chunk = chunk.model_copy(
+                                    update={"response_metadata": {**chunk.response_metadata, "route": route}}
+                                )
+                            usage: dict = {}
+                            while chunk is not None:
+                                _add_usage(usage, chunk.usage_metadata)
+                                yield ChatGenerationChunk(message=chunk)
+                                chunk = next(rest, None)
+                            usd = cost_usd(tier.model, usage, self.route.prices)
+                            self.router.served(self.agent, tier, first_token_s, usd)
+                            return
+                    finally:
+                        if timeout is None:
+                            self.router.release(tier)
+                self.router.fallback(self.agent, tier, reason)
+                skipped.append({"tier": tier.name, "reason": reason})
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            return generate_from_stream(self._stream(messages, stop=stop, run_manager=run_manager, **kwargs))
+
+    return RoutedChatModel
+
+
+def _add_usage(total: dict, usage: dict | None):
+    if not usage:
+        return
+    for key in ("input_tokens", "output_tokens"):
+        total[key] = total.get(key, 0) + usage.get(key, 0)
+    details = usage.get("input_token_details") or {}
+    if details:
+        mine = total.setdefault("input_token_details", {})
+        for key in ("cache_read", "cache_creation"):
+            mine[key] = mine.get(key, 0) + (details.get(key) or 0)
@@ -1,18 +1,17 @@
-"""Factory for creating specialist subagent definitions from YAML config."""
+"""Factory for creating specialist subagent definitions from YAML config.
 
-from pathlib import Path
+All of these read the cached snapshot in ``agents.registry``; agents.yaml is
+parsed once (and again only when it changes on disk).
+"""
 
-import yaml
+import copy
 
-from agents.tools import resolve_tools
-
-CONFIG_PATH = Path(__file__).parent.parent / "config" / "agents.yaml"
+from agents.registry import registry
 
 
 def load_agent_configs() -> dict:
-    """Load all agent configurations from agents.yaml."""
-    with open(CONFIG_PATH) as f:
-        return yaml.safe_load(f)
+    """Return the parsed agents.yaml (a copy, safe to modify)."""
+    return copy.deepcopy(registry.get().agents_raw)
 
 
 def build_subagent_defs() -> list[dict]:
@@ -21,36 +20,14 @@ def build_subagent_defs() -> list[dict]:
     Returns a list of dicts suitable for passing to
     create_deep_agent(subagents=[...]).
     """
-    raw = load_agent_configs()
-    default_model = raw.get("defaults", {}).get("model", "claude-haiku-4-5-20251001")
-    agents = raw.get("agents", {})
-
-    subagent_defs = []
-    for agent_id, cfg in agents.items():
-        tool_names = cfg.get("tools", [])
-        tools = resolve_tools(tool_names)
-
-        subagent_defs.append({
-            "name": agent_id,
-            "description": cfg["description"],
-            "system_prompt": cfg["system_prompt"].strip(),
-            "tools": tools,
-            "model": cfg.get("model") or default_model,
-        })
-
-    return subagent_defs
+    return [dict(d) for d in registry.get().subagent_defs]
 
 
 def get_agent_ids() -> list[str]:
     """Return the list of specialist agent IDs from config."""
-    raw = load_agent_configs()
-    return list(raw.get("agents", {}).keys())
+    return registry.get().agent_ids
 
 
 def get_agent_labels() -> dict[str, str]:
     """Return a mapping of agent_id -> human-readable label."""
-    raw = load_agent_configs()
-    return {
-        aid: cfg["label"]
-        for aid, cfg in raw.get("agents", {}).items()
-    }
+    return dict(registry.get().agent_labels)
@@ -0,0 +1,191 @@
+"""Speculative specialist dispatch from the founder's first message.
+
+With ``DISPATCH_MODE=direct`` a specialist starts once the orchestrator
+has recorded its questions as answered, so never before the orchestrator's
+first reply (usually a follow-up question) is finished. Yet many founders
+put the idea, the customer and the pricing in their very first message.
+With ``SPECULATIVE_DISPATCH=1`` the server estimates which questions.yaml
+slots that message fills, locally and without a model call: a slot is
+filled when a sentence matches one of its question's ``signals``. Every
+specialist that would be due on those slots (agents.fanout's
+``pending_specialists``) starts at once, alongside that first reply.
+
+A speculative run is held. Its events are buffered and its result is not
+written to the session. When the specialist falls due it is adopted if
+its slots (the required questions and those that trigger it) have not
+changed since the first message: later messages added no sentence with
+their signals, and the orchestrator recorded none of them for a later
+message. An adopted run's buffered events are delivered at once and the
+rest follow like any other job's. Otherwise it is cancelled as soon as the
+change is seen, and the specialist starts normally when due, with the full
+context.
+
+``speculation_stats`` counts started, adopted and cancelled runs per
+agent, the hit rate and the head start adopted runs got over a normal
+dispatch; see ``/api/metrics``.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable
+
+from agents.fanout import pending_specialists
+from agents.registry import ConfigSnapshot, registry
+
+SPECULATIVE_DISPATCH = os.environ.get("SPECULATIVE_DISPATCH", "0").lower() in ("1", "true", "yes")
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def sentences(text: str) -> list[str]:
+    return [s.strip() for s in _SENTENCE.split(text) if s.strip()]
+
+
+def slot_evidence(texts: list[str], config: ConfigSnapshot | None = None) -> dict[str, tuple[str, ...]]:
+    """Question id -> the sentences of ``texts`` matching its signals, for
+    every question that seems answered."""
+    config = config or registry.get()
+    split = [s for text in texts for s in sentences(text)]
+    evidence = {}
+    for qid, patterns in config.slot_signals.items():
+        found = tuple(s for s in split if any(p.search(s) for p in patterns))
+        if found:
+            evidence[qid] = found
+    return evidence
+
+
+def agent_slots(agent_id: str, config: ConfigSnapshot) -> frozenset[str]:
+    """The questions a specialist's dispatch depends on."""
+    return config.required_questions | config.agent_triggers.get(agent_id, frozenset())
+
+
+def fingerprint(evidence: dict[str, tuple[str, ...]], slots: frozenset[str]) -> str:
+    doc = json.dumps({qid: evidence.get(qid, ()) for qid in sorted(slots)})
+    return hashlib.sha256(doc.encode()).hexdigest()[:16]
+
+
+def speculative_specialists(texts: list[str], config: ConfigSnapshot | None = None) -> dict[str, str]:
+    """Specialists due on the slots ``texts`` seem to fill, each with the
+    fingerprint of its slots' evidence."""
+    config = config or registry.get()
+    evidence = slot_evidence(texts, config)
+    due = pending_specialists(set(evidence), set(), config=config)
+    return {aid: fingerprint(evidence, agent_slots(aid, config)) for aid in due}
+
+
+class Speculation:
+    """One held run. It stands in for the session while the run is held:
+    the result (or timeout) it stores is kept back until ``adopt()``."""
+
+    def __init__(self, session, agent_id: str, fingerprint: str, clock: Callable[[], float] = time.monotonic):
+        self.session = session
+        self.agent_id = agent_id
+        self.fingerprint = fingerprint
+        self.started = clock()
+        self.adopted = False
+        self._writes: list[Callable[[], None]] = []
+
+    @property
+    def session_id(self) -> str:
+        return self.session.session_id
+
+    @property
+    def thread_id(self) -> str:
+        return self.session.thread_id
+
+    def _write(self, write: Callable[[], None]):
+        if self.adopted:
+            write()
+        else:
+            self._writes.append(write)
+
+    def store_agent_result(self, agent_id: str, result: dict | str):
+        self._write(lambda: self.session.store_agent_result(agent_id, result))
+
+    def store_agent_timeout(self, agent_id: str, deadline: float):
+        self._write(lambda: self.session.store_agent_timeout(agent_id, deadline))
+
+    def adopt(self):
+        self.adopted = True
+        for write in self._writes:
+            write()
+        self._writes.clear()
+
+
+class SessionSpeculations:
+    """The held runs of one session."""
+
+    def __init__(self):
+        self.runs: dict[str, Speculation] = {}
+        # What the orchestrator recorded after the first message.
+        self.first_answers: frozenset[str] | None = None
+
+    def stale(self, texts: list[str], answered: set[str], config: ConfigSnapshot | None = None) -> list[str]:
+        """Held runs whose slots changed since the first message.
+
+        The first call, made after the orchestrator's first reply, takes
+        ``answered`` as what the first message answered.
+        """
+        config = config or registry.get()
+        if self.first_answers is None:
+            self.first_answers = frozenset(answered)
+        later = set(answered) - self.first_answers
+        evidence = slot_evidence(texts, config)
+        return [
+            aid for aid, run in self.runs.items()
+            if agent_slots(aid, config) & later
+            or fingerprint(evidence, agent_slots(aid, config)) != run.fingerprint
+        ]
+
+
+class SpeculationStats:
+    """Speculative runs started, adopted and cancelled, per agent."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(int))
+
+    def _count(self, agent: str, key: str, amount: float = 1):
+        with self._lock:
+            self._counts[agent][key] += amount
+
+    def started(self, agent: str):
+        self._count(agent, "started")
+
+    def adopted(self, agent: str, head_start: float):
+        """``head_start``: seconds between the speculative start and when
+        the specialist fell due."""
+        self._count(agent, "adopted")
+        self._count(agent, "head_start_s", head_start)
+
+    def cancelled(self, agent: str):
+        self._count(agent, "cancelled")
+
+    def info(self) -> dict:
+        with self._lock:
+            agents = {agent: _summary(counts) for agent, counts in self._counts.items()}
+            total = defaultdict(int)
+            for counts in self._counts.values():
+                for key, value in counts.items():
+                    total[key] += value
+        return {"enabled": SPECULATIVE_DISPATCH, **_summary(total), "agents": agents}
+
+
+def _summary(counts: dict) -> dict:
+    adopted, cancelled = counts.get("adopted", 0), counts.get("cancelled", 0)
+    settled = adopted + cancelled
+    return {
+        "started": counts.get("started", 0),
+        "adopted": adopted,
+        "cancelled": cancelled,
+        "hit_rate": round(adopted / settled, 3) if settled else None,
+        "head_start_s": round(counts.get("head_start_s", 0.0), 3),
+    }
+
+
+speculation_stats = SpeculationStats()
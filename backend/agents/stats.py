@@ -0,0 +1,14 @@
+"""Helpers shared by the process-wide stats that ``/api/metrics`` reports."""
+
+
+def percentile(values, q: float) -> float | None:
+    """The ``q`` quantile (0-1) of ``values`` by nearest rank; None when empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def ms(seconds: float | None) -> float | None:
+    """Seconds as milliseconds, rounded for a report."""
+    return None if seconds is None else round(seconds * 1000, 1)
@@ -1,13 +1,18 @@
 import os
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
 
-from tavily import TavilyClient
+from agents.providers import CircuitOpen, guards, retryable
 
+if TYPE_CHECKING:
+    from tavily import TavilyClient
 
-def _get_tavily_client() -> TavilyClient | None:
+
+def _get_tavily_client() -> "TavilyClient | None":
     api_key = os.environ.get("TAVILY_API_KEY")
     if not api_key:
         return None
+    from tavily import TavilyClient  # imported on first search, not at startup
+
     return TavilyClient(api_key=api_key)
 
 
@@ -24,15 +29,26 @@ def web_search(
     """
     client = _get_tavily_client()
     if client is None:
-        return (
-            f"[Web search unavailable — TAVILY_API_KEY not set] "
-            f"Query was: {query}. Provide analysis based on your training data instead."
-        )
-    return client.search(
-        query,
-        max_results=max_results,
-        include_raw_content=include_raw_content,
-        topic=topic,
+        return _unavailable(query, "TAVILY_API_KEY not set")
+    try:
+        return guards["tavily"].call(lambda: client.search(
+            query,
+            max_results=max_results,
+            include_raw_content=include_raw_content,
+            topic=topic,
+        ))
+    except CircuitOpen:
+        return _unavailable(query, "search provider failing, circuit open")
+    except Exception as exc:
+        if not retryable(exc):
+            raise
+        return _unavailable(query, f"search provider busy: {type(exc).__name__}")
+
+
+def _unavailable(query: str, reason: str) -> str:
+    return (
+        f"[Web search unavailable — {reason}] "
+        f"Query was: {query}. Provide analysis based on your training data instead."
     )
 
 
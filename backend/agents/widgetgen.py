@@ -0,0 +1,229 @@
+"""Parallel per-widget generation for widget-heavy specialists.
+
+A specialist answers with one JSON document whose ``widgets`` object holds
+its visualizations. ``gtm`` writes five of them after its analysis, several
+thousand output tokens in one completion, so its latency is mostly output
+length. With
+
+    agents:
+      gtm:
+        widget_mode: parallel     # default: single
+
+the agent runs in two phases instead:
+
+1. the research pass: the agent with its tools, asked for the same JSON
+   without ``widgets`` but with a ``notes`` field holding the figures the
+   charts will need;
+2. one model call per widget, all at once. Each gets the widget's entry
+   from the agent's own JSON contract as its template, the brief and the
+   research pass's answer, and must reply with that widget's JSON object
+   alone. A reply that is not an object of the template's ``vizType`` is
+   retried once, then the widget is left out.
+
+The replies are merged into the usual result shape (``notes`` dropped,
+widgets in the prompt's order), so ``agent_result``, the result cache and
+the frontend see no difference. Each widget is also emitted as a
+``{"widgets": {key: ...}}`` message as soon as its call returns, so
+``agent_widget`` events still arrive before the result.
+
+``parallel_widget_graph`` wraps the research agent built by
+``agents.fanout.build_specialist``, which both dispatch modes use. In the
+default mode the graph is handed to deepagents as a compiled subagent, so
+it runs without deepagents' own subagent middleware.
+"""
+
+import json
+import re
+import uuid
+from typing import Annotated, TypedDict
+
+from agents.promptcache import call_usage, prompt_cache_stats
+from agents.providers import guard_for
+
+SINGLE = "single"
+PARALLEL = "parallel"
+WIDGET_MODES = (SINGLE, PARALLEL)
+WIDGET_RETRIES = 1
+
+_WIDGETS = re.compile(r'"widgets"\s*:\s*\{')
+_ENTRY = re.compile(r'\s*"(\w+)"\s*:\s*\{')
+_COMMA = re.compile(r"\s*,")
+_VIZ_TYPE = re.compile(r'"vizType"\s*:\s*"(\w+)"')
+
+RESEARCH_NOTE = (
+    "Leave the `widgets` field out of your JSON: the visualizations are drawn "
+    "from your answer in a separate step. Instead, add a `notes` field (a "
+    "string) with every figure and fact they will need: sizes, prices, "
+    "percentages, channels, milestones, features and their rough values."
+)
+
+WIDGET_PROMPT = """You turn a specialist's finished analysis into one visualization for a startup report.
+
+Respond with ONLY the JSON object for the `{key}` widget. Start with {{ and end with }}; no fences, no commentary.
+Follow this template exactly. Keep "vizType": "{viz_type}" and replace every <placeholder> and "..." with real values drawn from the analysis:
+
+{template}"""
+
+
+def _close(text: str, start: int) -> int:
+    """Index just past the brace that closes ``text[start]``."""
+    depth = 0
+    for i in range(start, len(text)):
+        if text[i] == "{":
+            depth += 1
+        elif text[i] == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    raise ValueError("unbalanced braces in the JSON contract")
+
+
+def widget_templates(system_prompt: str) -> dict[str, str]:
+    """The entries of the ``widgets`` object in an agent's JSON contract, as
+    written in its prompt (placeholders and all), in order."""
+    match = _WIDGETS.search(system_prompt)
+    if match is None:
+        return {}
+    templates: dict[str, str] = {}
+    pos = match.end()
+    while (entry := _ENTRY.match(system_prompt, pos)) is not None:
+        end = _close(system_prompt, entry.end() - 1)
+        templates[entry.group(1)] = system_prompt[entry.end() - 1:end]
+        comma = _COMMA.match(system_prompt, end)
+        pos = comma.end() if comma else end
+    return templates
+
+
+def research_prompt(system_prompt: str) -> str:
+    """``system_prompt`` with ``widgets`` cut from its JSON contract and the
+    research pass's instructions appended."""
+    match = _WIDGETS.search(system_prompt)
+    head = system_prompt[:match.start()].rstrip().removesuffix(",")
+    tail = system_prompt[_close(system_prompt, match.end() - 1):]
+    return f"{head}{tail}\n\n{RESEARCH_NOTE}"
+
+
+def parse_widget_mode(value, system_prompt: str, where: str) -> str:
+    """An agent's ``widget_mode`` from agents.yaml; ``parallel`` needs a
+    ``widgets`` object in its JSON contract to split."""
+    mode = SINGLE if value is None else value
+    if mode not in WIDGET_MODES:
+        raise ValueError(f"{where}: expected one of {', '.join(WIDGET_MODES)}, got {value!r}")
+    if mode == PARALLEL and not widget_templates(system_prompt):
+        raise ValueError(f"{where}: parallel needs a `widgets` object in the system prompt's JSON contract")
+    return mode
+
+
+def _text(content) -> str:
+    if isinstance(content, list):
+        return "".join(b.get("text", "") if isinstance(b, dict) else str(b) for b in content)
+    return content or ""
+
+
+def json_object(text: str) -> dict | None:
+    """The first JSON object in ``text`` (fences and chatter around it are ignored)."""
+    start = text.find("{")
+    if start < 0:
+        return None
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text, start)
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def generate_widget(model, agent: str, key: str, template: str, brief: str, analysis: str) -> dict | None:
+    """One widget from ``template``; None if no valid reply came back."""
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    match = _VIZ_TYPE.search(template)
+    viz_type = match.group(1) if match else None
+    messages = [
+        SystemMessage(WIDGET_PROMPT.format(key=key, viz_type=viz_type, template=template)),
+        HumanMessage(f"Brief:\n{brief}\n\nAnalysis:\n{analysis}"),
+    ]
+    guard = guard_for(model)
+    for _ in range(1 + WIDGET_RETRIES):
+        # Not streamed token by token; the finished widget is emitted as one message.
+        call = lambda: model.invoke(messages, config={"tags": ["nostream"]})  # noqa: E731
+        reply = call() if guard is None else guard.call(call)
+        usage = call_usage(agent, reply)
+        if usage is not None:
+            prompt_cache_stats.record(usage)
+        value = json_object(_text(reply.content))
+        if value is not None and value.get("vizType") == viz_type:
+            return value
+    return None
+
+
+def _merge(left: dict, right: dict) -> dict:
+    return {**left, **right}
+
+
+class _WidgetTask(TypedDict):
+    key: str
+    template: str
+    brief: str
+    analysis: str
+
+
+def parallel_widget_graph(agent_def: dict, research, model):
+    """``research`` (the agent, prompted with ``research_prompt``) followed
+    by one concurrent ``model`` call per widget and the merge."""
+    from langchain_core.messages import AIMessage
+    from langgraph.graph import END, START, StateGraph
+    from langgraph.graph.message import add_messages
+    from langgraph.types import Send
+
+    class Messages(TypedDict):
+        messages: Annotated[list, add_messages]
+
+    class State(Messages):
+        analysis: dict | None
+        widgets: Annotated[dict, _merge]
+
+    name = agent_def["name"]
+    templates = widget_templates(agent_def["system_prompt"])
+
+    def plan(state: State) -> dict:
+        return {"analysis": json_object(_text(state["messages"][-1].content))}
+
+    def fan_out(state: State):
+        if state["analysis"] is None:
+            return "merge"  # no JSON to draw from; the research answer stands
+        brief = next((_text(m.content) for m in state["messages"] if getattr(m, "type", "") == "human"), "")
+        analysis = json.dumps(state["analysis"])
+        return [Send("widget", _WidgetTask(key=k, template=t, brief=brief, analysis=analysis))
+                for k, t in templates.items()]
+
+    def widget(task: _WidgetTask) -> dict:
+        value = generate_widget(model, name, task["key"], task["template"], task["brief"], task["analysis"])
+        if value is None:
+            return {"widgets": {}}
+        piece = {"widgets": {task["key"]: value}}
+        return {"widgets": piece["widgets"], "messages": [AIMessage(json.dumps(piece), name=name, id=str(uuid.uuid4()))]}
+
+    def merge(state: State) -> dict:
+        if state["analysis"] is None:
+            return {}
+        result = {k: v for k, v in state["analysis"].items() if k not in ("notes", "widgets")}
+        result["widgets"] = {k: state["widgets"][k] for k in templates if k in state["widgets"]}
+        return {"messages": [AIMessage(json.dumps(result), name=name, id=str(uuid.uuid4()))]}
+
+    builder = StateGraph(State, input_schema=Messages, output_schema=Messages)
+    builder.add_node("research", research)
+    builder.add_node("plan", plan)
+    builder.add_node("widget", widget)
+    builder.add_node("merge", merge)
+    builder.add_edge(START, "research")
+    builder.add_edge("research", "plan")
+    builder.add_conditional_edges("plan", fan_out, ["widget", "merge"])
+    builder.add_edge("widget", "merge")
+    builder.add_edge("merge", END)
+    # Tagged like create_agent's graphs, so WidgetStreamer attributes the chunks.
+    # The default thread pool is sized by CPU count; every widget needs a worker.
+    return builder.compile(name=name).with_config({
+        "recursion_limit": 10_000,
+        "max_concurrency": len(templates) + 1,
+        "metadata": {"lc_agent_name": name},
+    })
@@ -0,0 +1,121 @@
+"""Concurrency benchmark for the /api/chat streaming path.
+
+Drives N simultaneous sessions through ``main._stream_turn`` against a fake
+orchestrator whose ``stream()`` blocks like a real LLM call (time.sleep between
+tokens), and compares it with the old pattern of iterating the sync stream
+directly inside the async generator.
+
+No API keys or network needed.
+
+Usage:
+    uv run python -m benchmarks.bench_concurrency
+    uv run python -m benchmarks.bench_concurrency --sessions 16 --tokens 20 --delay 0.02
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+from langchain_core.messages import AIMessageChunk
+
+import main
+from sessions.manager import SessionManager
+
+
+class FakeOrchestrator:
+    """Mimics ``CompiledStateGraph.stream(stream_mode="messages")`` with blocking waits."""
+
+    def __init__(self, tokens: int, delay: float):
+        self.tokens = tokens
+        self.delay = delay
+
+    def stream(self, input_msg, config=None, stream_mode="messages", subgraphs=False):
+        for i in range(self.tokens):
+            time.sleep(self.delay)
+            chunk = AIMessageChunk(content=f"tok{i} "), {"langgraph_node": "model"}
+            yield ((), chunk) if subgraphs else chunk
+
+
+async def _naive_turn(session, message: str):
+    """The pre-bridge pattern: a sync iterator consumed inside an async generator."""
+    config = {"configurable": {"thread_id": session.thread_id}}
+    for chunk, _ in main._orchestrator.stream(
+        {"messages": [{"role": "user", "content": message}]},
+        config=config,
+        stream_mode="messages",
+    ):
+        yield "message", {"content": chunk.content, "node": "model"}
+    yield "done", {"status": "complete"}
+
+
+async def _run(turn_fn, sessions: int) -> dict:
+    mgr = SessionManager()
+    order: list[int] = []
+    ticks: list[float] = []
+
+    async def consume(idx: int):
+        session = mgr.create_session()
+        async for name, _ in turn_fn(session, "benchmark"):
+            if name == "message":
+                order.append(idx)
+
+    async def ticker():
+        # Stand-in for /health: the loop should get a turn every ~5ms.
+        while True:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.005)
+
+    t0 = time.perf_counter()
+    tick = asyncio.create_task(ticker())
+    await asyncio.gather(*(consume(i) for i in range(sessions)))
+    t1 = time.perf_counter()
+    elapsed = t1 - t0
+    tick.cancel()
+
+    marks = [t0, *ticks, t1]
+    max_gap = max(b - a for a, b in zip(marks, marks[1:]))
+
+    head = order[: sessions * 2]
+    switches = sum(1 for a, b in zip(head, head[1:]) if a != b)
+    return {
+        "elapsed": elapsed,
+        "switches": switches,
+        "head": head,
+        "max_gap": max_gap,
+    }
+
+
+def _report(name: str, result: dict, ideal: float):
+    print(f"\n{name}")
+    print(f"  wall time        {result['elapsed']:.2f}s  (one session alone: {ideal:.2f}s)")
+    print(f"  max loop stall   {result['max_gap'] * 1000:.0f}ms")
+    print(f"  first events     {result['head']}")
+    print(f"  session switches {result['switches']} in first {len(result['head'])} events")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Concurrent SSE session benchmark")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--tokens", type=int, default=10)
+    parser.add_argument("--delay", type=float, default=0.05,
+                        help="Blocking wait per streamed token, in seconds")
+    args = parser.parse_args()
+
+    main._orchestrator = FakeOrchestrator(args.tokens, args.delay)
+    ideal = args.tokens * args.delay
+
+    print(f"{args.sessions} sessions x {args.tokens} tokens x {args.delay * 1000:.0f}ms blocking wait")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        naive = asyncio.run(_run(_naive_turn, args.sessions))
+        bridged = asyncio.run(_run(main._stream_turn, args.sessions))
+
+    _report("sync stream inside async generator (before)", naive, ideal)
+    _report("worker-thread bridge (main._stream_turn)", bridged, ideal)
+    print(f"\nspeedup: {naive['elapsed'] / bridged['elapsed']:.1f}x")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,102 @@
+"""Throughput of specialist-result JSON extraction.
+
+Runs every file in ``benchmarks/corpus/`` (recorded specialist outputs: bare
+JSON, fenced, preamble with braces, trailing prose, truncated at max_tokens)
+through:
+
+- legacy: the previous ``main._extract_json`` (whole-text ``json.loads``, then
+  a fence regex, then a first-``{``/last-``}`` slice)
+- scanner: ``streaming.jsonextract.extract_json``
+
+and reports MB/s per file plus which recovery path each one took. The two
+are about level in total; the scanner's gain is the samples legacy fails.
+
+Usage:
+    uv run python -m benchmarks.bench_jsonextract
+    uv run python -m benchmarks.bench_jsonextract --repeat 2000 --scale 8
+"""
+
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+
+from streaming.jsonextract import extract_json
+
+CORPUS = Path(__file__).parent / "corpus"
+
+
+def legacy_extract_json(text: str) -> dict | None:
+    """The pre-scanner implementation, verbatim."""
+    stripped = text.strip()
+    try:
+        return json.loads(stripped)
+    except (json.JSONDecodeError, ValueError):
+        pass
+
+    fence_match = re.search(r"```(?:json)?\s*\n(.*?)```", stripped, re.DOTALL)
+    if fence_match:
+        try:
+            return json.loads(fence_match.group(1).strip())
+        except (json.JSONDecodeError, ValueError):
+            pass
+
+    first_brace = stripped.find("{")
+    if first_brace >= 0:
+        last_brace = stripped.rfind("}")
+        if last_brace > first_brace:
+            try:
+                return json.loads(stripped[first_brace : last_brace + 1])
+            except (json.JSONDecodeError, ValueError):
+                pass
+
+    return None
+
+
+def _scaled(text: str, scale: int) -> str:
+    """Grow a sample by repeating its bullet list, keeping its framing intact."""
+    if scale <= 1:
+        return text
+    return re.sub(r'("bullets": \[)(.*?)(\n\s*\])',
+                  lambda m: m.group(1) + ",".join([m.group(2)] * scale) + m.group(3),
+                  text, count=1, flags=re.DOTALL)
+
+
+def _time(fn, text: str, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return time.perf_counter() - t0
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Specialist JSON extraction benchmark")
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--scale", type=int, default=1,
+                        help="Repeat each sample's bullet list N times to grow payloads")
+    args = parser.parse_args()
+
+    samples = {p.name: _scaled(p.read_text(), args.scale) for p in sorted(CORPUS.glob("*.txt"))}
+    print(f"{len(samples)} samples × {args.repeat} runs\n")
+    print(f"{'sample':<34} {'bytes':>7} {'legacy MB/s':>12} {'scan MB/s':>10} {'legacy':>7} {'method':>9}")
+
+    totals = [0.0, 0.0, 0]
+    for name, text in samples.items():
+        size = len(text.encode()) * args.repeat / 1e6
+        legacy = _time(legacy_extract_json, text, args.repeat)
+        scan = _time(extract_json, text, args.repeat)
+        totals[0] += legacy
+        totals[1] += scan
+        totals[2] += len(text.encode())
+        legacy_ok = "ok" if legacy_extract_json(text) is not None else "FAIL"
+        result = extract_json(text)
+        print(f"{name:<34} {len(text.encode()):>7} {size / legacy:>12.1f} {size / scan:>10.1f} "
+              f"{legacy_ok:>7} {result.method:>9}")
+
+    mb = totals[2] * args.repeat / 1e6
+    print(f"\n{'total':<34} {totals[2]:>7} {mb / totals[0]:>12.1f} {mb / totals[1]:>10.1f}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,110 @@
+"""Per-token overhead of the server's debug logging.
+
+Feeds a synthetic token stream through ``main._log_text`` (the path every
+streamed orchestrator token takes) and reports the cost per token for:
+
+- legacy: per-character string building + ``print(..., flush=True)`` per token
+- sink at each verbosity level (off / summary / full)
+
+Output goes to a real file descriptor (os.devnull by default) so write and
+flush syscalls are counted. ``--writer-delay`` simulates a slow terminal to
+show the drop policy kicking in instead of stalling the event loop.
+
+Usage:
+    uv run python -m benchmarks.bench_logsink
+    uv run python -m benchmarks.bench_logsink --tokens 50000 --writer-delay 0.002
+"""
+
+import argparse
+import os
+import time
+
+import main
+from streaming.logsink import LEVELS, LogSink
+
+
+class _Terminal:
+    """File wrapper that optionally sleeps on every write, like a slow tty."""
+
+    def __init__(self, path: str, delay: float):
+        self._f = open(path, "w")
+        self.delay = delay
+
+    def write(self, text: str):
+        if self.delay:
+            time.sleep(self.delay)
+        return self._f.write(text)
+
+    def flush(self):
+        self._f.flush()
+
+
+def _tokens(n: int) -> list[str]:
+    words = ["The", " market", " for", " fleet", " emissions", " tracking", " is", " growing", ".\n"]
+    return [words[i % len(words)] for i in range(n)]
+
+
+def _legacy_log_text(color: str, text: str, state: list[bool], out):
+    """The pre-sink implementation, verbatim apart from the output stream."""
+    s = ""
+    for ch in text:
+        if state[0]:
+            s += f"{color}│ {main.C.RESET}"
+            state[0] = False
+        if ch == "\n":
+            s += ch
+            state[0] = True
+        else:
+            s += ch
+    print(s, end="", flush=True, file=out)
+
+
+def bench_legacy(tokens: list[str], terminal: _Terminal) -> float:
+    state = [True]
+    color = main._color_for("model")
+    t0 = time.perf_counter()
+    for tok in tokens:
+        _legacy_log_text(color, tok, state, terminal)
+    return time.perf_counter() - t0
+
+
+def bench_sink(tokens: list[str], terminal: _Terminal, level: int) -> tuple[float, float, LogSink]:
+    sink = LogSink(level=level, stream=terminal)
+    main._sink = sink
+    t0 = time.perf_counter()
+    for tok in tokens:
+        main._log_text("model", tok)
+    hot_path = time.perf_counter() - t0
+    sink.close(timeout=30)
+    drained = time.perf_counter() - t0
+    return hot_path, drained, sink
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Debug log sink overhead benchmark")
+    parser.add_argument("--tokens", type=int, default=20_000)
+    parser.add_argument("--writer-delay", type=float, default=0.0,
+                        help="Seconds each terminal write takes (simulated slow terminal)")
+    parser.add_argument("--output", default=os.devnull)
+    args = parser.parse_args()
+
+    tokens = _tokens(args.tokens)
+    print(f"{args.tokens} tokens → {args.output}, writer delay {args.writer_delay * 1000:.1f}ms\n")
+    print(f"{'mode':<18} {'ns/token (hot path)':>20} {'drain total':>12} {'writes':>8} {'dropped':>8}")
+
+    legacy_tokens = tokens if not args.writer_delay else tokens[: max(1, len(tokens) // 20)]
+    elapsed = bench_legacy(legacy_tokens, _Terminal(args.output, args.writer_delay))
+    per = elapsed / len(legacy_tokens) * 1e9
+    note = "" if legacy_tokens is tokens else f"  (sampled {len(legacy_tokens)} tokens)"
+    print(f"{'legacy print':<18} {per:>20.0f} {'—':>12} {len(legacy_tokens):>8} {0:>8}{note}")
+
+    for name, level in LEVELS.items():
+        hot, drained, sink = bench_sink(tokens, _Terminal(args.output, args.writer_delay), level)
+        print(
+            f"{'sink ' + name:<18} {hot / len(tokens) * 1e9:>20.0f} "
+            f"{drained:>11.2f}s {sink.batches:>8} {sink.dropped:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
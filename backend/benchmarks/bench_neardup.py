@@ -0,0 +1,106 @@
+"""Near-duplicate index: signing, insert and query cost at scale, and recall.
+
+Fills a ``NearDuplicateIndex`` with ``--entries`` synthetic idea contexts
+(sentences of idea-like length over a synthetic vocabulary of
+``--vocab`` words, so unrelated contexts share few shingles), then measures:
+
+- sign: one MinHash signature of a context
+- add: indexing one context
+- query: looking up a reworded copy of an indexed context (should match)
+  and an unrelated context (should not), with the mean number of LSH
+  candidates actually compared
+- recall: share of reworded copies (one word changed) found at the threshold
+- memory: traced allocation growth per entry over the first ``--traced``
+  inserts (tracing slows inserts down, so the rest run untraced)
+
+Usage:
+    uv run python -m benchmarks.bench_neardup
+    uv run python -m benchmarks.bench_neardup --entries 200000 --threshold 0.85
+"""
+
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from agents.neardup import NEAR_DUP_THRESHOLD, NearDuplicateIndex, signature
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def _vocabulary(rng: random.Random, size: int) -> list[str]:
+    return ["".join(rng.choices(LETTERS, k=rng.randint(3, 9))) for _ in range(size)]
+
+
+def _context(rng: random.Random, words: list[str], n_words: int = 40) -> str:
+    return " ".join(rng.choices(words, k=n_words))
+
+
+def _reword(rng: random.Random, words: list[str], text: str) -> str:
+    said = text.split()
+    said[rng.randrange(len(said))] = rng.choice(words)
+    return " ".join(said)
+
+
+def _ms(samples: list[float]) -> str:
+    return f"{statistics.median(samples) * 1000:.3f}"
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Near-duplicate index benchmark")
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--vocab", type=int, default=5_000)
+    parser.add_argument("--traced", type=int, default=5_000)
+    parser.add_argument("--threshold", type=float, default=NEAR_DUP_THRESHOLD or 0.9)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    words = _vocabulary(rng, args.vocab)
+    contexts = [_context(rng, words) for _ in range(args.entries)]
+    index = NearDuplicateIndex(threshold=args.threshold, max_entries=args.entries)
+
+    traced = min(args.traced, args.entries)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(traced):
+        index.add("market", contexts[i], f"k{i}")
+    per_entry = (tracemalloc.get_traced_memory()[0] - before) / traced
+    tracemalloc.stop()
+    add_times = []
+    for i in range(traced, args.entries):
+        t0 = time.perf_counter()
+        index.add("market", contexts[i], f"k{i}")
+        add_times.append(time.perf_counter() - t0)
+
+    sign_times, near_times, far_times = [], [], []
+    found = 0
+    sample = rng.sample(range(args.entries), min(args.queries, args.entries))
+    candidates_before = index.stats["candidates"]
+    for i in sample:
+        reworded = _reword(rng, words, contexts[i])
+        t0 = time.perf_counter()
+        signature(reworded)
+        sign_times.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        matches = index.query("market", reworded)
+        near_times.append(time.perf_counter() - t0)
+        found += any(m.key == f"k{i}" for m in matches)
+    for _ in sample:
+        t0 = time.perf_counter()
+        index.query("market", _context(rng, words))
+        far_times.append(time.perf_counter() - t0)
+    compared = (index.stats["candidates"] - candidates_before) / (2 * len(sample))
+
+    print(f"entries {args.entries}, threshold {args.threshold}, {len(sample)} queries")
+    print(f"{'sign ms':>10} {'add ms':>10} {'near q ms':>10} {'far q ms':>10} {'cand/q':>8} {'B/entry':>8} {'recall':>7}")
+    print(
+        f"{_ms(sign_times):>10} {_ms(add_times or [0]):>10} {_ms(near_times):>10} {_ms(far_times):>10} "
+        f"{compared:>8.1f} {per_entry:>8.0f} {found / len(sample):>7.1%}"
+    )
+
+
+if __name__ == "__main__":
+    main_cli()
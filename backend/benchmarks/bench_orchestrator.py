@@ -0,0 +1,49 @@
+"""Cost of starting a new orchestrator session.
+
+Compares compiling the deep-agent graph from scratch (what every CLI
+``/new`` and test fixture used to do) with binding the shared, precompiled
+``OrchestratorTemplate`` to a fresh checkpointer.
+
+No API keys or network needed: nothing is invoked.
+
+Usage:
+    uv run python -m benchmarks.bench_orchestrator
+    uv run python -m benchmarks.bench_orchestrator --builds 5 --binds 1000
+"""
+
+import argparse
+import time
+
+from langgraph.checkpoint.memory import MemorySaver
+
+from agents.orchestrator import OrchestratorTemplate, create_orchestrator, warmup
+from agents.registry import registry
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Orchestrator build vs bind benchmark")
+    parser.add_argument("--builds", type=int, default=3)
+    parser.add_argument("--binds", type=int, default=200)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    template = warmup()
+    print(f"warmup (first build, incl. lazy imports): {(time.perf_counter() - t0) * 1000:8.1f} ms")
+
+    config = registry.get()
+    builds = []
+    for _ in range(args.builds):
+        builds.append(OrchestratorTemplate(config).build_seconds)
+    print(f"full graph build (avg of {args.builds}):        {sum(builds) / len(builds) * 1000:8.1f} ms")
+
+    t0 = time.perf_counter()
+    for _ in range(args.binds):
+        create_orchestrator(checkpointer=MemorySaver())
+    per_bind = (time.perf_counter() - t0) / args.binds
+    print(f"bind template (avg of {args.binds}):            {per_bind * 1000:8.3f} ms")
+    print(f"\nspeedup per new session: {sum(builds) / len(builds) / per_bind:,.0f}x "
+          f"(template v{template.version})")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,216 @@
+"""Prompt-cache breakpoints, checked offline on the outgoing request payloads.
+
+Builds the real orchestrator (both dispatch modes) and specialist graphs,
+replaces ``ChatAnthropic._create`` with a stub that records each payload
+and answers from a simulated Anthropic prompt cache, then runs:
+
+- two sessions of two turns each through the orchestrator (in ``llm``
+  mode the first turn dispatches ``--agent`` through the task tool), and
+- the direct-dispatch ``--agent`` specialist on two different briefs.
+
+The simulated cache follows the documented rules closely enough to compare
+layouts: a prefix is written at each ``cache_control`` block that is at
+least the model's minimum cacheable length, and a later request reads the
+longest written prefix it starts with. Tokens are estimated at 4 characters
+each. The same runs are repeated with the system breakpoint disabled (only
+deepagents' last-message breakpoint) for comparison.
+
+Per agent it prints calls, estimated static prefix tokens against the
+model's minimum, and simulated cache read / write / uncached input tokens.
+Exits non-zero if a payload whose static prefix clears the minimum lacks a
+system breakpoint, or one below it carries a breakpoint that cannot hit.
+
+Usage:
+    uv run python -m benchmarks.bench_promptcache
+    uv run python -m benchmarks.bench_promptcache --agent risks
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from collections import defaultdict
+
+from agents import fanout, orchestrator, promptcache
+from agents.promptcache import min_cacheable_tokens as _min_tokens
+from agents.registry import registry
+
+SESSIONS = (
+    ("I have an idea for a bookkeeping app for freelance designers.", "Solo designers in the US."),
+    ("A CRM for independent dental clinics.", "Clinics with one to three dentists."),
+)
+
+
+def _tokens(block: dict) -> int:
+    return max(1, len(json.dumps(block)) // 4)
+
+
+def _blocks(payload: dict) -> list[dict]:
+    """The payload in cache order (tools, system, messages), one dict per block."""
+    blocks = list(payload.get("tools") or [])
+    system = payload.get("system") or []
+    blocks += [{"type": "text", "text": system}] if isinstance(system, str) else system
+    for message in payload["messages"]:
+        content = message["content"]
+        blocks += [{"type": "text", "text": content}] if isinstance(content, str) else content
+    return blocks
+
+
+class SimulatedPromptCache:
+    def __init__(self):
+        self.written: set[str] = set()
+
+    def usage(self, payload: dict) -> tuple[int, int, int]:
+        """(cache_read, cache_write, uncached) input tokens of ``payload``."""
+        minimum = _min_tokens(payload["model"])
+        digest = hashlib.sha256(payload["model"].encode())
+        read = running = 0
+        marks = []
+        for block in _blocks(payload):
+            digest.update(json.dumps({k: v for k, v in block.items() if k != "cache_control"}).encode())
+            running += _tokens(block)
+            key = digest.hexdigest()
+            if key in self.written:
+                read = running
+            if "cache_control" in block and running >= minimum:
+                marks.append((running, key))
+        write = 0
+        for tokens, key in marks:
+            if key not in self.written:
+                self.written.add(key)
+                write = max(write, tokens - read)
+        return read, write, running - read - write
+
+
+def _events(message):
+    """``message`` as the server-sent events of a streaming response (routed
+    models always stream)."""
+    from anthropic.types import (
+        MessageDeltaUsage, RawContentBlockDeltaEvent, RawContentBlockStartEvent, RawContentBlockStopEvent,
+        RawMessageDeltaEvent, RawMessageStartEvent, RawMessageStopEvent, TextDelta,
+    )
+    from anthropic.types.raw_message_delta_event import Delta
+
+    yield RawMessageStartEvent(type="message_start", message=message.model_copy(update={"content": []}))
+    for i, block in enumerate(message.content):
+        yield RawContentBlockStartEvent(type="content_block_start", index=i, content_block=block)
+        if block.type == "text":
+            yield RawContentBlockDeltaEvent(
+                type="content_block_delta", index=i, delta=TextDelta(type="text_delta", text=block.text)
+            )
+        yield RawContentBlockStopEvent(type="content_block_stop", index=i)
+    yield RawMessageDeltaEvent(
+        type="message_delta", delta=Delta(stop_reason=message.stop_reason),
+        usage=MessageDeltaUsage(**message.usage.model_dump(include=set(MessageDeltaUsage.model_fields))),
+    )
+    yield RawMessageStopEvent(type="message_stop")
+
+
+def _run(agent_id: str, system_breakpoint: bool) -> tuple[dict, list[dict]]:
+    from anthropic.types import Message, TextBlock, ToolUseBlock, Usage
+    from langchain_anthropic import ChatAnthropic
+
+    cache = SimulatedPromptCache()
+    payloads: list[dict] = []
+
+    def create(self, payload):
+        payloads.append(payload)
+        read, write, uncached = cache.usage(payload)
+        tools = {t.get("name") for t in payload.get("tools") or []}
+        answered = any(
+            isinstance(m["content"], list) and any(b.get("type") == "tool_result" for b in m["content"])
+            for m in payload["messages"]
+        )
+        system = payload.get("system") or []
+        system = system if isinstance(system, str) else "".join(b["text"] for b in system)
+        llm_mode = "task" in tools and "Do NOT dispatch" not in system
+        if llm_mode and not answered and len(payload["messages"]) == 1:
+            content = [ToolUseBlock(type="tool_use", id=f"call_{len(payloads)}", name="task",
+                                    input={"subagent_type": agent_id, "description": "Analyze the idea."})]
+        else:
+            content = [TextBlock(type="text", text="ok")]
+        message = Message(
+            id=f"msg_{len(payloads)}", type="message", role="assistant", model=payload["model"],
+            content=content, stop_reason="end_turn",
+            usage=Usage(input_tokens=uncached, output_tokens=1,
+                        cache_read_input_tokens=read, cache_creation_input_tokens=write),
+        )
+        return _events(message) if payload.get("stream") else message
+
+    stats = promptcache.PromptCacheStats()
+    original = (ChatAnthropic._create, promptcache.prompt_cache_stats, promptcache.mark_system)
+    ChatAnthropic._create = create
+    promptcache.prompt_cache_stats = stats
+    if not system_breakpoint:
+        promptcache.mark_system = lambda message, ttl=None: message
+    try:
+        orchestrator._templates.clear()
+        fanout._specialists = None
+        for mode in (fanout.LLM, fanout.DIRECT):
+            for session, turns in enumerate(SESSIONS):
+                graph = orchestrator.create_orchestrator(mode=mode)
+                # The result cache would answer the second session's dispatch.
+                config = {"configurable": {"thread_id": f"{mode}-{session}", "result_cache": False}}
+                for text in turns:
+                    graph.invoke({"messages": [{"role": "user", "content": text}]}, config)
+        specialist = fanout._build_specialists(registry.get())[agent_id]
+        for brief in (turns[0] for turns in SESSIONS):
+            specialist.invoke({"messages": [{"role": "user", "content": brief}]})
+    finally:
+        ChatAnthropic._create, promptcache.prompt_cache_stats, promptcache.mark_system = original
+        orchestrator._templates.clear()
+        fanout._specialists = None
+    return stats.info()["agents"], payloads
+
+
+def _static_prefix(payload: dict) -> int:
+    system = payload.get("system") or []
+    blocks = list(payload.get("tools") or []) + ([{"text": system}] if isinstance(system, str) else system)
+    return sum(_tokens(b) for b in blocks)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Prompt-cache breakpoint check (offline)")
+    parser.add_argument("--agent", default="market", help="Specialist to dispatch")
+    args = parser.parse_args()
+    if args.agent not in registry.get().agent_ids:
+        raise SystemExit(f"unknown agent {args.agent!r}; choose from {', '.join(registry.get().agent_ids)}")
+
+    results = {flag: _run(args.agent, flag) for flag in (True, False)}
+    _, payloads = results[True]
+
+    def marked(payload: dict) -> bool:
+        return any("cache_control" in b for b in payload.get("system") or [])
+
+    def fits(payload: dict) -> bool:
+        return _static_prefix(payload) >= _min_tokens(payload["model"])
+
+    unmarked = [p for p in payloads if fits(p) and not marked(p)]
+    wasted = [p for p in payloads if not fits(p) and marked(p)]
+    sizes: dict[str, tuple[str, int]] = defaultdict(lambda: ("", 0))
+    for payload in payloads:
+        tools = {t.get("name") for t in payload.get("tools") or []}
+        name = "orchestrator" if tools & {"task", "record_answers"} else args.agent
+        sizes[name] = (payload["model"], max(sizes[name][1], _static_prefix(payload)))
+
+    print(f"{len(payloads)} model calls, {len(unmarked)} cacheable without a system breakpoint, "
+          f"{len(wasted)} with one that cannot hit\n")
+    print(f"{'agent':<14} {'prefix tok':>10} {'min':>6}  {'breakpoints':<12} {'calls':>5} "
+          f"{'read':>8} {'write':>8} {'uncached':>8}")
+    for flag, label in ((True, "system+tail"), (False, "tail only")):
+        agents, _ = results[flag]
+        for name, t in agents.items():
+            model, prefix = sizes.get(name, ("", 0))
+            print(f"{name:<14} {prefix:>10} {_min_tokens(model):>6}  {label:<12} {t['calls']:>5} "
+                  f"{t['cache_read']:>8} {t['cache_write']:>8} "
+                  f"{t['input_tokens'] - t['cache_read'] - t['cache_write']:>8}")
+
+    short = [name for name, (model, prefix) in sizes.items() if prefix < _min_tokens(model)]
+    if short:
+        print(f"\nbelow the model's minimum cacheable length (no system breakpoint): {', '.join(short)}")
+    if unmarked or wasted:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,104 @@
+"""Cold-start time of the CLI and the API server, checked against a budget.
+
+Every sample is a fresh interpreter (``python -c ...``) so nothing is warm
+in ``sys.modules``. Targets:
+
+- import cli: what a short CLI batch job pays before doing anything
+- import main: what an API pod pays before uvicorn can bind
+- first session: import + config + orchestrator graph build + bind
+
+Reports the median of ``--runs`` samples and exits non-zero if any target is
+over its budget, so CI can track it. Budgets can be overridden per target
+(``--budget import_cli=300``) or scaled for slow machines (``--scale 2``).
+
+Usage:
+    uv run python -m benchmarks.bench_startup
+    uv run python -m benchmarks.bench_startup --runs 9 --budget import_main=800
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).parent.parent
+
+TARGETS = {
+    "import_cli": "import cli",
+    "import_main": "import main",
+    "first_session": "import cli; cli.create_orchestrator()",
+}
+
+# Milliseconds, median wall time including interpreter startup.
+BUDGETS_MS = {
+    "import_cli": 400,
+    "import_main": 1200,
+    "first_session": 6000,
+}
+
+# Modules that must not be loaded by a bare import of cli / main.
+HEAVY = ("deepagents", "langgraph", "langchain", "anthropic", "tavily", "langfuse")
+
+
+def _sample(code: str) -> float:
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=BACKEND, check=True)
+    return time.perf_counter() - t0
+
+
+def _heavy_modules(module: str) -> list[str]:
+    code = (
+        f"import sys, {module}; "
+        f"print(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, check=True,
+                         capture_output=True, text=True).stdout
+    return out.split()
+
+
+def _parse_budgets(pairs: list[str]) -> dict[str, float]:
+    budgets = dict(BUDGETS_MS)
+    for pair in pairs:
+        name, _, value = pair.partition("=")
+        if name not in TARGETS:
+            raise SystemExit(f"unknown target {name!r}; choose from {', '.join(TARGETS)}")
+        budgets[name] = float(value)
+    return budgets
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Cold-start budget benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", action="append", default=[], metavar="TARGET=MS")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiply every budget (for slower machines)")
+    args = parser.parse_args()
+    budgets = _parse_budgets(args.budget)
+
+    print(f"{'target':<16} {'median ms':>10} {'min ms':>8} {'budget':>8}  status")
+    over = []
+    for name, code in TARGETS.items():
+        samples = [_sample(code) * 1000 for _ in range(args.runs)]
+        median = statistics.median(samples)
+        budget = budgets[name] * args.scale
+        ok = median <= budget
+        if not ok:
+            over.append(name)
+        print(f"{name:<16} {median:>10.0f} {min(samples):>8.0f} {budget:>8.0f}  {'ok' if ok else 'OVER'}")
+
+    print()
+    for module in ("cli", "main"):
+        heavy = _heavy_modules(module)
+        if heavy:
+            over.append(f"import_{module}")
+        print(f"import {module} loads heavy deps: {', '.join(heavy) or 'none'}")
+
+    if over:
+        print(f"\nover budget: {', '.join(sorted(set(over)))}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
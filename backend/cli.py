@@ -2,15 +2,24 @@
 """Interactive CLI for testing the orchestrator agent in the terminal.
 
 Usage:
-    uv run python cli.py             # normal mode (clean output)
-    uv run python cli.py --debug     # debug mode (full agent trace)
+    uv run python cli.py                     # normal mode (clean output)
+    uv run python cli.py --debug             # debug mode (full agent trace)
+    uv run python cli.py --profile-startup   # time each startup phase and exit
+
+Importing this module is cheap: the LLM stack (deepagents, langgraph,
+langchain, anthropic) loads when the orchestrator graph is first built.
+
+The CLI always lets the orchestrator dispatch the specialists itself;
+DISPATCH_MODE=direct only applies to the API server.
 """
 
+import time
+
+_T_START = time.perf_counter()
+
 import argparse
-import json
 import os
 import sys
-import time
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -18,15 +27,14 @@ from dotenv import load_dotenv
 env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(env_path)
 
-if not os.environ.get("ANTHROPIC_API_KEY") or os.environ["ANTHROPIC_API_KEY"] == "your-api-key-here":
-    print("ERROR: Set your ANTHROPIC_API_KEY in .env before running.")
-    print(f"  File: {env_path}")
-    sys.exit(1)
-
-from agents.orchestrator import create_orchestrator
+from agents.fanout import LLM
+from agents.orchestrator import create_orchestrator, warmup
 from agents.observability import get_langfuse_handler, flush_langfuse, langfuse_config
 from agents.specialist import get_agent_labels
 from sessions.manager import SessionManager
+from streaming.toolcalls import TaskCallTracker
+
+_T_IMPORTED = time.perf_counter()
 
 # ---------------------------------------------------------------------------
 # ANSI colors
@@ -57,8 +65,6 @@ AGENT_COLORS = {
     "gtm":          C.WHITE,
 }
 
-AGENT_LABELS = get_agent_labels()
-
 def _color_for(node: str) -> str:
     for key, color in AGENT_COLORS.items():
         if key in node:
@@ -66,7 +72,7 @@ def _color_for(node: str) -> str:
     return C.DIM
 
 def _label_for(node: str) -> str:
-    for key, label in AGENT_LABELS.items():
+    for key, label in get_agent_labels().items():
         if key in node:
             return label
     if node == "model":
@@ -169,11 +175,9 @@ def stream_debug(agent, session, user_input: str) -> str:
     full_response = ""
     last_node = None
 
-    # Track task tool calls: accumulate JSON args per tool_call id
-    # so we can parse which specialist and what prompt when complete.
-    task_args_buffers: dict[str, str] = {}   # tool_call_id -> accumulated JSON
-    task_dispatched: set[str] = set()        # tool_call_ids already printed
-    current_tc_id: str | None = None
+    # Track task tool calls: scan JSON args per tool_call id as they stream
+    # so we know which specialist and what prompt without re-parsing.
+    tasks = TaskCallTracker()
 
     # Track results per tool_call_id
     task_result_count = 0
@@ -203,35 +207,13 @@ def stream_debug(agent, session, user_input: str) -> str:
                 if node == "model":
                     full_response += text
 
-            # 2) Tool call starts (has name + id)
-            tc = getattr(chunk, "tool_calls", None)
-            if tc:
-                for call in tc:
-                    name = call.get("name", "")
-                    tc_id = call.get("id", "")
-                    if name and tc_id:
-                        current_tc_id = tc_id
-                        task_args_buffers[tc_id] = ""
-
-            # 3) Tool call arg streaming (accumulate JSON)
-            tc_chunks = getattr(chunk, "tool_call_chunks", None)
-            if tc_chunks:
-                for tcc in tc_chunks:
-                    tc_id = tcc.get("id") or current_tc_id
-                    frag = tcc.get("args", "")
-                    if tc_id and frag:
-                        task_args_buffers.setdefault(tc_id, "")
-                        task_args_buffers[tc_id] += frag
-
-                    # Try to parse completed JSON and display the dispatch
-                    if tc_id and tc_id not in task_dispatched:
-                        raw = task_args_buffers.get(tc_id, "")
-                        try:
-                            args = json.loads(raw)
-                            task_dispatched.add(tc_id)
-                            _print_task_dispatch(node, args)
-                        except (json.JSONDecodeError, ValueError):
-                            pass
+            # 2) Tool call args — scanned incrementally, printed once complete
+            for ev in tasks.feed(chunk):
+                if ev.kind == "dispatched":
+                    _print_task_dispatch(node, {
+                        "subagent_type": ev.agent_id,
+                        "description": ev.description,
+                    })
 
         # --- Tool results ---
         if chunk_type in ("tool", "ToolMessage"):
@@ -241,7 +223,7 @@ def stream_debug(agent, session, user_input: str) -> str:
             task_result_count += 1
 
             # Try to figure out which specialist this result belongs to
-            agent_name = _identify_agent_from_result(tc_id, task_args_buffers, result_text)
+            agent_name = _identify_agent_from_result(tc_id, tasks, result_text)
             _print_task_result(node, tool_name, agent_name, result_text, task_result_count)
 
     if last_node and last_node not in _SILENT_NODES:
@@ -258,7 +240,7 @@ def _print_task_dispatch(node: str, args: dict):
     subagent = args.get("subagent_type", "?")
     description = args.get("description", "")
     agent_color = _color_for(subagent)
-    label = AGENT_LABELS.get(subagent, subagent)
+    label = get_agent_labels().get(subagent, subagent)
 
     print(f"\n{color}│")
     print(f"{color}│ {C.BOLD}>> DISPATCH: {agent_color}{label} ({subagent}){C.RESET}")
@@ -273,15 +255,12 @@ def _print_task_dispatch(node: str, args: dict):
             print(f"{color}│ {C.DIM}     ...({len(lines)-6} more lines){C.RESET}")
 
 
-def _identify_agent_from_result(tc_id: str, buffers: dict, result_text: str) -> str:
+def _identify_agent_from_result(tc_id: str, tasks: TaskCallTracker, result_text: str) -> str:
     """Try to identify which specialist produced this result."""
-    # First try: parse the args buffer for this tool_call_id
-    if tc_id and tc_id in buffers:
-        try:
-            args = json.loads(buffers[tc_id])
-            return args.get("subagent_type", "")
-        except (json.JSONDecodeError, ValueError):
-            pass
+    # First try: the subagent_type scanned from this tool call's args
+    agent_id = tasks.agent_for(tc_id) if tc_id else ""
+    if agent_id:
+        return agent_id
 
     # Fallback: scan result text for domain keywords
     lower = result_text[:500].lower()
@@ -305,7 +284,7 @@ def _print_task_result(node: str, tool_name: str, agent_name: str, result_text:
     color = _color_for(node)
     if agent_name:
         agent_color = _color_for(agent_name)
-        label = AGENT_LABELS.get(agent_name, agent_name)
+        label = get_agent_labels().get(agent_name, agent_name)
         tag = f"{agent_color}{C.BOLD}{label}{C.RESET}"
     else:
         tag = f"{C.DIM}agent #{index}{C.RESET}"
@@ -358,6 +337,43 @@ def stream_normal(agent, session, user_input: str) -> str:
     return full_response
 
 
+# ---------------------------------------------------------------------------
+# Startup profile
+# ---------------------------------------------------------------------------
+
+def profile_startup() -> list[tuple[str, float]]:
+    """Time each cold-start phase, in the order a real session pays for them.
+
+    Needs no API key: nothing is sent to a model.
+    """
+    from agents.registry import registry
+
+    phases = [("import cli (dotenv, config, streaming)", _T_IMPORTED - _T_START)]
+
+    t0 = time.perf_counter()
+    registry.get()
+    phases.append(("parse agents.yaml + questions.yaml", time.perf_counter() - t0))
+
+    t0 = time.perf_counter()
+    import deepagents  # noqa: F401 — the LLM stack, normally loaded by warmup()
+    phases.append(("import deepagents/langgraph/langchain", time.perf_counter() - t0))
+
+    template = warmup(LLM)
+    phases.append(("compile orchestrator graph", template.build_seconds))
+
+    t0 = time.perf_counter()
+    create_orchestrator(mode=LLM)
+    phases.append(("bind session checkpointer", time.perf_counter() - t0))
+    return phases
+
+
+def _print_profile(phases: list[tuple[str, float]]):
+    print(f"{'phase':<42} {'ms':>9}")
+    for name, seconds in phases:
+        print(f"{name:<42} {seconds * 1000:>9.1f}")
+    print(f"{'total':<42} {sum(s for _, s in phases) * 1000:>9.1f}")
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
@@ -366,8 +382,19 @@ def main():
     parser = argparse.ArgumentParser(description="Venture Validator CLI")
     parser.add_argument("--debug", action="store_true",
                         help="Show full agent trace: dispatches, inputs, outputs, timing")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Time each startup phase (imports, config, graph build) and exit")
     args = parser.parse_args()
 
+    if args.profile_startup:
+        _print_profile(profile_startup())
+        return
+
+    if not os.environ.get("ANTHROPIC_API_KEY") or os.environ["ANTHROPIC_API_KEY"] == "your-api-key-here":
+        print("ERROR: Set your ANTHROPIC_API_KEY in .env before running.")
+        print(f"  File: {env_path}")
+        sys.exit(1)
+
     debug = args.debug
     stream_fn = stream_debug if debug else stream_normal
 
@@ -388,9 +415,14 @@ def main():
         print(f"  Langfuse: {C.DIM}OFF{C.RESET}")
     print()
 
+    template = warmup(LLM)
+    print(f"  Orchestrator graph built in {template.build_seconds * 1000:.0f}ms "
+          f"(reused for every /new)")
+    print()
+
     session_mgr = SessionManager()
     session = session_mgr.create_session()
-    agent = create_orchestrator()
+    agent = create_orchestrator(mode=LLM)
 
     print(f"Session: {session.session_id}")
     print_separator()
@@ -419,7 +451,7 @@ def main():
 
             if user_input.lower() == "/new":
                 session = session_mgr.create_session()
-                agent = create_orchestrator()
+                agent = create_orchestrator(mode=LLM)
                 print(f"\nNew session: {session.session_id}")
                 print_separator()
                 continue
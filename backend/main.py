@@ -1,30 +1,75 @@
 """FastAPI server with debug terminal output.
 
 Run with: uv run uvicorn main:app --reload --port 8000
+Terminal verbosity: DEBUG_LOG=off|summary|full (default: full)
 """
 
+import asyncio
+import hashlib
 import json
-import re
 import time
+from functools import cache, partial
 from pathlib import Path
 from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 from sse_starlette.sse import EventSourceResponse
 
-from agents.orchestrator import create_orchestrator
+from agents.fanout import (
+    DIRECT,
+    DISPATCH_MODE,
+    answer_record,
+    gather_context,
+    get_specialists,
+    pending_specialists,
+    results_message,
+)
+from agents.deadlines import DeadlineExceeded, arace, latencies
+from agents.history import history_stats
+from agents.orchestrator import create_orchestrator, warmup
+from agents.registry import registry as config_registry
+from agents.neardup import NEAR_DUP_REFRESH
+from agents.promptcache import prompt_cache_stats
+from agents.providers import guards as provider_guards
+from agents.routing import router
+from agents.speculative import (
+    SPECULATIVE_DISPATCH,
+    SessionSpeculations,
+    Speculation,
+    speculation_stats,
+    speculative_specialists,
+)
+from agents.resultcache import cache_key, lookup, near_index, remember, result_cache
 from agents.observability import get_langfuse_handler, flush_langfuse, langfuse_config
 from agents.specialist import get_agent_labels
 from sessions.manager import SessionManager
+from sessions.views import parse_fields, project, session_view
+from streaming.admission import AdmissionController, Overloaded
+from streaming.bridge import JOB_WORKERS, JOBS, iterate_in_thread, shutdown_stream_workers
+from streaming.coalesce import coalesce_messages, resolve_settings
+from streaming.jobs import JobRegistry
+from streaming.jsonextract import REPAIRED, extract_json
+from streaming.logsink import FULL, SUMMARY, sink_from_env
+from streaming.replay import ReplayStore
+from streaming.runs import RunRegistry
+from streaming.toolcalls import TaskCallTracker
+from streaming.widgets import WidgetStreamer
 
 env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(env_path)
 
 session_mgr = SessionManager()
+run_registry = RunRegistry(ReplayStore())
+admission = AdmissionController()
+jobs = JobRegistry()
+# session id -> its held speculative runs (SPECULATIVE_DISPATCH)
+speculations: dict[str, SessionSpeculations] = {}
 _orchestrator = None
+_template = None
 AGENT_LABELS: dict[str, str] = {}
 
 
@@ -74,16 +119,13 @@ def _label_for(node: str) -> str:
 
 
 _SILENT_NODES = {"", "__start__"}
-_at_line_start = True
 
+# All terminal output goes through a background sink; DEBUG_LOG=off|summary|full
+_sink = sink_from_env()
 
-def _reset_line_state():
-    global _at_line_start
-    _at_line_start = True
 
-
-def _log(msg: str):
-    print(msg, flush=True)
+def _log(msg: str, level: int = SUMMARY):
+    _sink.emit(msg + "\n", level)
 
 
 def _log_header(node: str, extra: str = ""):
@@ -92,23 +134,17 @@ def _log_header(node: str, extra: str = ""):
     tag = f" {extra}" if extra else ""
     bar = "─" * max(1, 50 - len(label) - len(tag))
     _log(f"\n{color}{C.BOLD}┌─ {label}{tag} {bar}{C.RESET}")
-    _reset_line_state()
+
+
+@cache
+def _trace_prefix(node: str) -> str:
+    return f"{_color_for(node)}│ {C.RESET}"
 
 
 def _log_text(node: str, text: str):
-    global _at_line_start
-    color = _color_for(node)
-    out = ""
-    for ch in text:
-        if _at_line_start:
-            out += f"{color}│ {C.RESET}"
-            _at_line_start = False
-        if ch == "\n":
-            out += ch
-            _at_line_start = True
-        else:
-            out += ch
-    print(out, end="", flush=True)
+    # Line prefixes are added by the sink's writer thread, per batch
+    if _sink.enabled(FULL):
+        _sink.trace(_trace_prefix(node), text)
 
 
 def _log_footer(node: str, elapsed: float = 0):
@@ -119,6 +155,8 @@ def _log_footer(node: str, elapsed: float = 0):
 
 
 def _log_dispatch(node: str, agent_id: str, description: str = ""):
+    if not _sink.enabled(SUMMARY):
+        return
     color = _color_for(node)
     agent_color = _color_for(agent_id)
     label = AGENT_LABELS.get(agent_id, agent_id)
@@ -134,6 +172,8 @@ def _log_dispatch(node: str, agent_id: str, description: str = ""):
 
 
 def _log_result(node: str, agent_id: str, text: str):
+    if not _sink.enabled(SUMMARY):
+        return
     color = _color_for(node)
     agent_color = _color_for(agent_id)
     label = AGENT_LABELS.get(agent_id, agent_id)
@@ -149,40 +189,21 @@ def _log_result(node: str, agent_id: str, text: str):
     _log(f"{color}│")
 
 
+def _log_prompt_cache(usage):
+    _log(
+        f"{_color_for(usage.agent)}│ {C.DIM}prompt cache {usage.agent}: read {usage.cache_read:,} / "
+        f"write {usage.cache_write:,} / uncached {usage.uncached:,} tokens{C.RESET}",
+        FULL,
+    )
+
+
+prompt_cache_stats.on_call = _log_prompt_cache
+
+
 # ---------------------------------------------------------------------------
 # Text extraction
 # ---------------------------------------------------------------------------
 
-def _extract_json(text: str) -> dict | None:
-    """Extract a JSON object from agent output that may contain prose or markdown fences."""
-    # Strategy 1: direct parse
-    stripped = text.strip()
-    try:
-        return json.loads(stripped)
-    except (json.JSONDecodeError, ValueError):
-        pass
-
-    # Strategy 2: extract from ```json ... ``` fences (possibly with preamble text)
-    fence_match = re.search(r"```(?:json)?\s*\n(.*?)```", stripped, re.DOTALL)
-    if fence_match:
-        try:
-            return json.loads(fence_match.group(1).strip())
-        except (json.JSONDecodeError, ValueError):
-            pass
-
-    # Strategy 3: find the outermost { ... } block
-    first_brace = stripped.find("{")
-    if first_brace >= 0:
-        last_brace = stripped.rfind("}")
-        if last_brace > first_brace:
-            try:
-                return json.loads(stripped[first_brace : last_brace + 1])
-            except (json.JSONDecodeError, ValueError):
-                pass
-
-    return None
-
-
 def _extract_text(content) -> str:
     if isinstance(content, str):
         return content
@@ -195,13 +216,10 @@ def _extract_text(content) -> str:
     return ""
 
 
-def _identify_agent(tc_id: str, buffers: dict, result_text: str) -> str:
-    if tc_id and tc_id in buffers:
-        try:
-            args = json.loads(buffers[tc_id])
-            return args.get("subagent_type", "")
-        except (json.JSONDecodeError, ValueError):
-            pass
+def _identify_agent(tc_id: str, tasks: TaskCallTracker, result_text: str) -> str:
+    agent_id = tasks.agent_for(tc_id) if tc_id else ""
+    if agent_id:
+        return agent_id
     lower = result_text[:500].lower()
     if "market" in lower and "tam" in lower:
         return "market"
@@ -222,18 +240,51 @@ def _identify_agent(tc_id: str, buffers: dict, result_text: str) -> str:
 # Lifespan
 # ---------------------------------------------------------------------------
 
+def _on_config_reload(config):
+    """Hot-swap an edited agents.yaml/questions.yaml into the running server.
+
+    Runs on the registry's watcher thread. Turns already streaming keep the
+    graph they started with; the checkpointer is carried over so existing
+    conversations continue on the new prompts.
+    """
+    global _orchestrator, _template, AGENT_LABELS
+    _template = warmup()
+    _orchestrator = create_orchestrator(checkpointer=getattr(_orchestrator, "checkpointer", None))
+    AGENT_LABELS = dict(config.agent_labels)
+    if DISPATCH_MODE == DIRECT:
+        get_specialists()
+    _log(f"\n{C.YELLOW}Config reloaded (v{config.version}) — orchestrator rebuilt "
+         f"in {_template.build_seconds * 1000:.0f}ms{C.RESET}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global _orchestrator, AGENT_LABELS
+    global _orchestrator, _template, AGENT_LABELS
+    # Compile the orchestrator graph once up front; sessions only bind it.
+    _template = warmup()
     _orchestrator = create_orchestrator()
     AGENT_LABELS = get_agent_labels()
+    if DISPATCH_MODE == DIRECT:
+        get_specialists()
+    config_registry.subscribe(_on_config_reload)
+    config_registry.watch()
     get_langfuse_handler()
     _log(f"\n{'=' * 60}")
     _log(f"  Venture Validator API — {C.GREEN}Ready{C.RESET}")
-    _log(f"  {C.YELLOW}{C.BOLD}DEBUG MODE{C.RESET} — all agent I/O logged to terminal")
+    _log(f"  Orchestrator graph built in {_template.build_seconds * 1000:.0f}ms"
+         f" (dispatch: {DISPATCH_MODE})")
+    if _sink.enabled(FULL):
+        _log(f"  {C.YELLOW}{C.BOLD}DEBUG MODE{C.RESET} — all agent I/O logged to terminal")
+    else:
+        _log(f"  Debug log: {C.DIM}summary{C.RESET} (set DEBUG_LOG=full for token trace)")
     _log(f"{'=' * 60}\n")
     yield
+    config_registry.stop()
+    run_registry.cancel_all()
+    jobs.cancel_all()
+    shutdown_stream_workers()
     flush_langfuse()
+    _sink.close()
 
 
 app = FastAPI(
@@ -254,6 +305,11 @@ app.add_middleware(
 class ChatRequest(BaseModel):
     session_id: str
     message: str
+    # Per-request message coalescing; None = server default, 0 = disabled
+    coalesce_ms: int | None = None
+    coalesce_bytes: int | None = None
+    # False: neither read nor write the specialist result cache for this turn
+    cache: bool = True
 
 
 class SessionResponse(BaseModel):
@@ -268,138 +324,539 @@ def create_session():
     return SessionResponse(session_id=session.session_id, thread_id=session.thread_id)
 
 
+def _etag_matches(header: str, etag: str) -> bool:
+    """``If-None-Match`` check (weak comparison, as RFC 9110 requires)."""
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in (t.removeprefix("W/") for t in tags)
+
+
 @app.get("/api/sessions/{session_id}")
-def get_session(session_id: str):
+async def get_session(session_id: str, request: Request, fields: str | None = None):
+    """Session state, including every specialist result stored so far.
+
+    Runs on the event loop (not the threadpool) so it never reads a session
+    while a turn is writing to it. The strong ETag is derived from the
+    session version and the requested ``fields`` (comma-separated dotted
+    paths, e.g. ``agent_results.market.widgets``), so a matching
+    ``If-None-Match`` is answered with 304 without serializing anything.
+    """
     session = session_mgr.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
-    return {
-        "session_id": session.session_id,
-        "thread_id": session.thread_id,
-        "message_count": len(session.messages),
-        "agent_results": session.agent_results,
-    }
+
+    paths = parse_fields(fields)
+    projection = hashlib.sha1(repr(paths).encode()).hexdigest()[:8] if paths else "all"
+    etag = f'"{session.session_id}.{session.version}.{projection}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(project(session_view(session), paths), headers=headers)
+
+
+def _widget_event(agent_id: str, ev) -> tuple[str, dict]:
+    if ev.kind == "summary":
+        return "agent_summary", {"agentId": agent_id, **ev.payload}
+    _log(f"{_color_for(agent_id)}│ {C.DIM}widget ready: {agent_id}.{ev.key}{C.RESET}", FULL)
+    return "agent_widget", {"agentId": agent_id, "key": ev.key, "data": ev.payload}
+
+
+def _agent_result(
+    session,
+    widgets: WidgetStreamer,
+    node: str,
+    agent_id: str,
+    result_text: str,
+    reused: dict | None = None,
+    route: dict | None = None,
+):
+    """Log, parse and store a specialist's final answer; returns its event.
+
+    ``reused`` (``{"similarity": ...}``) marks an analysis reused from a
+    near-duplicate context. ``route`` is the model tier that produced it
+    when the agent has several (agents.routing).
+    """
+    _log_result(node, agent_id, result_text)
+    if route and route["fallbacks"]:
+        skipped = ", ".join(f"{f['tier']} ({f['reason']})" for f in route["fallbacks"])
+        _log(f"{C.YELLOW}│ {agent_id} answered by tier {route['tier']} after {skipped}{C.RESET}")
+
+    extraction = extract_json(result_text)
+    if extraction.method == REPAIRED:
+        _log(f"{C.YELLOW}│ repaired truncated JSON from {agent_id}: "
+             f"{', '.join(extraction.repairs)}{C.RESET}")
+    content_payload: str | dict = extraction.value if extraction.ok else result_text
+    widgets.finish(agent_id)
+    session.store_agent_result(agent_id, content_payload)
+
+    payload = {"agentId": agent_id, "content": content_payload}
+    if reused:
+        payload["reused"] = reused
+    if route:
+        payload["route"] = route
+    return "agent_result", payload
+
+
+async def _stream_orchestrator(session, message: str, use_cache: bool = True):
+    """Run one orchestrator invocation and yield ``(event, payload)`` pairs,
+    with terminal debug logging.
+
+    The blocking ``_orchestrator.stream`` runs on a worker thread via
+    ``iterate_in_thread`` so concurrent sessions interleave on the event loop.
+    Specialist subgraphs are streamed too; their tokens are not forwarded as
+    ``message`` events but parsed into ``agent_summary`` / ``agent_widget``.
+    ``use_cache=False`` makes the orchestrator's task calls skip the result cache.
+    """
+    config = langfuse_config(
+        thread_id=session.thread_id,
+        session_id=session.session_id,
+    )
+    config["configurable"]["result_cache"] = use_cache
+    input_msg = {"messages": [{"role": "user", "content": message}]}
+
+    full_response = ""
+    last_node = None
+    t_start = time.time()
+    tasks = TaskCallTracker()
+    widgets = WidgetStreamer(AGENT_LABELS)
+    routes: dict[str, dict] = {}
+    # task calls whose result or timeout is out; a run still going is not streamed
+    settled: set[str] = set()
+
+    async for namespace, (chunk, metadata) in iterate_in_thread(
+        _orchestrator.stream, input_msg, config=config, stream_mode="messages", subgraphs=True
+    ):
+        # --- Specialist subgraph output: report widgets as they close ---
+        if namespace:
+            agent_id = widgets.agent_for(metadata)
+            if metadata.get("hedge") or metadata.get("task_call_id") in settled:
+                continue  # a hedged duplicate, or a run that lost or timed out
+            if agent_id and getattr(chunk, "type", "") in ("AIMessageChunk", "ai"):
+                if "route" in chunk.response_metadata:
+                    routes[agent_id] = chunk.response_metadata["route"]
+                text = _extract_text(chunk.content)
+                for ev in widgets.feed(agent_id, chunk.id or "", text):
+                    yield _widget_event(agent_id, ev)
+            continue
+
+        node = metadata.get("langgraph_node", "")
+        chunk_type = getattr(chunk, "type", "")
+
+        if node != last_node and node not in _SILENT_NODES:
+            if last_node and last_node not in _SILENT_NODES:
+                _log_footer(last_node, time.time() - t_start)
+            _log_header(node)
+            last_node = node
+
+        # --- AI message chunks ---
+        if chunk_type in ("AIMessageChunk", "ai"):
+            text = _extract_text(chunk.content)
+            if text:
+                if node == "model":
+                    full_response += text
+                _log_text(node, text)
+                yield "message", {"content": text, "node": node}
+
+            # Tool call args — agent_start fires once subagent_type closes
+            for ev in tasks.feed(chunk):
+                if ev.kind == "start":
+                    yield "agent_start", {"agentId": ev.agent_id}
+                elif ev.kind == "dispatched":
+                    _log_dispatch(node, ev.agent_id, ev.description)
+
+        # --- Tool results (specialist agent responses) ---
+        if chunk_type in ("tool", "ToolMessage"):
+            record = answer_record(chunk)
+            if record is not None:
+                session.record_answers(record.question_ids, record.complete)
+                continue
+
+            tc_id = getattr(chunk, "tool_call_id", "")
+            result_text = _extract_text(getattr(chunk, "content", ""))
+            agent_name = _identify_agent(tc_id, tasks, result_text)
+
+            if agent_name:
+                artifact = getattr(chunk, "artifact", None)
+                artifact = artifact if isinstance(artifact, dict) else {}
+                route = routes.pop(agent_name, None)
+                settled.add(tc_id)
+                if "timeout" in artifact:
+                    yield _agent_timeout(session, widgets, agent_name, artifact["timeout"]["deadline"])
+                    continue
+                yield _agent_result(session, widgets, node, agent_name, result_text, artifact.get("reused"), route)
+
+    if last_node and last_node not in _SILENT_NODES:
+        _log_footer(last_node, time.time() - t_start)
+
+    if full_response:
+        session.add_assistant_message(full_response)
+
+    savings = history_stats.take(session.thread_id)
+    if savings is not None:
+        _log(f"{C.DIM}│ history compacted: {savings['tokens_before']} -> {savings['tokens_after']} "
+             f"input tokens over {savings['calls']} call(s){C.RESET}", FULL)
+        yield "history", {
+            "tokensBefore": savings["tokens_before"],
+            "tokensAfter": savings["tokens_after"],
+            "saved": savings["saved"],
+            "compactedResults": savings["compacted_results"],
+            "foldedMessages": savings["folded_messages"],
+        }
+
+
+def _agent_timeout(session, widgets: WidgetStreamer, agent_id: str, deadline: float):
+    """Log and record a specialist given up on at its deadline; returns its event."""
+    _log(f"{C.YELLOW}│ {AGENT_LABELS.get(agent_id, agent_id)} passed its {deadline:g}s deadline{C.RESET}")
+    widgets.finish(agent_id)
+    session.store_agent_timeout(agent_id, deadline)
+    return "agent_timeout", {"agentId": agent_id, "deadline": deadline}
+
+
+def _specialist_failed(session, widgets: WidgetStreamer, agent_id: str, exc: BaseException):
+    """Log a failed specialist and report its error as its result; returns its event."""
+    _log(f"{C.RED}│ {AGENT_LABELS.get(agent_id, agent_id)} failed: {exc!r}{C.RESET}")
+    return _agent_result(session, widgets, agent_id, agent_id, f"Analysis failed: {exc}")
+
+
+async def _run_specialist(
+    session, agent_id: str, graph, context: str, widgets: WidgetStreamer, use_cache: bool = True
+):
+    """Stream one directly dispatched specialist; yields its widgets and result.
+
+    A failing specialist reports its error as its result instead of taking
+    the other specialists down with it. A cached result for the same agent
+    definition and context is returned without running the agent; one
+    reused from a near-duplicate context is flagged, and with
+    NEAR_DUP_REFRESH the agent then runs anyway and its fresh result follows.
+
+    The run is bounded by the agent's deadline: past it, ``agent_timeout``
+    is yielded instead of a result. With ``hedge`` a quiet duplicate run
+    starts after the agent's learned p95; whichever finishes first is the
+    result, and the other is cancelled.
+    """
+    agent_def = next(d for d in config_registry.get().subagent_defs if d["name"] == agent_id)
+    if use_cache:
+        key, hit = lookup(agent_def, context, result_cache, near_index)
+    else:
+        key, hit = cache_key(agent_def, context), None
+    if hit is not None:
+        reused = {"similarity": round(hit.similarity, 3)} if hit.reused else None
+        how = f"reused at {hit.similarity:.0%} similarity" if reused else "result cache hit"
+        _log(f"{_color_for(agent_id)}│ {C.DIM}{how}: {agent_id}{C.RESET}")
+        yield _agent_result(session, widgets, agent_id, agent_id, hit.text, reused)
+        if not (reused and NEAR_DUP_REFRESH):
+            return
+
+    input_msg = {"messages": [{"role": "user", "content": context}]}
+    widget_events: asyncio.Queue = asyncio.Queue()
+
+    async def attempt(hedged: bool) -> tuple[str, dict | None]:
+        config = langfuse_config(
+            thread_id=f"{session.thread_id}:{agent_id}" + (":hedge" if hedged else ""),
+            session_id=session.session_id,
+        )
+        texts: dict[str, str] = {}
+        last_id = ""
+        route = None
+        async for chunk, metadata in iterate_in_thread(
+            graph.stream, input_msg, config=config, stream_mode="messages", pool=JOBS
+        ):
+            if getattr(chunk, "type", "") not in ("AIMessageChunk", "ai"):
+                continue
+            route = chunk.response_metadata.get("route", route)
+            text = _extract_text(chunk.content)
+            if not text:
+                continue
+            last_id = chunk.id or ""
+            texts[last_id] = texts.get(last_id, "") + text
+            if not hedged:  # the duplicate only counts if it finishes first
+                for ev in widgets.feed(agent_id, last_id, text):
+                    widget_events.put_nowait(_widget_event(agent_id, ev))
+        return texts.get(last_id, ""), route
+
+    def on_hedge():
+        latencies.hedged(agent_id)
+        _log(f"{_color_for(agent_id)}│ {C.DIM}hedging {agent_id}: duplicate run started{C.RESET}")
+
+    deadline = agent_def["deadline"]
+    hedge_after = latencies.hedge_delay(agent_id, deadline) if agent_def["hedge"] else None
+    race = asyncio.ensure_future(arace(attempt, deadline, hedge_after, on_hedge))
+    route = None
+    try:
+        while not race.done():
+            get = asyncio.ensure_future(widget_events.get())
+            await asyncio.wait({get, race}, return_when=asyncio.FIRST_COMPLETED)
+            if get.done():
+                yield get.result()
+            else:
+                get.cancel()
+        while not widget_events.empty():
+            yield widget_events.get_nowait()
+        outcome = race.result()
+        latencies.record(agent_id, outcome.seconds, outcome.hedged)
+        result_text, route = outcome.value
+    except DeadlineExceeded:
+        latencies.timed_out(agent_id)
+        yield _agent_timeout(session, widgets, agent_id, deadline)
+        return
+    except Exception as exc:
+        yield _specialist_failed(session, widgets, agent_id, exc)
+        return
+    finally:
+        race.cancel()
+    event = _agent_result(session, widgets, agent_id, agent_id, result_text, route=route)
+    if use_cache and isinstance(event[1]["content"], dict):
+        remember(agent_def, context, key, result_text, result_cache, near_index)
+    yield event
+
+
+def _dispatch(session, agent_ids: list[str], use_cache: bool = True):
+    """DISPATCH_MODE=direct: start ``agent_ids`` as background jobs of the
+    session; returns their ``agent_start`` events."""
+    specialists = get_specialists()
+    context = gather_context(session.messages)
+    session.mark_dispatched(agent_ids)
+    widgets = WidgetStreamer(agent_ids)
+    session_jobs = jobs.get_or_create(session.session_id)
+
+    _log(f"\n{C.CYAN}{C.BOLD}Direct dispatch: {', '.join(agent_ids)}{C.RESET}")
+    events = []
+    for agent_id in agent_ids:
+        _log_dispatch("orchestrator", agent_id)
+        session_jobs.start(agent_id, _run_specialist(
+            session, agent_id, specialists[agent_id], context, widgets, use_cache
+        ), on_error=partial(_specialist_failed, session, widgets, agent_id))
+        events.append(("agent_start", {"agentId": agent_id}))
+    return events
+
+
+def _founder_texts(session) -> list[str]:
+    return [m["content"] for m in session.messages if m["role"] == "user"]
+
+
+def _speculate(session, use_cache: bool = True):
+    """SPECULATIVE_DISPATCH: start, held, every specialist the first message
+    seems to make due (agents.speculative)."""
+    due = speculative_specialists(_founder_texts(session))
+    if not due:
+        return
+    specialists = get_specialists()
+    context = gather_context(session.messages)
+    widgets = WidgetStreamer(list(due))
+    book = speculations.setdefault(session.session_id, SessionSpeculations())
+    session_jobs = jobs.get_or_create(session.session_id)
+
+    _log(f"\n{C.CYAN}{C.BOLD}Speculative dispatch: {', '.join(due)}{C.RESET}")
+    for agent_id, fingerprint in due.items():
+        run = book.runs[agent_id] = Speculation(session, agent_id, fingerprint)
+        session_jobs.start(agent_id, _run_specialist(
+            run, agent_id, specialists[agent_id], context, widgets, use_cache
+        ), held=True, on_error=partial(_specialist_failed, run, widgets, agent_id))
+        speculation_stats.started(agent_id)
+
+
+def _settle_speculations(session, pending: list[str]):
+    """Cancel the held runs whose slots changed and adopt the due ones;
+    returns the adopted runs' ``agent_start`` events and the specialists
+    still to dispatch."""
+    book = speculations.get(session.session_id)
+    if book is None:
+        return [], pending
+    session_jobs = jobs.get_or_create(session.session_id)
+    for agent_id in book.stale(_founder_texts(session), session.answered_questions):
+        session_jobs.discard(agent_id)
+        del book.runs[agent_id]
+        speculation_stats.cancelled(agent_id)
+        _log(f"{_color_for(agent_id)}│ {C.DIM}speculative {agent_id} cancelled: its answers changed{C.RESET}")
+
+    adopted = [aid for aid in pending if aid in book.runs]
+    if adopted:
+        session.mark_dispatched(adopted)
+        _log(f"\n{C.CYAN}{C.BOLD}Adopted speculative runs: {', '.join(adopted)}{C.RESET}")
+    events = []
+    for agent_id in adopted:
+        run = book.runs.pop(agent_id)
+        run.adopt()
+        session_jobs.release(agent_id)
+        speculation_stats.adopted(agent_id, time.monotonic() - run.started)
+        events.append(("agent_start", {"agentId": agent_id, "speculative": True}))
+    if not book.runs:
+        del speculations[session.session_id]
+    return events, [aid for aid in pending if aid not in adopted]
+
+
+async def _stream_direct_turn(session, message: str, use_cache: bool = True):
+    """One DISPATCH_MODE=direct turn.
+
+    Specialists started in earlier turns keep running; their events are
+    delivered with this turn. After the orchestrator's reply, every
+    specialist whose questions are now answered is started. Once the
+    interview is complete the turn waits for the remaining results (each
+    bounded by its specialist's deadline) and streams the orchestrator's
+    synthesis.
+
+    With SPECULATIVE_DISPATCH the first message also starts the specialists
+    it seems to make due, held until they are due or their answers change.
+    """
+    session_jobs = jobs.get_or_create(session.session_id)
+    for item in session_jobs.drain():
+        yield item
+    if SPECULATIVE_DISPATCH and len(_founder_texts(session)) == 1:
+        _speculate(session, use_cache)
+    async for item in session_jobs.alongside(_stream_orchestrator(session, message, use_cache)):
+        yield item
+
+    pending = pending_specialists(
+        session.answered_questions, session.dispatched_agents, session.interview_complete
+    )
+    adopted, pending = _settle_speculations(session, pending)
+    if adopted:
+        # Their results so far are delivered now, not with the next turn.
+        for item in adopted + session_jobs.drain():
+            yield item
+    if pending:
+        for item in _dispatch(session, pending, use_cache):
+            yield item
+
+    if not session.interview_complete or session.synthesized or not session.dispatched_agents:
+        return
+    async for item in session_jobs.until_idle():
+        yield item
+    session.mark_synthesized()
+    results = {aid: session.agent_results[aid] for aid in AGENT_LABELS if aid in session.agent_results}
+    message = results_message(results, AGENT_LABELS, session.agent_timeouts)
+    async for item in _stream_orchestrator(session, message, use_cache):
+        yield item
+
+
+async def _stream_turn(session, message: str, use_cache: bool = True):
+    """One chat turn: the orchestrator's reply, plus (in direct dispatch mode)
+    the specialists' progress and, at the end of the interview, the synthesis.
+
+    Runs once the turn is admitted, so the message joins the session only
+    then: a queued message stays out of the running turn, and one rejected
+    while queued is never added.
+    """
+    session.add_user_message(message)
+    _log(f"\n{'─' * 60}")
+    _log(f"{C.BOLD}You:{C.RESET} {message}")
+
+    turn = _stream_direct_turn if DISPATCH_MODE == DIRECT else _stream_orchestrator
+    async for item in turn(session, message, use_cache):
+        yield item
+
+    _log(f"\n{'─' * 60}")
+    yield "done", {"status": "complete"}
+
+
+def _log_run_error(run, exc: BaseException):
+    _log(f"\n{C.RED}{C.BOLD}Turn failed:{C.RESET} {exc!r}")
+
+
+async def _to_sse(events):
+    """Serialize logged events into sse-starlette dicts with their ids."""
+    async for event in events:
+        yield {"id": str(event.id), "event": event.name, "data": json.dumps(event.payload)}
 
 
 @app.post("/api/chat")
 async def chat(req: ChatRequest):
-    """Stream orchestrator responses as SSE with terminal debug logging."""
+    """Stream orchestrator responses as SSE with terminal debug logging.
+
+    Turns for the same session are serialized; when the session or the global
+    run queue is full the request is refused with 429 + Retry-After.
+    """
     session = session_mgr.get_session(req.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    session.add_user_message(req.message)
-    _log(f"\n{'─' * 60}")
-    _log(f"{C.BOLD}You:{C.RESET} {req.message}")
-
-    async def event_generator():
-        config = langfuse_config(
-            thread_id=session.thread_id,
-            session_id=session.session_id,
+    try:
+        ticket = admission.reserve(session.session_id)
+    except Overloaded as exc:
+        _log(f"{C.YELLOW}Rejected turn for {session.session_id}: {exc}{C.RESET}")
+        raise HTTPException(
+            status_code=429,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
         )
-        input_msg = {"messages": [{"role": "user", "content": req.message}]}
 
-        full_response = ""
-        last_node = None
-        t_start = time.time()
-        task_args_buffers: dict[str, str] = {}
-        task_dispatched: set[str] = set()
-        current_tc_id: str | None = None
+    coalesce = resolve_settings(req.coalesce_ms, req.coalesce_bytes)
+    run = run_registry.start(
+        session.session_id,
+        coalesce_messages(_stream_turn(session, req.message, req.cache), coalesce),
+        on_error=_log_run_error,
+        ticket=ticket,
+    )
+    return EventSourceResponse(_to_sse(run.events()), headers={"X-Run-Id": run.run_id})
 
-        for chunk, metadata in _orchestrator.stream(
-            input_msg, config=config, stream_mode="messages"
-        ):
-            node = metadata.get("langgraph_node", "")
-            chunk_type = getattr(chunk, "type", "")
 
-            if node != last_node and node not in _SILENT_NODES:
-                if last_node and last_node not in _SILENT_NODES:
-                    _log_footer(last_node, time.time() - t_start)
-                _log_header(node)
-                last_node = node
+@app.get("/api/sessions/{session_id}/events")
+async def session_events(session_id: str, request: Request, last_event_id: int = 0):
+    """Resume a session's event stream after ``Last-Event-ID`` (header or query).
 
-            # --- AI message chunks ---
-            if chunk_type in ("AIMessageChunk", "ai"):
-                text = _extract_text(chunk.content)
-                if text:
-                    if node == "model":
-                        full_response += text
-                    _log_text(node, text)
-                    yield {
-                        "event": "message",
-                        "data": json.dumps({"content": text, "node": node}),
-                    }
-
-                # Tool call starts (have name + id)
-                tc = getattr(chunk, "tool_calls", None)
-                if tc:
-                    for call in tc:
-                        name = call.get("name", "")
-                        tc_id = call.get("id", "")
-                        if name and tc_id:
-                            current_tc_id = tc_id
-                            task_args_buffers[tc_id] = ""
-
-                # Tool call arg streaming
-                tc_chunks = getattr(chunk, "tool_call_chunks", None)
-                if tc_chunks:
-                    for tcc in tc_chunks:
-                        tc_id = tcc.get("id") or current_tc_id
-                        frag = tcc.get("args", "")
-                        if tc_id and frag:
-                            task_args_buffers.setdefault(tc_id, "")
-                            task_args_buffers[tc_id] += frag
-
-                        if tc_id and tc_id not in task_dispatched:
-                            raw = task_args_buffers.get(tc_id, "")
-                            try:
-                                args = json.loads(raw)
-                                task_dispatched.add(tc_id)
-                                agent_id = args.get("subagent_type", "")
-                                if agent_id:
-                                    description = args.get("description", "")
-                                    _log_dispatch(node, agent_id, description)
-                                    yield {
-                                        "event": "agent_start",
-                                        "data": json.dumps({"agentId": agent_id}),
-                                    }
-                            except (json.JSONDecodeError, ValueError):
-                                pass
-
-            # --- Tool results (specialist agent responses) ---
-            if chunk_type in ("tool", "ToolMessage"):
-                tc_id = getattr(chunk, "tool_call_id", "")
-                result_text = _extract_text(getattr(chunk, "content", ""))
-                agent_name = _identify_agent(tc_id, task_args_buffers, result_text)
-
-                if agent_name:
-                    _log_result(node, agent_name, result_text)
-
-                    content_payload: str | dict = result_text
-                    parsed_json = _extract_json(result_text)
-                    if parsed_json is not None:
-                        content_payload = parsed_json
-                    else:
-                        content_payload = result_text
-
-                    yield {
-                        "event": "agent_result",
-                        "data": json.dumps({
-                            "agentId": agent_name,
-                            "content": content_payload,
-                        }),
-                    }
-
-        if last_node and last_node not in _SILENT_NODES:
-            _log_footer(last_node, time.time() - t_start)
-
-        if full_response:
-            session.add_assistant_message(full_response)
-
-        _log(f"\n{'─' * 60}")
-        yield {"event": "done", "data": json.dumps({"status": "complete"})}
-
-    return EventSourceResponse(event_generator())
+    Replays only the events the client missed, then follows the running turn
+    until it finishes. Never starts a new model call.
+    """
+    if not session_mgr.get_session(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    header = request.headers.get("last-event-id", "")
+    if header.strip().isdigit():
+        last_event_id = int(header)
+
+    log = run_registry.store.get_or_create(session_id)
+    return EventSourceResponse(_to_sse(log.subscribe(last_event_id)))
+
+
+@app.get("/api/sessions/{session_id}/run")
+def session_run(session_id: str):
+    """Status of the session's latest run, so other viewers can attach to it."""
+    if not session_mgr.get_session(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    run = run_registry.latest(session_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="No run for this session")
+    return run.to_dict()
+
+
+@app.get("/api/runs/{run_id}/events")
+async def run_events(run_id: str, request: Request, last_event_id: int | None = None):
+    """Attach to a run as an extra subscriber.
+
+    Streams the run from its first event (or after ``Last-Event-ID``) and
+    follows it live until it finishes. Every subscriber shares the same
+    orchestrator execution.
+    """
+    run = run_registry.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    header = request.headers.get("last-event-id", "")
+    if header.strip().isdigit():
+        last_event_id = int(header)
+
+    return EventSourceResponse(_to_sse(run.events(last_event_id)))
+
+
+@app.get("/api/metrics")
+def metrics():
+    """Admission gauges, active runs and the orchestrator graph build time."""
+    return {
+        "admission": admission.stats(),
+        "runs": {"active": len(run_registry.active())},
+        "specialist_jobs": {"running": jobs.running(), "workers": JOB_WORKERS},
+        "result_cache": {**result_cache.info(), "near_duplicates": near_index.info()},
+        "prompt_cache": prompt_cache_stats.info(),
+        "routing": router.info(),
+        "deadlines": latencies.info(),
+        "history": history_stats.info(),
+        "speculation": speculation_stats.info(),
+        "providers": {name: guard.info() for name, guard in provider_guards.items()},
+        "orchestrator": {
+            "config_version": _template.version if _template else None,
+            "build_ms": round(_template.build_seconds * 1000, 1) if _template else None,
+        },
+    }
 
 
 @app.get("/health")
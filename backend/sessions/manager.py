@@ -15,15 +15,50 @@ class Session:
     thread_id: str
     messages: list[dict] = field(default_factory=list)
     agent_results: dict = field(default_factory=dict)
+    # Specialists that passed their deadline this session -> the deadline (s).
+    agent_timeouts: dict[str, float] = field(default_factory=dict)
+    # DISPATCH_MODE=direct: what the orchestrator recorded as answered,
+    # whether it has finished asking, and which specialists the server has
+    # already started.
+    answered_questions: set[str] = field(default_factory=set)
+    interview_complete: bool = False
+    dispatched_agents: set[str] = field(default_factory=set)
+    synthesized: bool = False
+    # Bumped on every change; the session endpoint derives its ETag from it.
+    version: int = 0
 
     def add_user_message(self, content: str):
         self.messages.append({"role": "user", "content": content})
+        self.version += 1
 
     def add_assistant_message(self, content: str):
         self.messages.append({"role": "assistant", "content": content})
+        self.version += 1
 
-    def store_agent_result(self, agent_id: str, result: dict):
+    def store_agent_result(self, agent_id: str, result: dict | str):
+        """Store a specialist's result (parsed JSON, or raw text if unparseable)."""
         self.agent_results[agent_id] = result
+        self.agent_timeouts.pop(agent_id, None)
+        self.version += 1
+
+    def store_agent_timeout(self, agent_id: str, deadline: float):
+        """Record that a specialist was given up on after ``deadline`` seconds."""
+        self.agent_timeouts[agent_id] = deadline
+        self.version += 1
+
+    def record_answers(self, question_ids: set[str], complete: bool = False):
+        if not question_ids <= self.answered_questions or complete > self.interview_complete:
+            self.answered_questions |= question_ids
+            self.interview_complete |= complete
+            self.version += 1
+
+    def mark_dispatched(self, agent_ids: list[str]):
+        self.dispatched_agents.update(agent_ids)
+        self.version += 1
+
+    def mark_synthesized(self):
+        self.synthesized = True
+        self.version += 1
 
 
 class SessionManager:
@@ -0,0 +1,56 @@
+"""Read-side views of a session for the HTTP API."""
+
+from typing import Any
+
+from sessions.manager import Session
+
+
+def session_view(session: Session) -> dict:
+    """Full JSON body of ``GET /api/sessions/{id}``."""
+    return {
+        "session_id": session.session_id,
+        "thread_id": session.thread_id,
+        "version": session.version,
+        "message_count": len(session.messages),
+        "answered_questions": sorted(session.answered_questions),
+        "interview_complete": session.interview_complete,
+        "dispatched_agents": sorted(session.dispatched_agents),
+        "agent_results": session.agent_results,
+        "agent_timeouts": session.agent_timeouts,
+    }
+
+
+def parse_fields(raw: str | None) -> list[tuple[str, ...]]:
+    """``"agent_results.market.widgets,version"`` -> dotted paths as tuples."""
+    if not raw:
+        return []
+    paths = sorted({tuple(p for p in f.strip().split(".") if p) for f in raw.split(",")} - {()})
+    # Drop paths already covered by a shorter one ("a" covers "a.b").
+    kept: list[tuple[str, ...]] = []
+    for path in paths:
+        if not any(path[: len(k)] == k for k in kept):
+            kept.append(path)
+    return kept
+
+
+def project(doc: dict, fields: list[tuple[str, ...]]) -> dict:
+    """Keep only ``fields`` of ``doc``, preserving the nesting.
+
+    Paths that do not exist are left out rather than raising, so a client can
+    ask for ``agent_results.gtm`` before that agent has finished.
+    """
+    if not fields:
+        return doc
+    out: dict = {}
+    for path in fields:
+        value: Any = doc
+        for key in path:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            node = out
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            node[path[-1]] = value
+    return out
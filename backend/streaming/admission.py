@@ -0,0 +1,185 @@
+"""Admission control for orchestrator runs.
+
+Two limits, both checked when ``/api/chat`` is called so an overloaded server
+answers with a fast ``429`` + ``Retry-After`` instead of queueing forever:
+
+- Per session: turns for one ``session_id`` run one at a time (they share a
+  ``thread_id`` in the checkpointer). At most ``SESSION_QUEUE_SIZE`` further
+  turns may wait behind the running one.
+- Global: at most ``MAX_CONCURRENT_RUNS`` orchestrator runs execute at once.
+  Up to ``RUN_QUEUE_SIZE`` more wait in FIFO order, each for at most
+  ``RUN_QUEUE_TIMEOUT`` seconds.
+
+An admitted run streams on one thread of the bridge's ``TURNS`` pool at a
+time (background specialists have their own pool), so the global limit is
+capped at ``STREAM_WORKERS``: a run admitted beyond it would queue inside
+the pool, where admission cannot see or time it out.
+
+A ``Ticket`` is reserved synchronously (so queue depth is exact even before
+the run task is scheduled) and acquired by the run before it starts.
+``AdmissionController.stats()`` exposes queue depth and wait-time gauges.
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from streaming.bridge import STREAM_WORKERS
+
+MAX_CONCURRENT_RUNS = int(os.environ.get("MAX_CONCURRENT_RUNS", "8"))
+RUN_QUEUE_SIZE = int(os.environ.get("RUN_QUEUE_SIZE", "16"))
+RUN_QUEUE_TIMEOUT = float(os.environ.get("RUN_QUEUE_TIMEOUT", "30"))
+SESSION_QUEUE_SIZE = int(os.environ.get("SESSION_QUEUE_SIZE", "2"))
+
+MAX_RETRY_AFTER = 60
+
+
+class Overloaded(Exception):
+    """Raised when a run cannot be admitted; carries a Retry-After hint (seconds)."""
+
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.retry_after = retry_after
+
+
+@dataclass
+class _SessionSlot:
+    lock: asyncio.Lock
+    depth: int = 0  # running + waiting turns
+
+
+class Ticket:
+    """One reserved place in the session queue and the global queue."""
+
+    def __init__(self, controller: "AdmissionController", session_id: str):
+        self._controller = controller
+        self.session_id = session_id
+        self.reserved_at = time.monotonic()
+        self.admitted_at: float | None = None
+        self._session_locked = False
+        self._holding = False
+        self._released = False
+
+    async def acquire(self):
+        """Wait for the session's turn, then for a global run slot."""
+        c = self._controller
+        slot = c._sessions[self.session_id]
+        await slot.lock.acquire()
+        self._session_locked = True
+
+        try:
+            await asyncio.wait_for(c._slots.acquire(), c.max_wait)
+        except TimeoutError:
+            c.timed_out += 1
+            raise Overloaded("Timed out waiting for a free run slot", c.retry_after()) from None
+        finally:
+            c.waiting -= 1
+
+        self._holding = True
+        self.admitted_at = time.monotonic()
+        c.running += 1
+        c.admitted += 1
+        c._waits.append(self.admitted_at - self.reserved_at)
+
+    def release(self):
+        """Give back everything this ticket holds. Safe to call more than once."""
+        if self._released:
+            return
+        self._released = True
+        c = self._controller
+        if self._holding:
+            c.running -= 1
+            c._holds.append(time.monotonic() - self.admitted_at)
+            c._slots.release()
+        elif self.admitted_at is None and not self._session_locked:
+            # Never started waiting (e.g. the run was cancelled before it ran).
+            c.waiting -= 1
+        slot = c._sessions[self.session_id]
+        if self._session_locked:
+            slot.lock.release()
+        slot.depth -= 1
+        if slot.depth == 0:
+            del c._sessions[self.session_id]
+
+
+class AdmissionController:
+    """Per-session serialization plus a global concurrency limit."""
+
+    def __init__(
+        self,
+        limit: int = MAX_CONCURRENT_RUNS,
+        max_waiting: int = RUN_QUEUE_SIZE,
+        max_wait: float = RUN_QUEUE_TIMEOUT,
+        session_queue: int = SESSION_QUEUE_SIZE,
+    ):
+        self.limit = max(1, min(limit, STREAM_WORKERS))
+        self.max_waiting = max(0, max_waiting)
+        self.max_wait = max_wait
+        self.session_queue = max(0, session_queue)
+        self._slots = asyncio.Semaphore(self.limit)
+        self._sessions: dict[str, _SessionSlot] = {}
+        self._waits: deque[float] = deque(maxlen=256)
+        self._holds: deque[float] = deque(maxlen=256)
+
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def reserve(self, session_id: str) -> Ticket:
+        """Reserve a place for one run or raise ``Overloaded`` immediately."""
+        slot = self._sessions.get(session_id)
+        if slot is not None and slot.depth > self.session_queue:
+            self.rejected += 1
+            raise Overloaded("Too many queued turns for this session", self.retry_after(slot.depth))
+        if self.waiting >= self.max_waiting and self.running + self.waiting >= self.limit:
+            self.rejected += 1
+            raise Overloaded("Server busy", self.retry_after())
+
+        if slot is None:
+            slot = self._sessions[session_id] = _SessionSlot(asyncio.Lock())
+        slot.depth += 1
+        self.waiting += 1
+        return Ticket(self, session_id)
+
+    def retry_after(self, session_runs: int | None = None) -> int:
+        """Rough seconds until there is room, from recent run durations.
+
+        ``session_runs`` estimates a session queue (runs back to back);
+        otherwise the global queue drains ``limit`` runs at a time.
+        """
+        if not self._holds:
+            return 1
+        avg_hold = sum(self._holds) / len(self._holds)
+        if session_runs is not None:
+            estimate = avg_hold * session_runs
+        else:
+            estimate = avg_hold * (self.waiting + 1) / self.limit
+        return min(MAX_RETRY_AFTER, max(1, math.ceil(estimate)))
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def ms(value: float) -> float:
+            return round(value * 1000, 1)
+
+        return {
+            "limit": self.limit,
+            "running": self.running,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "sessions_queued": sum(max(0, s.depth - 1) for s in self._sessions.values()),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_ms": {
+                "last": ms(self._waits[-1]) if waits else 0.0,
+                "avg": ms(sum(waits) / len(waits)) if waits else 0.0,
+                "p95": ms(waits[min(len(waits) - 1, int(len(waits) * 0.95))]) if waits else 0.0,
+                "max": ms(waits[-1]) if waits else 0.0,
+            },
+        }
@@ -0,0 +1,168 @@
+"""Bridge blocking LangGraph streams onto the asyncio event loop.
+
+The compiled orchestrator only exposes a synchronous ``stream()`` that blocks on
+every LLM and Tavily round-trip. Iterating it inside an ``async def`` freezes
+uvicorn's event loop, so one slow session stalls every other SSE stream and
+``/health``. ``iterate_in_thread`` runs the blocking iterator on a managed
+worker thread and hands items back through a bounded asyncio queue.
+
+Usage:
+    async for chunk, metadata in iterate_in_thread(
+        agent.stream, input_msg, config=config, stream_mode="messages"
+    ):
+        ...
+
+``merge`` interleaves several such streams (e.g. specialists running in
+parallel) in arrival order.
+
+Each stream holds a worker for as long as it runs, so workers are split
+into pools. ``TURNS`` (``STREAM_WORKERS`` threads) serves admitted turns
+only; ``JOBS`` (``JOB_WORKERS``) serves background specialist runs, which
+admission does not count. However many jobs are running or queued, an
+admitted turn never waits for a thread.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import threading
+from collections.abc import AsyncIterator, Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+
+STREAM_QUEUE_SIZE = int(os.environ.get("STREAM_QUEUE_SIZE", "256"))
+STREAM_WORKERS = int(os.environ.get("STREAM_WORKERS", "32"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "16"))
+
+TURNS = "turns"
+JOBS = "jobs"
+_POOL_SIZES = {TURNS: STREAM_WORKERS, JOBS: JOB_WORKERS}
+
+# How often a producer blocked on a full queue re-checks for cancellation.
+_PUT_POLL_SECONDS = 0.1
+
+_executors: dict[str, ThreadPoolExecutor] = {}
+_executor_lock = threading.Lock()
+
+_DONE = object()
+
+
+class _Raised:
+    """Wraps an exception raised on the worker so it can cross the queue."""
+
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def _get_executor(pool: str) -> ThreadPoolExecutor:
+    with _executor_lock:
+        executor = _executors.get(pool)
+        if executor is None:
+            executor = _executors[pool] = ThreadPoolExecutor(
+                max_workers=_POOL_SIZES[pool],
+                thread_name_prefix=f"stream-{pool}",
+            )
+        return executor
+
+
+def shutdown_stream_workers():
+    """Stop accepting new streams and drop queued ones. Call at shutdown."""
+    with _executor_lock:
+        for executor in _executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        _executors.clear()
+
+
+async def iterate_in_thread(
+    fn: Callable[..., Iterable],
+    *args,
+    maxsize: int = STREAM_QUEUE_SIZE,
+    pool: str = TURNS,
+    **kwargs,
+) -> AsyncIterator:
+    """Call ``fn(*args, **kwargs)`` on a worker thread of ``pool`` and yield
+    its items.
+
+    The queue between the worker and the event loop is bounded, so a slow
+    consumer applies backpressure instead of buffering a whole turn in memory.
+    Exceptions raised by the iterator are re-raised in the consumer. Closing
+    the async iterator early (e.g. the client disconnected) stops the worker
+    at the next item and closes the underlying generator.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        try:
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        except RuntimeError:
+            # Event loop already closed — nobody is listening any more.
+            return False
+        while True:
+            try:
+                future.result(timeout=_PUT_POLL_SECONDS)
+                return True
+            except concurrent.futures.TimeoutError:
+                if stop.is_set():
+                    future.cancel()
+                    return False
+
+    def worker():
+        iterator = None
+        try:
+            iterator = iter(fn(*args, **kwargs))
+            for item in iterator:
+                if stop.is_set() or not put(item):
+                    return
+        except BaseException as exc:  # noqa: BLE001 — forwarded to the consumer
+            put(_Raised(exc))
+            return
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+        put(_DONE)
+
+    context = contextvars.copy_context()
+    loop.run_in_executor(_get_executor(pool), context.run, worker)
+
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Raised):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+
+
+async def merge(*iterators: AsyncIterator) -> AsyncIterator:
+    """Yield items from several async iterators as soon as each produces one.
+
+    Each source has at most one item in flight, so backpressure still reaches
+    every producer. An exception from any source is re-raised after the
+    others are closed; closing the merged iterator closes them all.
+    """
+    pending = {asyncio.ensure_future(anext(it)): it for it in iterators}
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                it = pending.pop(future)
+                try:
+                    item = future.result()
+                except StopAsyncIteration:
+                    continue
+                pending[asyncio.ensure_future(anext(it))] = it
+                yield item
+    finally:
+        for future in pending:
+            future.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for it in iterators:
+            aclose = getattr(it, "aclose", None)
+            if aclose is not None:
+                await aclose()
@@ -0,0 +1,120 @@
+"""Coalesce streamed ``message`` events into fewer SSE frames.
+
+At Claude streaming rates every turn produces thousands of tiny text
+fragments. Sending each as its own SSE frame costs a ``json.dumps``, a socket
+write and a hop through the Next.js proxy per token. ``coalesce_messages``
+buffers consecutive ``message`` events for the same node and flushes them as
+a single event when either the time window or the byte threshold is reached.
+Any other event (``agent_start``, ``agent_result``, ``done``, ...) flushes the
+buffer first and is passed through immediately.
+
+Events are ``(name, payload)`` tuples; serialization happens at the SSE edge.
+"""
+
+import asyncio
+import os
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+
+MAX_WINDOW_MS = 1000
+MAX_BYTES = 64 * 1024
+
+
+@dataclass(frozen=True)
+class CoalesceSettings:
+    window_ms: int = 0
+    max_bytes: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_ms > 0 or self.max_bytes > 0
+
+
+DEFAULT_SETTINGS = CoalesceSettings(
+    window_ms=int(os.environ.get("SSE_COALESCE_MS", "30")),
+    max_bytes=int(os.environ.get("SSE_COALESCE_BYTES", "1024")),
+)
+
+
+def resolve_settings(window_ms: int | None = None, max_bytes: int | None = None) -> CoalesceSettings:
+    """Merge per-request overrides with the server defaults, clamped to sane bounds.
+
+    ``0`` disables that trigger; both ``0`` means one frame per fragment.
+    """
+    window = DEFAULT_SETTINGS.window_ms if window_ms is None else window_ms
+    size = DEFAULT_SETTINGS.max_bytes if max_bytes is None else max_bytes
+    return CoalesceSettings(
+        window_ms=min(max(window, 0), MAX_WINDOW_MS),
+        max_bytes=min(max(size, 0), MAX_BYTES),
+    )
+
+
+async def coalesce_messages(
+    events: AsyncIterator[tuple[str, dict]],
+    settings: CoalesceSettings,
+) -> AsyncIterator[tuple[str, dict]]:
+    """Yield ``events`` with runs of same-node ``message`` events merged."""
+    if not settings.enabled:
+        async for event in events:
+            yield event
+        return
+
+    loop = asyncio.get_running_loop()
+    window = settings.window_ms / 1000 if settings.window_ms > 0 else None
+    iterator = events.__aiter__()
+    next_event: asyncio.Future | None = None
+
+    meta: dict = {}
+    parts: list[str] = []
+    size = 0
+    deadline = 0.0
+
+    def flush() -> tuple[str, dict]:
+        nonlocal parts, size
+        event = ("message", {"content": "".join(parts), **meta})
+        parts = []
+        size = 0
+        return event
+
+    try:
+        while True:
+            if next_event is None:
+                next_event = asyncio.ensure_future(iterator.__anext__())
+
+            timeout = None
+            if parts and window is not None:
+                timeout = max(0.0, deadline - loop.time())
+            done, _ = await asyncio.wait({next_event}, timeout=timeout)
+            if not done:
+                yield flush()
+                continue
+
+            future, next_event = next_event, None
+            try:
+                name, payload = future.result()
+            except StopAsyncIteration:
+                break
+
+            if name != "message":
+                if parts:
+                    yield flush()
+                yield name, payload
+                continue
+
+            text = payload.get("content", "")
+            fields = {k: v for k, v in payload.items() if k != "content"}
+            if parts and fields != meta:
+                yield flush()
+            if not parts:
+                meta = fields
+                deadline = loop.time() + (window or 0.0)
+            parts.append(text)
+            size += len(text.encode())
+            if settings.max_bytes and size >= settings.max_bytes:
+                yield flush()
+
+        if parts:
+            yield flush()
+    finally:
+        if next_event is not None:
+            next_event.cancel()
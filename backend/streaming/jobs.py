@@ -0,0 +1,164 @@
+"""Background work that outlives the chat turn that started it.
+
+With direct dispatch a specialist is started as soon as its questions are
+answered, usually several turns before the interview ends. Its events
+(``agent_summary``, ``agent_widget``, ``agent_result``) cannot belong to
+the turn that started it, which ends with ``done`` long before the
+specialist does. Each job therefore writes its events to the session's
+outbox, and every later turn of that session carries them:
+
+- ``drain()`` at the start of a turn returns what arrived between turns,
+- ``alongside(stream)`` interleaves live job events with the turn's own
+  events until the turn's stream ends, and
+- ``until_idle()`` follows the jobs until all of them have finished (used
+  before the synthesis, which needs every result).
+
+Specialist runs stream on bridge's ``JOBS`` worker pool, so however many
+jobs there are, they never take a thread from an admitted turn.
+
+A job that raises delivers what ``on_error`` makes of the exception in
+place of its remaining events, so its client is never left waiting.
+
+A job started with ``held=True`` (a speculative run, agents.speculative)
+keeps its events to itself until ``release()`` hands them to the outbox,
+or ``discard()`` cancels it and drops them.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Callable
+
+from streaming.bridge import merge
+
+
+class SessionJobs:
+    """The background jobs of one session and their undelivered events."""
+
+    def __init__(self):
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._held: dict[str, list[tuple[str, dict]]] = {}
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def running(self) -> list[str]:
+        return [key for key, task in self._tasks.items() if not task.done()]
+
+    def start(
+        self,
+        key: str,
+        events: AsyncIterator[tuple[str, dict]],
+        held: bool = False,
+        on_error: Callable[[BaseException], tuple[str, dict]] | None = None,
+    ):
+        """Run ``events`` in the background, queueing each item for delivery
+        (or, if ``held``, keeping it until ``release(key)``). If ``events``
+        raises, ``on_error(exc)`` is the job's last item."""
+
+        def deliver(item: tuple[str, dict]):
+            buffer = self._held.get(key)
+            if buffer is None:
+                self._outbox.put_nowait(item)
+            else:
+                buffer.append(item)
+
+        async def pump():
+            try:
+                async for item in events:
+                    deliver(item)
+            except Exception as exc:
+                if on_error is None:
+                    raise
+                deliver(on_error(exc))
+
+        if held:
+            self._held[key] = []
+        self._idle.clear()
+        task = asyncio.create_task(pump(), name=f"job-{key}")
+        task.add_done_callback(self._job_done)
+        self._tasks[key] = task
+
+    def release(self, key: str):
+        """Queue a held job's events so far, and deliver the rest as they come."""
+        for item in self._held.pop(key, []):
+            self._outbox.put_nowait(item)
+
+    def discard(self, key: str):
+        """Cancel a held job and drop its events."""
+        if self._held.pop(key, None) is not None:
+            self._tasks.pop(key).cancel()
+
+    def drain(self) -> list[tuple[str, dict]]:
+        """Every event queued so far, without waiting."""
+        items = []
+        while not self._outbox.empty():
+            items.append(self._outbox.get_nowait())
+        return items
+
+    async def alongside(self, stream: AsyncIterator) -> AsyncIterator:
+        """Yield ``stream`` with job events interleaved, until ``stream`` ends.
+
+        Job events still to come stay queued for the next turn.
+        """
+        done = asyncio.Event()
+
+        async def lead():
+            try:
+                async for item in stream:
+                    yield item
+            finally:
+                done.set()
+
+        async for item in merge(lead(), self._follow(done)):
+            yield item
+
+    async def until_idle(self) -> AsyncIterator[tuple[str, dict]]:
+        """Yield job events until every job has finished and all are delivered."""
+        async for item in self._follow(self._idle):
+            yield item
+        for item in self.drain():
+            yield item
+
+    def cancel(self):
+        for task in self._tasks.values():
+            task.cancel()
+
+    async def _follow(self, stop: asyncio.Event) -> AsyncIterator[tuple[str, dict]]:
+        while True:
+            for item in self.drain():
+                yield item
+            if stop.is_set():
+                return
+            get = asyncio.ensure_future(self._outbox.get())
+            halt = asyncio.ensure_future(stop.wait())
+            try:
+                await asyncio.wait({get, halt}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                get.cancel()
+                halt.cancel()
+            if get.done() and not get.cancelled():
+                yield get.result()
+
+    def _job_done(self, task: asyncio.Task):
+        if not self.running:
+            self._idle.set()
+
+
+class JobRegistry:
+    """``SessionJobs`` keyed by session id."""
+
+    def __init__(self):
+        self._sessions: dict[str, SessionJobs] = {}
+
+    def get_or_create(self, session_id: str) -> SessionJobs:
+        jobs = self._sessions.get(session_id)
+        if jobs is None:
+            jobs = self._sessions[session_id] = SessionJobs()
+        return jobs
+
+    def running(self) -> int:
+        return sum(len(jobs.running) for jobs in self._sessions.values())
+
+    def cancel_all(self):
+        for jobs in self._sessions.values():
+            jobs.cancel()
@@ -0,0 +1,194 @@
+"""Extraction of a specialist's JSON result from its raw text.
+
+Specialists are told to answer with a bare JSON object, but in practice the
+text may be wrapped in a ```json fence, preceded by a sentence of preamble,
+followed by prose that itself contains braces, or cut off at ``max_tokens``.
+
+``extract_json`` finds the first balanced top-level object: the C decoder's
+``raw_decode`` walks the object from its opening brace (respecting strings
+and escapes) and stops at its matching close, ignoring whatever follows.
+When decoding fails where the text ends, the object was truncated; the part
+before that point decoded cleanly, so its open brackets are read off it
+with string operations and it is repaired:
+
+- an unterminated string value is closed, then every open array/object;
+- failing that, the document is cut back to the last complete value and the
+  open containers are closed.
+
+When decoding fails earlier, the candidate is malformed (``{placeholder}``
+prose, or a broken result). The search resumes after its closing bracket,
+found with one regex match per bracket, so nothing nested inside it is
+ever returned.
+
+The returned ``Extraction`` records which path produced the value
+(``direct``, ``fenced``, ``embedded``, ``repaired`` or ``failed``).
+
+This is about recovering more results, not speed: over
+``benchmarks/corpus/`` throughput is about the same as the old
+``json.loads``-then-slice extractor, and a repair, which decodes the text
+again after closing it, is slower than the old extractor's failure.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+
+DIRECT = "direct"
+FENCED = "fenced"
+EMBEDDED = "embedded"
+REPAIRED = "repaired"
+FAILED = "failed"
+
+# Bound on candidate "{" positions tried when earlier ones are not JSON
+# (e.g. "{placeholder}" in preamble prose).
+MAX_CANDIDATES = 16
+
+_DECODER = json.JSONDecoder(strict=False)
+_FENCE_BEFORE = re.compile(r"```[a-zA-Z]*\s*$")
+# How an object starts; anything else ("{placeholder}") is not decoded.
+_OBJECT_START = re.compile(r'\{\s*(?:["}]|\Z)')
+# Skips strings and other text up to the next bracket (group 1), or to an
+# unterminated string at the end (group 1 None). Possessive, so a failed
+# match never backtracks through the text it skipped.
+_BRACKET = re.compile(
+    r'(?:[^"{}\[\]]++|"[^"\\]*+(?:\\.[^"\\]*+)*+")*+(?:([{}\[\]])|"[^"\\]*+(?:\\.[^"\\]*+)*+\\?\Z)',
+    re.DOTALL,
+)
+# What the decoder can stop at when the text is cut inside a number or literal.
+_PARTIAL_LITERAL = re.compile(r"[\d.eE+-]+|t(?:r(?:ue?)?)?|f(?:a(?:l(?:se?)?)?)?|n(?:u(?:ll?)?)?")
+_LITERAL_CHARS = "0123456789.eE+-truefalsn"
+_NOT_BRACKETS = str.maketrans("", "", _LITERAL_CHARS + ",: \t\n\r")
+_CLOSERS = str.maketrans("{[", "}]")
+_PARTIAL_ESCAPE = re.compile(r"\\(?:u[0-9a-fA-F]{0,3})?$")
+
+
+@dataclass(frozen=True)
+class Extraction:
+    value: dict | None
+    method: str
+    start: int = -1
+    end: int = -1
+    repairs: tuple[str, ...] = ()
+
+    @property
+    def ok(self) -> bool:
+        return self.value is not None
+
+
+def extract_json(text: str) -> Extraction:
+    """Return the first top-level JSON object in ``text`` and how it was recovered."""
+    start = text.find("{")
+    for _ in range(MAX_CANDIDATES):
+        if start < 0:
+            break
+        if _OBJECT_START.match(text, start):
+            try:
+                value, end = _DECODER.raw_decode(text, start)
+            except json.JSONDecodeError as exc:
+                if _cut_off(text, exc):
+                    return _repair(text, start, exc)
+            else:
+                return Extraction(value, _method(text, start, end), start, end)
+        end = _close(text, start)
+        if end is None:
+            return Extraction(None, FAILED, start)
+        start = text.find("{", end)
+    return Extraction(None, FAILED)
+
+
+def _method(text: str, start: int, end: int) -> str:
+    before = text[:start]
+    if not before.strip() and not text[end:].strip():
+        return DIRECT
+    if _FENCE_BEFORE.search(before):
+        return FENCED
+    return EMBEDDED
+
+
+def _close(text: str, start: int) -> int | None:
+    """End of the balanced brackets opened at ``start``; None if the text
+    ends first (inside a string, or with brackets open)."""
+    depth = 0
+    for m in _BRACKET.finditer(text, start):
+        if m.group(1) is None:
+            return None
+        depth += 1 if m.group(1) in "{[" else -1
+        if depth == 0:
+            return m.end()
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Truncation repair
+# ---------------------------------------------------------------------------
+
+def _cut_off(text: str, exc: json.JSONDecodeError) -> bool:
+    """Whether the decoder stopped where the text was cut: at its end, in a
+    string running to its end, or in a partial number or literal."""
+    tail = text[exc.pos:].rstrip()
+    return not tail or exc.msg.startswith("Unterminated string") or bool(_PARTIAL_LITERAL.fullmatch(tail))
+
+
+def _repair(text: str, start: int, exc: json.JSONDecodeError) -> Extraction:
+    """Close the object cut off at the end of ``text``.
+
+    Everything before ``exc.pos`` decoded cleanly, so its open brackets are
+    found without scanning it again, and the rest is at most one string or
+    literal.
+    """
+    prefix = text[start:exc.pos]
+    opened = _open_brackets(prefix)
+    if not opened or opened.strip("{["):
+        return Extraction(None, FAILED, start)
+    closers = opened[::-1].translate(_CLOSERS)
+    in_object = opened[-1] == "{"
+
+    attempts: list[tuple[str, tuple[str, ...]]] = []
+    if exc.msg.startswith("Unterminated string") and (not in_object or prefix.rstrip().endswith(":")):
+        body = prefix + _PARTIAL_ESCAPE.sub("", text[exc.pos:].rstrip()) + '"'
+        attempts.append((body + closers, ("closed string", f"closed {len(closers)} containers")))
+    attempts.append((
+        _last_complete_value(prefix, in_object) + closers,
+        ("trimmed to last complete value", f"closed {len(closers)} containers"),
+    ))
+
+    for candidate, repairs in attempts:
+        try:
+            value = json.loads(candidate, strict=False)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(value, dict):
+            return Extraction(value, REPAIRED, start, len(text), repairs)
+    return Extraction(None, FAILED, start)
+
+
+def _open_brackets(prefix: str) -> str:
+    """The brackets a valid start of a JSON document leaves open, outermost
+    first. Outside its strings it holds only brackets, separators, numbers
+    and literals, so dropping the strings and then those characters leaves
+    the brackets, and matched pairs cancel out."""
+    unquoted = "".join(prefix.replace("\\\\", "").replace('\\"', "").split('"')[::2])
+    brackets = unquoted.translate(_NOT_BRACKETS)
+    while True:
+        reduced = brackets.replace("{}", "").replace("[]", "")
+        if reduced == brackets:
+            return brackets
+        brackets = reduced
+
+
+def _last_complete_value(prefix: str, in_object: bool) -> str:
+    """``prefix`` without a number or literal that may be partial, a trailing
+    comma, or a key still waiting for its value."""
+    prefix = prefix.rstrip(_LITERAL_CHARS)
+    while True:
+        prefix = prefix.rstrip()
+        if prefix.endswith(","):
+            prefix = prefix[:-1]
+            continue
+        key = prefix[:-1].rstrip() if prefix.endswith(":") else prefix
+        if in_object and key.endswith('"'):
+            quote = key.rfind('"', 0, -1)
+            if quote >= 0 and key[:quote].rstrip().endswith(("{", ",")):
+                prefix = key[:quote]
+                continue
+        return prefix
@@ -0,0 +1,231 @@
+"""Incremental JSON scanner for streamed LLM output.
+
+Tool-call arguments and specialist answers arrive as many small text
+fragments. Re-running ``json.loads`` on the growing buffer after every fragment
+is quadratic and only succeeds once the whole document is finished.
+``JSONScanner`` walks each character exactly once, tracks where it is in the
+document, and reports values at *watched paths* the moment they close.
+
+Paths are tuples of object keys / array indexes from the root; ``"*"`` matches
+any single key or index:
+
+    scanner = JSONScanner(watch=[("subagent_type",), ("widgets", "*")])
+    for fragment in stream:
+        for path, value in scanner.feed(fragment):
+            ...
+"""
+
+import json
+import re
+from collections.abc import Iterable
+from typing import Any
+
+Path = tuple[str | int, ...]
+
+_WHITESPACE = " \t\r\n"
+_SCALAR_END = ",}]" + _WHITESPACE
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class _Frame:
+    """One open object or array on the scanner stack."""
+
+    __slots__ = ("kind", "key", "index", "expect_key")
+
+    def __init__(self, kind: str):
+        self.kind = kind            # "{" or "["
+        self.key: str | None = None
+        self.index = 0
+        self.expect_key = kind == "{"
+
+    def slot(self) -> str | int | None:
+        return self.key if self.kind == "{" else self.index
+
+
+class _Capture:
+    """Raw text of a watched value that is still being written."""
+
+    __slots__ = ("path", "depth", "parts", "start")
+
+    def __init__(self, path: Path, depth: int, start: int):
+        self.path = path
+        self.depth = depth
+        self.parts: list[str] = []
+        self.start = start
+
+
+def _matches(path: Path, pattern: Path) -> bool:
+    if len(path) != len(pattern):
+        return False
+    return all(p == "*" or p == k for k, p in zip(path, pattern))
+
+
+class JSONScanner:
+    """Single-pass, fragment-at-a-time JSON structure tracker.
+
+    Only values at watched paths are buffered and decoded, so cost stays
+    linear in the total input length regardless of how it is fragmented.
+    Malformed input never raises; the scanner simply stops matching.
+    """
+
+    def __init__(self, watch: Iterable[Path] = ()):
+        self.watch: list[Path] = [tuple(p) for p in watch]
+        self.stack: list[_Frame] = []
+        self.started = False
+        self.complete = False
+        self.consumed = 0
+
+        self._in_string = False
+        self._escape = False
+        self._string_is_key = False
+        self._key_parts: list[str] | None = None
+        self._in_scalar = False
+        self._captures: list[_Capture] = []
+
+    # -- public -----------------------------------------------------------
+
+    @property
+    def in_string(self) -> bool:
+        return self._in_string
+
+    @property
+    def in_scalar(self) -> bool:
+        return self._in_scalar
+
+    def feed(self, fragment: str) -> list[tuple[Path, Any]]:
+        """Consume the next fragment; return ``(path, value)`` for every watched
+        value that completed inside it."""
+        done: list[tuple[Path, Any]] = []
+        if not fragment or self.complete:
+            return done
+
+        for cap in self._captures:
+            cap.start = 0
+
+        i = 0
+        n = len(fragment)
+        while i < n:
+            if self._in_string:
+                i = self._scan_string(fragment, i, n, done)
+                continue
+
+            ch = fragment[i]
+
+            if self._in_scalar:
+                if ch not in _SCALAR_END:
+                    i += 1
+                    continue
+                self._in_scalar = False
+                self._value_end(fragment, i, done)
+                if self.complete:
+                    break
+
+            if ch in _WHITESPACE:
+                i += 1
+                continue
+
+            if not self.started and ch not in "{[":
+                # Leading prose before the document starts — skip it.
+                i += 1
+                continue
+
+            if ch == "{" or ch == "[":
+                self._value_start(fragment, i)
+                self.stack.append(_Frame(ch))
+            elif ch == "}" or ch == "]":
+                if self.stack:
+                    self.stack.pop()
+                self._value_end(fragment, i + 1, done)
+                if self.complete:
+                    i += 1
+                    break
+            elif ch == '"':
+                frame = self.stack[-1] if self.stack else None
+                self._in_string = True
+                self._escape = False
+                if frame is not None and frame.kind == "{" and frame.expect_key:
+                    self._string_is_key = True
+                    self._key_parts = ['"']
+                else:
+                    self._string_is_key = False
+                    self._value_start(fragment, i)
+            elif ch == ":":
+                if self.stack:
+                    self.stack[-1].expect_key = False
+            elif ch == ",":
+                if self.stack:
+                    frame = self.stack[-1]
+                    if frame.kind == "{":
+                        frame.expect_key = True
+                        frame.key = None
+                    else:
+                        frame.index += 1
+            else:
+                self._in_scalar = True
+                self._value_start(fragment, i)
+            i += 1
+
+        self.consumed += i
+        for cap in self._captures:
+            cap.parts.append(fragment[cap.start:i])
+        return done
+
+    def path(self) -> Path:
+        """Path of the value currently being written."""
+        return tuple(frame.slot() for frame in self.stack)
+
+    # -- internals --------------------------------------------------------
+
+    def _scan_string(self, fragment: str, i: int, n: int, done) -> int:
+        if self._escape:
+            self._escape = False
+            if self._key_parts is not None:
+                self._key_parts.append(fragment[i])
+            return i + 1
+
+        m = _STRING_SPECIAL.search(fragment, i)
+        if m is None:
+            if self._key_parts is not None:
+                self._key_parts.append(fragment[i:])
+            return n
+
+        j = m.start()
+        if self._key_parts is not None:
+            self._key_parts.append(fragment[i:j + 1])
+        if fragment[j] == "\\":
+            self._escape = True
+            return j + 1
+
+        self._in_string = False
+        if self._string_is_key:
+            raw = "".join(self._key_parts or ())
+            self._key_parts = None
+            try:
+                self.stack[-1].key = json.loads(raw)
+            except (json.JSONDecodeError, ValueError):
+                self.stack[-1].key = raw.strip('"')
+        else:
+            self._value_end(fragment, j + 1, done)
+        return j + 1
+
+    def _value_start(self, fragment: str, i: int):
+        self.started = True
+        if not self.watch:
+            return
+        path = self.path()
+        if any(_matches(path, p) for p in self.watch):
+            self._captures.append(_Capture(path, len(self.stack), i))
+
+    def _value_end(self, fragment: str, end: int, done):
+        """Close the value that just finished at ``fragment[:end]``."""
+        depth = len(self.stack)
+        while self._captures and self._captures[-1].depth == depth:
+            cap = self._captures.pop()
+            cap.parts.append(fragment[cap.start:end])
+            raw = "".join(cap.parts)
+            try:
+                done.append((cap.path, json.loads(raw)))
+            except (json.JSONDecodeError, ValueError):
+                pass
+        if depth == 0:
+            self.complete = True
@@ -0,0 +1,187 @@
+"""Background, batched sink for the server's terminal debug output.
+
+Printing every streamed token with ``flush=True`` from the event loop makes
+the terminal a throughput bottleneck under load. ``LogSink`` queues records on
+the calling thread, and a daemon thread writes whatever has accumulated in one
+``write()`` + ``flush()`` every ``flush_interval`` seconds.
+
+Token-trace records are queued raw by ``trace()`` as ``(prefix, text)`` and
+formatted by the writer thread, one batch per flush: it tracks where lines
+start and puts ``prefix`` in front of each. The streaming thread only appends
+a tuple, without the lock (``deque.append`` is atomic) or a wake-up; at
+``full`` the writer polls every ``flush_interval`` instead of sleeping until
+notified. The lock is only taken to start the writer or when it is behind.
+
+Verbosity levels (``DEBUG_LOG`` env var):
+    off      nothing is formatted or queued
+    summary  turn headers, dispatches, results, timings
+    full     summary + the token-by-token trace (default)
+
+Drop policy: when more than ``max_pending`` records are waiting, new
+token-trace records are dropped and counted, and a single "dropped" marker is
+written with the next batch. Summary records are never dropped — there are
+only a handful per turn.
+"""
+
+import os
+import sys
+import threading
+from collections import deque
+from typing import TextIO
+
+# A preformatted string, or a (prefix, text) token-trace record
+Record = str | tuple[str, str]
+
+OFF = 0
+SUMMARY = 1
+FULL = 2
+
+LEVELS = {"off": OFF, "summary": SUMMARY, "full": FULL}
+
+
+def parse_level(value: str | None, default: int = FULL) -> int:
+    """Map a ``DEBUG_LOG`` value to a level, falling back to ``default``."""
+    if not value:
+        return default
+    return LEVELS.get(value.strip().lower(), default)
+
+
+class LogSink:
+    """Thread-safe, non-blocking text sink with batched writes."""
+
+    def __init__(
+        self,
+        level: int = FULL,
+        max_pending: int = 10_000,
+        flush_interval: float = 0.05,
+        stream: TextIO | None = None,
+    ):
+        self.level = level
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self._stream = stream
+
+        self._pending: deque[Record] = deque()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+        self._dropped_since_write = 0
+        self._high_water = max(1, max_pending // 2)
+        self._at_line_start = True  # writer thread only
+        # trace() appends without notifying, so at FULL an idle writer polls
+        self._idle_wait = max(flush_interval, 0.01) if level >= FULL else None
+
+        self.dropped = 0
+        self.batches = 0
+        self.records = 0
+
+    def enabled(self, level: int) -> bool:
+        return self.level >= level
+
+    def emit(self, text: str, level: int = SUMMARY):
+        """Queue ``text`` for writing. Never blocks on the terminal."""
+        if self.level < level:
+            return
+        self._queue(text, level)
+
+    def trace(self, prefix: str, text: str):
+        """Queue a streamed fragment at ``FULL``; the writer puts ``prefix``
+        at the start of each line it begins."""
+        if self.level < FULL or self._closed:
+            return
+        if self._thread is None or len(self._pending) >= self._high_water:
+            self._queue((prefix, text), FULL)
+        else:
+            self._pending.append((prefix, text))
+
+    def _queue(self, record: Record, level: int):
+        with self._cond:
+            if self._closed:
+                return
+            if level >= FULL and len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                self._dropped_since_write += 1
+                return
+            was_empty = not self._pending
+            self._pending.append(record)
+            backlog = len(self._pending) >= self._high_water
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="debug-log-sink", daemon=True
+                )
+                self._thread.start()
+            elif was_empty or backlog:
+                self._cond.notify()
+
+    def close(self, timeout: float = 2.0):
+        """Write everything still queued and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    # -- writer thread ----------------------------------------------------
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait(self._idle_wait)
+                if self._closed and not self._pending:
+                    return
+                if not self._closed and len(self._pending) < self._high_water:
+                    # Let a batch build up instead of writing every token;
+                    # emit() wakes us early if the backlog grows.
+                    self._cond.wait(self.flush_interval)
+                batch = [self._pending.popleft() for _ in range(len(self._pending))]
+                dropped = self._dropped_since_write
+                self._dropped_since_write = 0
+
+            self.records += len(batch)
+            if dropped:
+                batch.append(f"\n  …({dropped} trace records dropped — log sink behind)\n")
+            self._write(self._render(batch))
+
+    def _render(self, batch: list[Record]) -> str:
+        out: list[str] = []
+        at_line_start = self._at_line_start
+        for record in batch:
+            if isinstance(record, str):
+                out.append(record)
+                at_line_start = record.endswith("\n")
+                continue
+            prefix, text = record
+            if "\n" not in text:
+                if text:
+                    if at_line_start:
+                        out.append(prefix)
+                        at_line_start = False
+                    out.append(text)
+                continue
+            for i, line in enumerate(text.split("\n")):
+                if i:
+                    out.append("\n")
+                    at_line_start = True
+                if line:
+                    if at_line_start:
+                        out.append(prefix)
+                        at_line_start = False
+                    out.append(line)
+        self._at_line_start = at_line_start
+        return "".join(out)
+
+    def _write(self, text: str):
+        stream = self._stream or sys.stdout
+        try:
+            stream.write(text)
+            stream.flush()
+            self.batches += 1
+        except (OSError, ValueError):
+            # Closed or broken terminal — debug output is best-effort.
+            pass
+
+
+def sink_from_env() -> LogSink:
+    return LogSink(level=parse_level(os.environ.get("DEBUG_LOG")))
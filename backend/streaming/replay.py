@@ -0,0 +1,118 @@
+"""Per-session event log with monotonically increasing SSE ids.
+
+Every event a turn produces is appended to its session's ``EventLog`` and
+sent to the client with an ``id``. If the browser or the Next.js proxy drops
+the connection, the client reconnects with ``Last-Event-ID`` and
+``EventLog.subscribe`` replays only the events after that id, then follows
+the live turn until it finishes — no new model calls.
+
+The log is a bounded ring (``SSE_REPLAY_EVENTS``, default 2048 events per
+session). A client whose last id has already been evicted gets a
+``replay_gap`` event first so it knows to re-fetch the session.
+
+Like sessions.manager, the streaming stores (``ReplayStore`` here,
+streaming.runs' ``RunRegistry`` and streaming.jobs' ``JobRegistry``) keep
+everything in process memory; their internals are what moves to Redis
+when the server runs more than one worker.
+"""
+
+import asyncio
+import os
+from collections import deque
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from itertools import islice
+
+REPLAY_EVENTS = int(os.environ.get("SSE_REPLAY_EVENTS", "2048"))
+
+
+@dataclass(frozen=True)
+class LoggedEvent:
+    id: int
+    name: str
+    payload: dict
+
+
+class EventLog:
+    """Bounded replay ring for one session; ids never repeat across turns."""
+
+    def __init__(self, maxlen: int = REPLAY_EVENTS):
+        self._events: deque[LoggedEvent] = deque(maxlen=maxlen)
+        self._next_id = 1
+        self._changed = asyncio.Event()
+        self.active = False
+
+    @property
+    def last_id(self) -> int:
+        return self._next_id - 1
+
+    def append(self, name: str, payload: dict) -> LoggedEvent:
+        event = LoggedEvent(self._next_id, name, payload)
+        self._next_id += 1
+        self._events.append(event)
+        self._notify()
+        return event
+
+    def begin(self) -> int:
+        """Mark a turn as producing; returns the id just before its first event."""
+        self.active = True
+        self._notify()
+        return self.last_id
+
+    def end(self):
+        self.active = False
+        self._notify()
+
+    def since(self, last_id: int) -> tuple[list[LoggedEvent], bool]:
+        """Events with ``id > last_id`` and whether some were already evicted."""
+        if not self._events:
+            return [], False
+        oldest = self._events[0].id
+        gap = last_id + 1 < oldest
+        start = max(0, last_id + 1 - oldest)
+        return list(islice(self._events, start, None)), gap
+
+    async def subscribe(self, last_id: int = 0) -> AsyncIterator[LoggedEvent]:
+        """Replay events after ``last_id``, then follow live until the turn ends."""
+        cursor = last_id
+        first = True
+        while True:
+            changed = self._changed
+            events, gap = self.since(cursor)
+            if gap and first:
+                yield LoggedEvent(cursor, "replay_gap", {
+                    "lastEventId": cursor,
+                    "oldestAvailable": self._events[0].id,
+                })
+            first = False
+            for event in events:
+                cursor = event.id
+                yield event
+            if not self.active and cursor >= self.last_id:
+                return
+            await changed.wait()
+
+    def _notify(self):
+        # Wake every current waiter, then arm a fresh event for the next change.
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+class ReplayStore:
+    """Event logs keyed by session id."""
+
+    def __init__(self, maxlen: int = REPLAY_EVENTS):
+        self._maxlen = maxlen
+        self._logs: dict[str, EventLog] = {}
+
+    def get(self, session_id: str) -> EventLog | None:
+        return self._logs.get(session_id)
+
+    def get_or_create(self, session_id: str) -> EventLog:
+        log = self._logs.get(session_id)
+        if log is None:
+            log = self._logs[session_id] = EventLog(self._maxlen)
+        return log
+
+    def drop(self, session_id: str):
+        self._logs.pop(session_id, None)
@@ -0,0 +1,192 @@
+"""Background chat runs, decoupled from the HTTP connection that started them.
+
+``POST /api/chat`` used to drive the orchestrator from inside its own
+``EventSourceResponse`` generator, so a turn only existed for as long as that
+one connection. A ``Run`` is instead a detached task (one producer) that
+appends its events to the session's ``EventLog``; any number of subscribers —
+the tab that started it, a second tab, the report page — attach to the run
+and read the same events. One LLM execution serves every viewer.
+
+The registry keeps the latest run per session, so a finished run can still be
+re-read until the next turn for that session replaces it.
+
+A run started with an admission ``Ticket`` is ``queued`` until the ticket is
+acquired; its events (and ``start_id``) only begin once it is admitted, so a
+queued turn never interleaves with the one still running for its session.
+One cancelled while queued never touches the session log at all.
+"""
+
+import asyncio
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass, field
+
+from streaming.admission import Overloaded, Ticket
+from streaming.replay import EventLog, LoggedEvent, ReplayStore
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETE = "complete"
+ERROR = "error"
+CANCELLED = "cancelled"
+REJECTED = "rejected"
+
+
+@dataclass
+class Run:
+    run_id: str
+    session_id: str
+    log: EventLog
+    start_id: int | None = None
+    status: str = QUEUED
+    started_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    end_id: int | None = None
+    subscribers: int = 0
+    error: str | None = None
+    task: asyncio.Task | None = field(default=None, repr=False)
+    _started: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    async def events(self, last_id: int | None = None) -> AsyncIterator[LoggedEvent]:
+        """This run's events after ``last_id`` (default: from its first event).
+
+        Stops at the run's last event, even if a later turn has already
+        appended to the same session log. Waits while the run is queued;
+        yields nothing if it is cancelled before it starts.
+        """
+        await self._started.wait()
+        if self.start_id is None:
+            return
+        cursor = self.start_id if last_id is None else max(last_id, self.start_id)
+        if self.end_id is not None and cursor >= self.end_id:
+            return
+        self.subscribers += 1
+        try:
+            async for event in self.log.subscribe(cursor):
+                yield event
+                if event.name == "done" or (self.end_id is not None and event.id >= self.end_id):
+                    return
+        finally:
+            self.subscribers -= 1
+
+    def to_dict(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "start_event_id": self.start_id,
+            "last_event_id": self.end_id if self.end_id is not None else (
+                self.log.last_id if self.start_id is not None else None
+            ),
+            "subscribers": self.subscribers,
+            "error": self.error,
+        }
+
+
+class RunRegistry:
+    """Runs keyed by id and by session."""
+
+    def __init__(self, store: ReplayStore | None = None):
+        self.store = store or ReplayStore()
+        self._runs: dict[str, Run] = {}
+        self._latest: dict[str, str] = {}
+
+    def start(
+        self,
+        session_id: str,
+        events: AsyncIterator[tuple[str, dict]],
+        on_error: Callable[[Run, BaseException], None] | None = None,
+        ticket: Ticket | None = None,
+    ) -> Run:
+        """Start a background run that appends ``events`` to the session log.
+
+        With a ``ticket`` the run waits for admission before producing.
+        """
+        run = Run(
+            run_id=uuid.uuid4().hex[:12],
+            session_id=session_id,
+            log=self.store.get_or_create(session_id),
+        )
+
+        previous = self.latest(session_id)
+        if previous is not None and not previous.active:
+            self._runs.pop(previous.run_id, None)
+        self._runs[run.run_id] = run
+        self._latest[session_id] = run.run_id
+
+        run.task = asyncio.create_task(self._pump(run, events, on_error, ticket))
+        return run
+
+    def get(self, run_id: str) -> Run | None:
+        return self._runs.get(run_id)
+
+    def latest(self, session_id: str) -> Run | None:
+        run_id = self._latest.get(session_id)
+        return self._runs.get(run_id) if run_id else None
+
+    def active(self) -> list[Run]:
+        return [run for run in self._runs.values() if run.active]
+
+    def drop(self, session_id: str):
+        run_id = self._latest.pop(session_id, None)
+        run = self._runs.pop(run_id, None) if run_id else None
+        if run is not None and run.task is not None:
+            run.task.cancel()
+        self.store.drop(session_id)
+
+    def cancel_all(self):
+        for run in self.active():
+            if run.task is not None:
+                run.task.cancel()
+
+    async def _pump(self, run: Run, events, on_error, ticket):
+        log = run.log
+        try:
+            if ticket is not None:
+                await ticket.acquire()
+            self._begin(run)
+            async for name, payload in events:
+                log.append(name, payload)
+            run.status = COMPLETE
+        except Overloaded as exc:
+            self._begin(run)
+            run.status = REJECTED
+            run.error = str(exc)
+            log.append("error", {"detail": str(exc), "retryAfter": exc.retry_after})
+            log.append("done", {"status": "rejected"})
+        except asyncio.CancelledError:
+            run.status = CANCELLED
+            if run.start_id is not None:
+                log.append("done", {"status": "cancelled"})
+            raise
+        except Exception as exc:
+            self._begin(run)
+            run.status = ERROR
+            run.error = str(exc)
+            if on_error is not None:
+                on_error(run, exc)
+            log.append("error", {"detail": str(exc)})
+            log.append("done", {"status": "error"})
+        finally:
+            if ticket is not None:
+                ticket.release()
+            run.finished_at = time.time()
+            if run.start_id is None:
+                run._started.set()  # release waiting subscribers: nothing to read
+            else:
+                run.end_id = log.last_id
+                log.end()
+
+    @staticmethod
+    def _begin(run: Run):
+        if run.start_id is None:
+            run.start_id = run.log.begin()
+            run.status = RUNNING
+            run._started.set()
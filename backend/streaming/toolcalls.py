@@ -0,0 +1,83 @@
+"""Follow streamed tool-call chunks and report ``task`` dispatches early.
+
+The orchestrator dispatches specialists through the deepagents ``task`` tool,
+whose arguments (``subagent_type`` + a long ``description``) stream in as JSON
+fragments. ``TaskCallTracker`` feeds each fragment through a ``JSONScanner``
+so the UI can be told which specialist is starting as soon as the
+``subagent_type`` string closes, without waiting for the description.
+"""
+
+from dataclasses import dataclass
+
+from streaming.jsonscan import JSONScanner
+
+_WATCH = [("subagent_type",), ("description",)]
+
+
+@dataclass
+class TaskEvent:
+    """A dispatch milestone for one tool call.
+
+    kind is ``"start"`` once the target specialist is known, and
+    ``"dispatched"`` once the full argument object has been received.
+    """
+
+    kind: str
+    tool_call_id: str
+    agent_id: str
+    description: str = ""
+
+
+class _Call:
+    __slots__ = ("scanner", "agent_id", "description")
+
+    def __init__(self):
+        self.scanner = JSONScanner(watch=_WATCH)
+        self.agent_id = ""
+        self.description = ""
+
+
+class TaskCallTracker:
+    """Per-turn state for every tool call the orchestrator streams."""
+
+    def __init__(self):
+        self._calls: dict[str, _Call] = {}
+        self._current_id: str | None = None
+
+    def agent_for(self, tool_call_id: str) -> str:
+        """Specialist id targeted by a tool call, or ``""`` if unknown."""
+        call = self._calls.get(tool_call_id)
+        return call.agent_id if call else ""
+
+    def feed(self, chunk) -> list[TaskEvent]:
+        """Consume one ``AIMessageChunk`` and return any dispatch milestones."""
+        events: list[TaskEvent] = []
+
+        # Tool call starts (have name + id)
+        for call in getattr(chunk, "tool_calls", None) or ():
+            if call.get("name") and call.get("id"):
+                self._current_id = call["id"]
+                self._calls.setdefault(call["id"], _Call())
+
+        # Tool call arg streaming
+        for tcc in getattr(chunk, "tool_call_chunks", None) or ():
+            tc_id = tcc.get("id") or self._current_id
+            frag = tcc.get("args") or ""
+            if not tc_id or not frag:
+                continue
+            call = self._calls.setdefault(tc_id, _Call())
+            if call.scanner.complete:
+                continue
+
+            for path, value in call.scanner.feed(frag):
+                if path == ("subagent_type",) and isinstance(value, str):
+                    call.agent_id = value
+                    if value:
+                        events.append(TaskEvent("start", tc_id, value))
+                elif path == ("description",) and isinstance(value, str):
+                    call.description = value
+
+            if call.scanner.complete and call.agent_id:
+                events.append(TaskEvent("dispatched", tc_id, call.agent_id, call.description))
+
+        return events
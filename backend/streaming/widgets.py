@@ -0,0 +1,98 @@
+"""Report pieces of a specialist's answer while it is still being written.
+
+Specialists answer with one JSON document (summary, score, bullets, then a
+``widgets`` object holding 2-4 visualizations). With the orchestrator streamed
+with ``subgraphs=True`` their tokens arrive alongside the orchestrator's,
+tagged with ``lc_agent_name``. ``WidgetStreamer`` runs one ``JSONScanner``
+per specialist message and reports:
+
+- ``"summary"`` once both ``summary`` and ``score`` have closed, and
+- ``"widget"`` each time a key under ``widgets`` closes,
+
+so the report grid can fill in before the final ``agent_result``.
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from streaming.jsonscan import JSONScanner
+
+_WATCH = [("summary",), ("score",), ("score_label",), ("widgets", "*")]
+
+
+@dataclass
+class WidgetEvent:
+    """A piece of one specialist's result.
+
+    kind is ``"summary"`` (payload has summary/score/scoreLabel) or
+    ``"widget"`` (key is the entry under ``widgets``, payload its data).
+    """
+
+    kind: str
+    agent_id: str
+    payload: dict = field(default_factory=dict)
+    key: str = ""
+
+
+class _Output:
+    """Scanner state for one streamed specialist message."""
+
+    __slots__ = ("scanner", "fields")
+
+    def __init__(self):
+        self.scanner = JSONScanner(watch=_WATCH)
+        self.fields: dict[str, Any] = {}
+
+
+class WidgetStreamer:
+    """Per-turn state for every specialist message streamed from subgraphs."""
+
+    def __init__(self, agent_ids: Iterable[str]):
+        self._agents = set(agent_ids)
+        self._outputs: dict[str, _Output] = {}
+        # What has already been reported per agent, so a retried or
+        # re-dispatched specialist does not repeat itself.
+        self._sent: dict[str, set[str]] = {}
+
+    def agent_for(self, metadata: dict) -> str:
+        """Specialist that produced a subgraph chunk, or ``""``."""
+        name = metadata.get("lc_agent_name") or ""
+        return name if name in self._agents else ""
+
+    def feed(self, agent_id: str, message_id: str, text: str) -> list[WidgetEvent]:
+        """Consume the next text fragment of one specialist message."""
+        events: list[WidgetEvent] = []
+        if not text:
+            return events
+        out = self._outputs.setdefault(f"{agent_id}:{message_id}", _Output())
+        if out.scanner.complete:
+            return events
+
+        sent = self._sent.setdefault(agent_id, set())
+        for path, value in out.scanner.feed(text):
+            if path[0] == "widgets":
+                key = str(path[1])
+                if isinstance(value, dict) and key not in sent:
+                    sent.add(key)
+                    events.append(WidgetEvent("widget", agent_id, value, key))
+            else:
+                out.fields[path[0]] = value
+
+        fields = out.fields
+        if "summary" in fields and "score" in fields and "" not in sent:
+            sent.add("")
+            events.append(WidgetEvent("summary", agent_id, {
+                "summary": fields["summary"],
+                "score": fields["score"],
+                "scoreLabel": fields.get("score_label"),
+            }))
+        return events
+
+    def finish(self, agent_id: str):
+        """Forget an agent once its final result is out, so a later dispatch
+        in the same turn streams again."""
+        self._sent.pop(agent_id, None)
+        prefix = f"{agent_id}:"
+        for key in [k for k in self._outputs if k.startswith(prefix)]:
+            del self._outputs[key]
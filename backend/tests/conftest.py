@@ -30,6 +30,17 @@ def _require_api_key():
         pytest.skip("ANTHROPIC_API_KEY not set — skipping LLM test")
 
 
+@pytest.fixture(autouse=True)
+def provider_guards(monkeypatch):
+    """Fresh provider guards for every test: one test's calls or failures
+    never drain the shared rate limit or trip the breaker for the next."""
+    from agents import providers
+
+    for name in list(providers.guards):
+        monkeypatch.setitem(providers.guards, name, providers.guard_from_env(name))
+    return providers.guards
+
+
 # ---------------------------------------------------------------------------
 # Orchestrator fixtures
 # ---------------------------------------------------------------------------
@@ -3,17 +3,58 @@
 Tests that:
 - All 6 specialist agents load correctly from YAML
 - Each agent has the right tools, description, and system prompt
+- The config registry parses once and hot-swaps edited files
+- The orchestrator graph is compiled once and bound per checkpointer
+- Direct dispatch starts each specialist once its triggering questions are answered
+- Every model request marks the static system prompt as a prompt-cache breakpoint
+  and each call's cache read/write tokens are recorded
+- Model routing falls back across tiers on first-token timeouts, errors,
+  load and budget, and records the tier used
+- Specialist runs are bounded by their deadline (a timed-out task call tells
+  the orchestrator to go on without it) and hedged after their learned p95;
+  a hedged task call's runs are tagged for the stream and the loser is stopped
+- Throttled model calls are retried through the shared provider guard, only
+  before their first streamed token, and fail the breaker once per call
+- Task dispatches carry a short description plus the context ledger of the
+  founder's messages keyed by question id
+- Orchestrator requests over the history budget compact old specialist results
+  and fold old turns into a summary, and report the tokens saved
+- Specialists in parallel widget mode write their analysis first, then
+  generate each widget concurrently and merge them into the usual result
+- Speculative dispatch estimates the first message's answers from the
+  questions' signals and holds each run until its answers are confirmed
 - The orchestrator actually dispatches subagents when given full context
 - Each specialist agent can be invoked independently
 """
 
+import asyncio
+import copy
+import dataclasses
+import json
+import os
+import shutil
+import time
 import uuid
+from types import SimpleNamespace
 import pytest
 
 from deepagents import create_deep_agent
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+from langchain_core.messages import AIMessageChunk, ToolMessage
+from langchain_core.outputs import ChatGenerationChunk
 from langgraph.checkpoint.memory import MemorySaver
 
+from agents import deadlines, fanout, history, promptcache, providers
+from agents import orchestrator as orchestrator_module
+from agents.deadlines import DeadlineExceeded, LatencyTracker, arace, parse_deadline, race
+from agents.fanout import AnswerRecord, answer_record, pending_specialists, record_answers
+from agents.history import SUMMARY_HEADER, compact_history, count_tokens
+from agents.ledger import LEDGER_HEADER, build_ledger, expand_description, render_ledger
+from agents.registry import AGENTS_PATH, QUESTIONS_PATH, ConfigRegistry, _build_subagent_defs
+from agents.routing import Router, Tier, cost_usd, parse_route, parse_tiers, routed_chat_model
+from agents.speculative import SessionSpeculations, Speculation, slot_evidence, speculative_specialists
 from agents.specialist import build_subagent_defs, get_agent_ids, get_agent_labels, load_agent_configs
+from agents.widgetgen import PARALLEL, RESEARCH_NOTE, parse_widget_mode, research_prompt, widget_templates
 from tests.conftest import invoke_agent, stream_events, tool_names_used
 
 EXPECTED_AGENT_IDS = {"market", "competition", "customer", "business_model", "risks", "gtm"}
@@ -104,7 +145,833 @@ def test_system_prompts_are_substantive():
 
 
 # ---------------------------------------------------------------------------
-# Test 5: Orchestrator dispatches subagents when given full context
+# Test 5: Config registry caches and hot-reloads
+# ---------------------------------------------------------------------------
+
+def test_config_registry_caches_and_hot_reloads(tmp_path):
+    """get() returns the same parsed snapshot until a file changes on disk;
+    reload() then swaps in a rebuilt prompt and notifies listeners, and a
+    broken edit leaves the last good snapshot in place."""
+    agents, questions = tmp_path / "agents.yaml", tmp_path / "questions.yaml"
+    shutil.copy(AGENTS_PATH, agents)
+    shutil.copy(QUESTIONS_PATH, questions)
+    reg = ConfigRegistry(agents, questions)
+    seen = []
+    reg.subscribe(seen.append)
+
+    first = reg.get()
+    assert reg.get() is first
+    assert reg.reload() is False
+    assert "`market`: Market Opportunity" in first.orchestrator_prompt
+
+    # Bump mtimes explicitly: the edit can land within the filesystem's clock tick.
+    later = os.stat(agents).st_mtime_ns + 10**9
+    agents.write_text(agents.read_text().replace('label: "Market Opportunity"', 'label: "Market Size"'))
+    os.utime(agents, ns=(later, later))
+    assert reg.reload() is True
+    second = reg.get()
+    assert second.version == first.version + 1
+    assert second.agent_labels["market"] == "Market Size"
+    assert "`market`: Market Size" in second.orchestrator_prompt
+    assert seen[-1] is second
+
+    questions.write_text("orchestrator: [unclosed")
+    os.utime(questions, ns=(later + 10**9, later + 10**9))
+    assert reg.reload() is False
+    assert reg.get() is second
+    assert reg.last_error is not None
+
+
+# ---------------------------------------------------------------------------
+# Test 6: Orchestrator template is compiled once per config version
+# ---------------------------------------------------------------------------
+
+def test_orchestrator_template_binds_per_checkpointer(monkeypatch):
+    """create_orchestrator() reuses the compiled template and only swaps the
+    checkpointer; a new config version compiles a new template."""
+    template = orchestrator_module.warmup()
+    a = orchestrator_module.create_orchestrator(checkpointer=MemorySaver())
+    b = orchestrator_module.create_orchestrator()
+
+    assert orchestrator_module.get_template() is template
+    assert a.checkpointer is not b.checkpointer
+    assert a.nodes.keys() == b.nodes.keys()
+
+    config = orchestrator_module.registry.get()
+    bumped = dataclasses.replace(config, version=config.version + 1)
+    monkeypatch.setattr(orchestrator_module.registry, "get", lambda: bumped)
+    monkeypatch.setattr(orchestrator_module, "_templates", {template.mode: template})
+    assert orchestrator_module.get_template() is not template
+    assert orchestrator_module.get_template().version == bumped.version
+
+
+# ---------------------------------------------------------------------------
+# Test 7: Direct dispatch follows the questions' triggers_agents
+# ---------------------------------------------------------------------------
+
+def test_direct_dispatch_follows_question_triggers():
+    """Nothing starts before the required questions are answered; then each
+    specialist starts once the questions that trigger it are answered, and
+    the rest when the interview is complete."""
+    config = orchestrator_module.registry.get()
+    assert config.required_questions == {"idea_core", "target_customer"}
+    assert config.agent_triggers["market"] == {"target_customer"}
+    assert config.agent_triggers["risks"] == {"current_stage", "team"}
+    assert "record_answers" in config.direct_orchestrator_prompt
+    assert "When dispatching agents, use the task tool" not in config.direct_orchestrator_prompt
+
+    msg = ToolMessage(content=record_answers(["idea_core", "made_up"]), name="record_answers", tool_call_id="c")
+    assert answer_record(msg) == AnswerRecord(frozenset({"idea_core"}), False)
+    assert answer_record(ToolMessage(content="{}", name="web_search", tool_call_id="c")) is None
+
+    answered = {"idea_core", "revenue_model"}
+    assert pending_specialists(answered, set()) == []
+    answered.add("target_customer")
+    assert pending_specialists(answered, set()) == ["market", "customer", "business_model"]
+    answered |= {"current_stage"}
+    assert pending_specialists(answered, {"market", "customer", "business_model"}) == ["gtm"]
+    assert set(pending_specialists(answered, {"gtm"}, complete=True)) == EXPECTED_AGENT_IDS - {"gtm"}
+
+
+# ---------------------------------------------------------------------------
+# Test 8: Static system prompts carry prompt-cache breakpoints (offline)
+# ---------------------------------------------------------------------------
+
+class _Payloads(list):
+    """Recorded request payloads; ``reply(payload)`` scripts the text answers."""
+
+    @staticmethod
+    def reply(payload: dict) -> str:
+        return "ok"
+
+
+@pytest.fixture
+def anthropic_payloads(monkeypatch):
+    """Record every outgoing Anthropic request instead of sending it.
+
+    The orchestrator (llm mode) dispatches ``market`` on its first call; every
+    other call answers ``reply(payload)`` ("ok" unless a test sets it) and
+    reports 900 cache-read / 100 cache-write tokens.
+    Streaming requests get the same message as server-sent events.
+    """
+    from anthropic.types import (
+        Message, MessageDeltaUsage, RawContentBlockDeltaEvent, RawContentBlockStartEvent,
+        RawContentBlockStopEvent, RawMessageDeltaEvent, RawMessageStartEvent, RawMessageStopEvent,
+        TextBlock, TextDelta, ToolUseBlock, Usage,
+    )
+    from anthropic.types.raw_message_delta_event import Delta
+    from langchain_anthropic import ChatAnthropic
+
+    def events(message):
+        yield RawMessageStartEvent(type="message_start", message=message.model_copy(update={"content": []}))
+        for i, block in enumerate(message.content):
+            yield RawContentBlockStartEvent(type="content_block_start", index=i, content_block=block)
+            if block.type == "text":
+                yield RawContentBlockDeltaEvent(
+                    type="content_block_delta", index=i, delta=TextDelta(type="text_delta", text=block.text)
+                )
+            yield RawContentBlockStopEvent(type="content_block_stop", index=i)
+        yield RawMessageDeltaEvent(
+            type="message_delta", delta=Delta(stop_reason="end_turn"),
+            usage=MessageDeltaUsage(**message.usage.model_dump(include=set(MessageDeltaUsage.model_fields))),
+        )
+        yield RawMessageStopEvent(type="message_stop")
+
+    payloads = _Payloads()
+
+    def create(self, payload):
+        payloads.append(payload)
+        tools = {t.get("name") for t in payload.get("tools") or []}
+        system = payload.get("system") or []
+        system = system if isinstance(system, str) else "".join(b["text"] for b in system)
+        if "task" in tools and "Do NOT dispatch" not in system and len(payload["messages"]) == 1:
+            content = [ToolUseBlock(type="tool_use", id="call_1", name="task",
+                                    input={"subagent_type": "market", "description": "Size the market."})]
+        else:
+            content = [TextBlock(type="text", text=payloads.reply(payload))]
+        message = Message(
+            id=f"msg_{len(payloads)}", type="message", role="assistant", model=payload["model"],
+            content=content, stop_reason="end_turn",
+            usage=Usage(input_tokens=10, output_tokens=1, cache_read_input_tokens=900,
+                        cache_creation_input_tokens=100),
+        )
+        return events(message) if payload.get("stream") else message
+
+    monkeypatch.setattr(ChatAnthropic, "_create", create)
+    monkeypatch.setattr(promptcache, "prompt_cache_stats", promptcache.PromptCacheStats())
+    monkeypatch.setattr(orchestrator_module, "_templates", {})
+    return payloads
+
+
+def _marked(blocks) -> list[int]:
+    return [i for i, b in enumerate(blocks) if isinstance(b, dict) and "cache_control" in b]
+
+
+def _text(system) -> str:
+    return system if isinstance(system, str) else "".join(b["text"] for b in system)
+
+
+def test_prompt_cache_breakpoints_in_request_payloads(anthropic_payloads):
+    """The orchestrator (both modes), its task subagents and the direct-dispatch
+    specialists send the system prompt with a breakpoint on its last block
+    when it is long enough to be cached, besides the breakpoint on the last
+    message; usage is recorded per agent."""
+    config = {"configurable": {"thread_id": "t-llm", "result_cache": False}}
+    orchestrator_module.create_orchestrator(mode="llm").invoke(
+        {"messages": [{"role": "user", "content": "A bookkeeping app for designers."}]}, config
+    )
+    orchestrator_module.create_orchestrator(mode="direct").invoke(
+        {"messages": [{"role": "user", "content": "A bookkeeping app for designers."}]},
+        {"configurable": {"thread_id": "t-direct"}},
+    )
+    fanout._build_specialists(orchestrator_module.registry.get())["risks"].invoke(
+        {"messages": [{"role": "user", "content": "Context: a bookkeeping app."}]}
+    )
+
+    # orchestrator -> market (task) -> orchestrator, direct orchestrator, risks
+    assert len(anthropic_payloads) == 5
+    specialist_prompts = {d["name"]: d["system_prompt"] for d in build_subagent_defs()}
+    # As shipped the orchestrator prompt clears Haiku's minimum; market and risks do not.
+    for i, payload in enumerate(anthropic_payloads):
+        system = payload["system"]
+        if i in (1, 4):
+            assert _marked(system) == []
+        else:
+            assert _marked(system) == [len(system) - 1]
+            assert system[-1]["cache_control"] == {"type": "ephemeral", "ttl": promptcache.PROMPT_CACHE_TTL}
+        assert _marked(payload["messages"][-1]["content"]) == [len(payload["messages"][-1]["content"]) - 1]
+    assert _text(anthropic_payloads[1]["system"]).startswith(specialist_prompts["market"][:200])
+    assert _text(anthropic_payloads[4]["system"]).startswith(specialist_prompts["risks"][:200])
+
+    agents = promptcache.prompt_cache_stats.info()["agents"]
+    assert agents["orchestrator"]["calls"] == 3
+    assert agents["market"] == agents["risks"] == {
+        "calls": 1, "input_tokens": 1010, "cache_read": 900, "cache_write": 100,
+        "output_tokens": 1, "cache_read_share": 0.891,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Test 9: Model routing across tiers
+# ---------------------------------------------------------------------------
+
+def _opted_in(defaults: dict | None = None, **agents: dict) -> dict[str, dict]:
+    """Subagent defs parsed from agents.yaml with opt-in settings the shipped
+    file leaves off merged into its ``defaults`` and ``agents`` entries."""
+    raw = copy.deepcopy(orchestrator_module.registry.get().agents_raw)
+    raw["defaults"].update(defaults or {})
+    for agent_id, settings in agents.items():
+        raw["agents"][agent_id].update(settings)
+    return {d["name"]: d for d in _build_subagent_defs(raw)}
+
+
+def test_model_routes_parse_from_agents_yaml():
+    """agents.yaml tiers resolve per agent; unknown tiers and keys are rejected."""
+    haiku = (Tier("claude-haiku-4-5-20251001", "claude-haiku-4-5-20251001"),)
+    assert all(d["route"].tiers == haiku for d in build_subagent_defs())  # no agent is routed as shipped
+
+    defs = _opted_in(customer={"model": "fast"}, business_model={"model": ["strong", "fast"]})
+    assert defs["market"]["route"].tiers == haiku
+    assert defs["customer"]["route"].label == "fast" and not defs["customer"]["route"].routed
+    business = defs["business_model"]["route"]
+    assert business.label == "strong > fast" and business.routed
+    assert defs["business_model"]["model"] == business.tiers[0].model
+    assert business.tiers[0].first_token_timeout is not None
+
+    tiers = parse_tiers({"tiers": {"strong": {"model": "s", "first_token_timeout": 8}, "fast": "f"}})
+    route = parse_route([{"tier": "strong", "first_token_timeout": 2}, "fast"], tiers, "d")
+    assert [(t.name, t.model, t.first_token_timeout) for t in route.tiers] == [("strong", "s", 2), ("fast", "f", None)]
+    assert parse_route(None, tiers, "fast").tiers == (tiers["fast"],)
+    with pytest.raises(ValueError, match="unknown tier"):
+        parse_route([{"tier": "huge"}], tiers, "d")
+    with pytest.raises(ValueError, match="unknown routing keys"):
+        parse_tiers({"tiers": {"x": {"model": "m", "timeout": 3}}})
+
+
+class FakeTier(BaseChatModel):
+    """Streams ``text`` after ``delay`` seconds (or fails), reporting usage."""
+
+    text: str
+    delay: float = 0.0
+    fail: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-tier"
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("overloaded")
+        yield ChatGenerationChunk(message=AIMessageChunk(content=self.text))
+        usage = {"input_tokens": 1000, "output_tokens": 100, "total_tokens": 1100}
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return generate_from_stream(self._stream(messages, stop, run_manager, **kwargs))
+
+
+@pytest.mark.parametrize("strong, reason", [
+    (FakeTier(text="strong", delay=1.0), "first_token_timeout"),
+    (FakeTier(text="strong", fail=True), "error"),
+])
+def test_routed_model_falls_back_before_first_token(strong, reason):
+    route = parse_route(
+        [{"model": "claude-sonnet-4-5", "first_token_timeout": 0.1}, "claude-haiku-4-5"], {}, "d"
+    )
+    router = Router()
+    model = routed_chat_model("business_model", route, router, models=[strong, FakeTier(text="fast answer")])
+
+    t0 = time.perf_counter()
+    message = model.invoke("Evaluate the business model.")
+    assert time.perf_counter() - t0 < 0.8
+    assert message.content == "fast answer"
+    assert message.response_metadata["route"] == {
+        "tier": "claude-haiku-4-5", "model": "claude-haiku-4-5",
+        "fallbacks": [{"tier": "claude-sonnet-4-5", "reason": reason}],
+    }
+    info = router.info()
+    assert info["agents"]["business_model"]["fallbacks"] == {f"claude-sonnet-4-5:{reason}": 1}
+    served = info["agents"]["business_model"]["tiers"]["claude-haiku-4-5"]
+    assert served["calls"] == 1 and served["spend_usd"] == round(cost_usd("claude-haiku-4-5", {
+        "input_tokens": 1000, "output_tokens": 100}), 4) == 0.0015
+    # A tier given up on holds its slot until the abandoned call drains.
+    abandoned = {"claude-sonnet-4-5": 1} if reason == "first_token_timeout" else {}
+    assert info["in_flight"] == abandoned
+    deadline = time.monotonic() + 2
+    while router.info()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert router.info()["in_flight"] == {}
+
+
+@pytest.mark.parametrize("strong, expected", [
+    (FakeTier(text="strong answer"), "strong answer"),
+    (FakeTier(text="strong", fail=True), "fast answer"),
+])
+def test_routed_model_emits_each_token_once_in_a_graph(strong, expected):
+    """LangGraph's messages stream sees the routed model's chunks, not the tier's as well."""
+    from langgraph.graph import START, MessagesState, StateGraph
+
+    route = parse_route(["claude-sonnet-4-5", "claude-haiku-4-5"], {}, "d")
+    model = routed_chat_model("business_model", route, Router(), models=[strong, FakeTier(text="fast answer")])
+    builder = StateGraph(MessagesState)
+    builder.add_node("model", lambda state: {"messages": [model.invoke(state["messages"])]})
+    builder.add_edge(START, "model")
+
+    stream = builder.compile().stream({"messages": [("user", "Evaluate it.")]}, stream_mode="messages")
+    assert [chunk.content for chunk, _ in stream if chunk.content] == [expected]
+
+
+def test_router_skips_tiers_over_load_or_budget():
+    """A tier at max_concurrent or over its hourly budget is skipped, except
+    as the last tier; spend leaves the budget window after an hour."""
+    now = [0.0]
+    router = Router(clock=lambda: now[0])
+    strong = Tier("strong", "claude-sonnet-4-5", max_concurrent=1, budget_usd_per_hour=1.0)
+
+    assert router.acquire(strong) is None
+    assert router.acquire(strong) == "load"
+    assert router.acquire(strong, last=True) is None
+    router.release(strong)
+    router.release(strong)
+
+    router.served("business_model", strong, 0.5, 1.2)
+    assert router.acquire(strong) == "budget"
+    now[0] = 3601.0
+    assert router.acquire(strong) is None
+    router.release(strong)
+
+
+def test_routed_specialist_request_payload(anthropic_payloads):
+    """A routed direct-dispatch specialist sends its first tier's model with
+    the tail prompt-cache breakpoint (its system prompt is below even Sonnet's
+    minimum, so it gets none) and reports the tier it used."""
+    graph = fanout.build_specialist(_opted_in(business_model={"model": ["strong", "fast"]})["business_model"])
+    result = graph.invoke({"messages": [{"role": "user", "content": "Context: a bookkeeping app."}]})
+
+    (payload,) = anthropic_payloads
+    assert payload["model"] == "claude-sonnet-4-5-20250929"
+    assert _marked(payload["system"]) == []
+    assert "cache_control" in payload["messages"][-1]["content"][-1]
+    assert result["messages"][-1].response_metadata["route"]["tier"] == "strong"
+    assert promptcache.prompt_cache_stats.info()["agents"]["business_model"]["cache_read"] == 900
+
+
+# ---------------------------------------------------------------------------
+# Test 10: Specialist deadlines and hedged runs
+# ---------------------------------------------------------------------------
+
+def test_deadlines_parse_from_agents_yaml():
+    """Every agent gets the default deadline unless it sets its own; bad values are rejected."""
+    assert not any(d["deadline"] or d["hedge"] for d in build_subagent_defs())  # both opt-in
+
+    defs = _opted_in({"deadline": 90}, business_model={"deadline": 120}, competition={"hedge": True})
+    assert defs["market"]["deadline"] == 90.0 and not defs["market"]["hedge"]
+    assert defs["business_model"]["deadline"] == 120.0
+    assert defs["competition"]["hedge"]
+    assert parse_deadline(None, "x") is None
+    for bad in (0, -5, "soon", True):
+        with pytest.raises(ValueError, match="x: expected a positive number"):
+            parse_deadline(bad, "x")
+
+
+def _slow_then_fast(hedged: bool) -> str:
+    time.sleep(0.05 if hedged else 2.0)
+    return "hedge" if hedged else "primary"
+
+
+def test_race_hedges_after_learned_p95_and_enforces_deadline():
+    tracker = LatencyTracker(min_samples=3)
+    assert tracker.hedge_delay("market", 1.0) is None
+    for seconds in (0.05, 0.1, 0.2):
+        tracker.record("market", seconds)
+    assert tracker.hedge_delay("market", 1.0) == 0.2
+    assert tracker.hedge_delay("market", 0.2) is None  # a hedge past the deadline is pointless
+
+    hedges = []
+    t0 = time.perf_counter()
+    outcome = race(_slow_then_fast, 1.0, hedge_after=0.1, on_hedge=lambda: hedges.append(1))
+    assert (outcome.value, outcome.hedged, len(hedges)) == ("hedge", True, 1)
+    assert time.perf_counter() - t0 < 0.5
+
+    with pytest.raises(DeadlineExceeded):
+        race(_slow_then_fast, 0.1)
+
+    def failing_hedge(hedged: bool) -> str:
+        if hedged:
+            raise RuntimeError("overloaded")
+        time.sleep(0.2)
+        return "primary"
+
+    assert race(failing_hedge, 1.0, hedge_after=0.05).value == "primary"
+
+
+def test_arace_cancels_the_losing_run():
+    cancelled = []
+
+    async def call(hedged: bool) -> str:
+        try:
+            await asyncio.sleep(0.05 if hedged else 2.0)
+        except asyncio.CancelledError:
+            cancelled.append(hedged)
+            raise
+        return "hedge" if hedged else "primary"
+
+    async def main():
+        outcome = await arace(call, 1.0, hedge_after=0.1)
+        await asyncio.sleep(0)
+        return outcome
+
+    outcome = asyncio.run(main())
+    assert (outcome.value, outcome.hedged, cancelled) == ("hedge", True, [False])
+    cancelled.clear()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(arace(call, 0.1))
+    assert cancelled == [False]
+
+
+def test_task_call_past_its_deadline_returns_a_timeout(anthropic_payloads, monkeypatch):
+    """A stalled specialist is given up on at its deadline; the orchestrator
+    gets a timeout message (flagged in the artifact) and answers without it."""
+    from langchain_anthropic import ChatAnthropic
+
+    market = next(d for d in orchestrator_module.registry.get().subagent_defs if d["name"] == "market")
+    monkeypatch.setitem(market, "deadline", 0.2)
+    monkeypatch.setattr(deadlines, "latencies", LatencyTracker())
+    create = ChatAnthropic._create
+
+    def stalled_market(self, payload):
+        if payload["system"][0]["text"].startswith(market["system_prompt"][:200]):
+            time.sleep(1.0)
+        return create(self, payload)
+
+    monkeypatch.setattr(ChatAnthropic, "_create", stalled_market)
+    graph = orchestrator_module.create_orchestrator(mode="llm")
+    t0 = time.perf_counter()
+    result = graph.invoke(
+        {"messages": [{"role": "user", "content": "A bookkeeping app for designers."}]},
+        {"configurable": {"thread_id": "t-deadline", "result_cache": False}},
+    )
+    assert time.perf_counter() - t0 < 0.9
+
+    (timeout,) = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+    assert timeout.status == "error" and timeout.artifact == {"timeout": {"deadline": 0.2}}
+    assert "did not finish within its 0.2 s deadline" in timeout.content
+    assert result["messages"][-1].content == "ok"
+    assert deadlines.latencies.info()["agents"]["market"]["timeouts"] == 1
+
+
+def test_hedged_task_call_tags_its_runs_and_stops_the_loser(anthropic_payloads, monkeypatch):
+    """Each run of a guarded task call carries the call id in its stream
+    metadata and the duplicate is flagged as the hedge; the run still going
+    once the call is settled is stopped at its next step or token."""
+    from langchain_anthropic import ChatAnthropic
+
+    market = next(d for d in orchestrator_module.registry.get().subagent_defs if d["name"] == "market")
+    monkeypatch.setitem(market, "deadline", 2.0)
+    monkeypatch.setitem(market, "hedge", True)
+    tracker = LatencyTracker(min_samples=1)
+    tracker.record("market", 0.1)
+    monkeypatch.setattr(deadlines, "latencies", tracker)
+    create = ChatAnthropic._create
+    market_calls = []
+
+    def slow_first_market(self, payload):
+        if payload["system"][0]["text"].startswith(market["system_prompt"][:200]):
+            market_calls.append(payload)
+            if len(market_calls) == 1:
+                time.sleep(0.5)
+        return create(self, payload)
+
+    monkeypatch.setattr(ChatAnthropic, "_create", slow_first_market)
+    graph = orchestrator_module.create_orchestrator(mode="llm")
+    runs, call_ids = set(), set()
+    for namespace, (chunk, metadata) in graph.stream(
+        {"messages": [{"role": "user", "content": "A bookkeeping app for designers."}]},
+        {"configurable": {"thread_id": "t-hedge", "result_cache": False}},
+        stream_mode="messages", subgraphs=True,
+    ):
+        if namespace and metadata.get("lc_agent_name") == "market" and chunk.content:
+            runs.add((metadata["task_call_id"], metadata["hedge"]))
+        elif isinstance(chunk, ToolMessage):
+            call_ids.add(chunk.tool_call_id)
+
+    assert len(call_ids) == 1 and runs == {(*call_ids, True)}  # the stalled first run never streamed
+    time.sleep(0.6)
+    stats = tracker.info()["agents"]["market"]
+    assert (stats["hedges"], stats["hedge_wins"], stats["stopped"]) == (1, 1, 1)
+
+
+# ---------------------------------------------------------------------------
+# Test 11: Anthropic calls share a rate limiter, retries and a circuit breaker
+# ---------------------------------------------------------------------------
+
+def test_rate_limited_model_call_is_retried_by_the_provider_guard(anthropic_payloads, monkeypatch):
+    """A 429 with Retry-After is retried once by the shared guard (the SDK's
+    own retries are off) and the specialist still answers."""
+    import anthropic
+    import httpx
+    from langchain_anthropic import ChatAnthropic
+
+    guard = providers.ProviderGuard("anthropic", rpm=60_000, burst=100, base=0.001)
+    monkeypatch.setitem(providers.guards, "anthropic", guard)
+    create = ChatAnthropic._create
+    failures = [anthropic.RateLimitError("rate limited", body=None, response=httpx.Response(
+        429, headers={"retry-after": "0.05"}, request=httpx.Request("POST", "https://api.anthropic.com/v1/messages"),
+    ))]
+
+    def throttled(self, payload):
+        assert self.max_retries == 0
+        if failures:
+            raise failures.pop()
+        return create(self, payload)
+
+    monkeypatch.setattr(ChatAnthropic, "_create", throttled)
+    graph = fanout._build_specialists(orchestrator_module.registry.get())["risks"]
+    t0 = time.perf_counter()
+    result = graph.invoke({"messages": [{"role": "user", "content": "Context: a bookkeeping app."}]})
+
+    assert result["messages"][-1].content == "ok"
+    assert time.perf_counter() - t0 >= 0.05
+    info = guard.info()
+    assert (info["calls"], info["retried"], info["failed"], info["circuit"]) == (2, 1, 0, "closed")
+
+
+class FlakyTier(FakeTier):
+    """Streams ``text``, then times out; guarded like an Anthropic model."""
+
+    all_anthropic: bool = True
+    attempts: list = []
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.attempts.append(1)
+        if self.text:
+            yield ChatGenerationChunk(message=AIMessageChunk(content=self.text))
+        raise TimeoutError("read timed out")
+
+
+@pytest.mark.parametrize("text, attempts", [("", 3), ("partial", 1)])
+def test_provider_guard_retries_a_model_call_only_before_its_first_token(text, attempts):
+    """A call that failed before streaming is retried; one that already
+    streamed a token is not, so nothing is emitted twice. Either way the
+    breaker counts one failed call."""
+    from langchain.agents import create_agent
+
+    guard = providers.ProviderGuard("anthropic", rpm=60_000, burst=100, max_retries=2, base=0.001,
+                                    breaker=providers.CircuitBreaker(failures=2))
+    model = FlakyTier(text=text)
+    agent = create_agent(model, middleware=[providers.provider_guard_middleware(guard)])
+    streamed = []
+    with pytest.raises(TimeoutError):
+        for chunk, _ in agent.stream({"messages": [("user", "Evaluate it.")]}, stream_mode="messages"):
+            streamed.append(chunk.content)
+
+    assert len(model.attempts) == attempts and "".join(streamed) == text
+    info = guard.info()
+    assert (info["calls"], info["retried"], info["failed"], info["circuit"]) == (attempts, attempts - 1, 1, "closed")
+
+
+# ---------------------------------------------------------------------------
+# Test 12: Task dispatches carry the context ledger
+# ---------------------------------------------------------------------------
+
+def test_context_ledger_keys_founder_messages_by_question():
+    """Each founder message is credited with the question ids first recorded
+    after it; messages that answered nothing new are additional context, and
+    unknown ids are dropped."""
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    def recorded(*ids):
+        return AIMessage("", tool_calls=[{"name": "record_answers", "args": {"question_ids": list(ids)},
+                                          "id": f"call_{'_'.join(ids)}"}])
+
+    messages = [
+        HumanMessage("Bookkeeping for freelance designers."), recorded("idea_core"),
+        HumanMessage("Solo designers in the US; $15 a month."), recorded("idea_core", "revenue_model", "target_customer"),
+        HumanMessage("Also, we already have a waitlist."), recorded("idea_core", "revenue_model", "target_customer", "bogus"),
+    ]
+    entries = build_ledger(messages)
+    assert [(e.text[:10], e.question_ids) for e in entries] == [
+        ("Bookkeepin", ["idea_core"]),
+        ("Solo desig", ["target_customer", "revenue_model"]),
+        ("Also, we a", []),
+    ]
+
+    ledger = render_ledger(entries)
+    assert ledger.startswith(LEDGER_HEADER)
+    assert "### target_customer, revenue_model\nQ (target_customer): " in ledger
+    assert "### Additional context\nAlso, we already have a waitlist." in ledger
+    assert expand_description("Size the market.", []) == "Size the market."
+    expanded = expand_description("Size the market.", messages)
+    assert expanded == f"Size the market.\n\n{ledger}"
+    assert expand_description(expanded, messages) == expanded
+
+
+def test_task_dispatch_is_expanded_with_the_ledger(anthropic_payloads):
+    """The orchestrator's short task description reaches the subagent with
+    the founder's messages appended by the server."""
+    orchestrator_module.create_orchestrator(mode="llm").invoke(
+        {"messages": [{"role": "user", "content": "A bookkeeping app for designers."}]},
+        {"configurable": {"thread_id": "t-ledger", "result_cache": False}},
+    )
+
+    task_call = anthropic_payloads[0]
+    assert "record_answers" in {t["name"] for t in task_call["tools"]}
+    brief = anthropic_payloads[1]["messages"][0]["content"]
+    brief = brief if isinstance(brief, str) else "".join(b["text"] for b in brief)
+    assert brief.startswith("Size the market.\n\n" + LEDGER_HEADER)
+    assert brief.endswith("### Additional context\nA bookkeeping app for designers.")
+
+
+# ---------------------------------------------------------------------------
+# Test 13: Orchestrator history stays within its token budget
+# ---------------------------------------------------------------------------
+
+def _conversation():
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    analysis = '{"summary": "A large, growing market.", "widgets": {"tam": "' + "x" * 4000 + '"}}'
+    return [
+        HumanMessage("Bookkeeping for freelance designers."),
+        AIMessage("", tool_calls=[
+            {"name": "record_answers", "args": {"question_ids": ["idea_core"]}, "id": "c1"},
+            {"name": "task", "args": {"subagent_type": "market", "description": "Size it."}, "id": "c2"},
+        ]),
+        ToolMessage("Recorded.", tool_call_id="c1", name="record_answers"),
+        ToolMessage(analysis, tool_call_id="c2", name="task"),
+        AIMessage("Here is the market picture: sizeable and growing."),
+        HumanMessage("Solo designers in the US."),
+        AIMessage("Thanks! What would you charge?"),
+        HumanMessage("$15 a month."),
+        AIMessage("", tool_calls=[{"name": "task", "args": {"subagent_type": "risks"}, "id": "c3"}]),
+        ToolMessage(analysis, tool_call_id="c3", name="task"),
+    ]
+
+
+def test_history_compacts_old_results_then_folds_old_turns():
+    """Over budget, old specialist results become references (their summary
+    plus where the full result is); still over, turns before the last two
+    are folded into a summary. The current turn is never touched."""
+    messages = _conversation()
+    assert compact_history(messages, budget=10**6).messages is messages
+
+    step1 = compact_history(messages, budget=count_tokens(messages) - 1)
+    assert (step1.compacted_results, step1.folded_messages) == (1, 0)
+    reference = step1.messages[3]
+    assert reference.tool_call_id == "c2"
+    assert reference.content.startswith("[Compacted Market Opportunity result, ")
+    assert "agent_results.market] A large, growing market." in reference.content
+    assert step1.messages[9] is messages[9] and step1.saved > 900
+
+    step2 = compact_history(messages, budget=1)
+    assert (step2.compacted_results, step2.folded_messages) == (1, 5)
+    summary, *kept = step2.messages
+    assert kept == messages[5:]
+    assert summary.content.startswith(SUMMARY_HEADER)
+    assert "### idea_core\nQ (idea_core): " in summary.content
+    assert "Analyses already delivered: Market Opportunity." in summary.content
+    assert summary.content.endswith("Your last reply in those turns:\nHere is the market picture: sizeable and growing.")
+
+
+def test_orchestrator_requests_are_compacted_and_savings_reported(anthropic_payloads, monkeypatch):
+    """The next turn's request starts with the summary of the first while the
+    checkpointed thread keeps every message; the savings are reported per thread."""
+    monkeypatch.setattr(history, "HISTORY_TOKEN_BUDGET", 1)
+    monkeypatch.setattr(history, "history_stats", history.HistoryStats())
+    graph = orchestrator_module.create_orchestrator(mode="llm")
+    config = {"configurable": {"thread_id": "t-history", "result_cache": False}}
+    graph.update_state(config, {"messages": _conversation()[:7]}, as_node="model")
+    graph.invoke({"messages": [{"role": "user", "content": "$15 a month."}]}, config)
+
+    (payload,) = anthropic_payloads
+    first = payload["messages"][0]["content"]
+    first = first if isinstance(first, str) else "".join(b["text"] for b in first)
+    assert first.startswith(SUMMARY_HEADER) and "Bookkeeping for freelance designers." in first
+    assert "x" * 100 not in json.dumps(payload["messages"])
+    messages = graph.get_state(config).values["messages"]
+    assert len(messages) == 9 and "x" * 4000 in messages[3].content
+
+    savings = history.history_stats.take("t-history")
+    assert (savings["calls"], savings["compacted_results"], savings["folded_messages"]) == (1, 1, 5)
+    assert savings["saved"] > 900
+    assert history.history_stats.take("t-history") is None
+
+
+# ---------------------------------------------------------------------------
+# Test 14: Parallel per-widget generation
+# ---------------------------------------------------------------------------
+
+def _gtm_def() -> dict:
+    return _opted_in(gtm={"widget_mode": PARALLEL})["gtm"]
+
+
+def test_parallel_widget_mode_splits_the_json_contract():
+    """The widget templates come from the agent's own prompt; the research
+    prompt keeps the rest of the contract and asks for notes instead."""
+    gtm = _gtm_def()
+    assert gtm["widget_mode"] == PARALLEL
+    templates = widget_templates(gtm["system_prompt"])
+    assert list(templates) == ["roadmap", "growth_projection", "channel_mix", "product_overview", "feature_priority"]
+    assert templates["channel_mix"].startswith('{\n') and '"vizType": "donut"' in templates["channel_mix"]
+    assert templates["channel_mix"].endswith("}")
+
+    prompt = research_prompt(gtm["system_prompt"])
+    assert "vizType" not in prompt and '"widgets"' not in prompt
+    assert '"recommendation": "1-2 sentence actionable recommendation"\n}' in prompt
+    assert "CRITICAL: Your entire response must be ONLY the raw JSON object." in prompt
+    assert prompt.endswith(RESEARCH_NOTE)
+
+    with pytest.raises(ValueError, match="agents.x.widget_mode: expected one of single, parallel"):
+        parse_widget_mode("fast", gtm["system_prompt"], where="agents.x.widget_mode")
+    with pytest.raises(ValueError, match="needs a `widgets` object"):
+        parse_widget_mode(PARALLEL, "Answer in prose.", where="agents.x.widget_mode")
+
+
+def test_parallel_widgets_are_generated_concurrently_and_merged(anthropic_payloads):
+    """After the research pass every widget is its own concurrent call and is
+    streamed as it arrives; an off-template reply is retried once, then the
+    widget is left out of the merged result."""
+    import re
+    import threading
+
+    from streaming.widgets import WidgetStreamer
+    attempts: dict[str, int] = {}
+    lock = threading.Lock()
+
+    def reply(payload):
+        system = payload["system"] if isinstance(payload["system"], str) else payload["system"][0]["text"]
+        match = re.search(r'`(\w+)` widget.*?"vizType": "(\w+)"', system, re.DOTALL)
+        if match is None:
+            return json.dumps({"summary": "Sell to studios first.", "score": 70,
+                               "score_label": "GTM Readiness Score", "notes": "SEO 40%, referrals 30%"})
+        key, viz_type = match.groups()
+        with lock:
+            attempts[key] = attempts.get(key, 0) + 1
+            first = attempts[key] == 1
+        time.sleep(0.2)
+        if key == "feature_priority" or (key == "channel_mix" and first):
+            return "Here you go: a chart of channels."
+        return json.dumps({"vizType": viz_type, "title": key})
+
+    anthropic_payloads.reply = reply
+    graph = fanout.build_specialist(_gtm_def())
+    widgets = WidgetStreamer(["gtm"])
+    events, texts = [], {}
+    t0 = time.perf_counter()
+    for chunk, metadata in graph.stream(
+        {"messages": [{"role": "user", "content": "A bookkeeping app for designers."}]}, stream_mode="messages"
+    ):
+        text = chunk.content if isinstance(chunk.content, str) else "".join(b.get("text", "") for b in chunk.content)
+        texts[chunk.id] = texts.get(chunk.id, "") + text
+        events += [(ev.kind, ev.key) for ev in widgets.feed(widgets.agent_for(metadata), chunk.id or "", text)]
+    elapsed = time.perf_counter() - t0
+
+    # Seven widget calls of 0.2 s each; run one after another they would take 1.4 s.
+    assert elapsed < 0.9
+    assert attempts == {"roadmap": 1, "growth_projection": 1, "channel_mix": 2, "product_overview": 1,
+                        "feature_priority": 2}
+    assert events[0] == ("summary", "")
+    assert sorted(events[1:]) == [("widget", k) for k in ("channel_mix", "growth_projection", "product_overview", "roadmap")]
+
+    result = json.loads(texts[chunk.id])
+    assert list(result) == ["summary", "score", "score_label", "widgets"]
+    assert list(result["widgets"]) == ["roadmap", "growth_projection", "channel_mix", "product_overview"]
+    assert result["widgets"]["channel_mix"] == {"vizType": "donut", "title": "channel_mix"}
+
+
+# ---------------------------------------------------------------------------
+# Test 15: Speculative dispatch from the first message
+# ---------------------------------------------------------------------------
+
+FIRST_MESSAGE = (
+    "We're building an AI bookkeeping assistant for freelance designers. "
+    "It automates invoices and expenses. Subscription at $20/month."
+)
+
+
+def test_first_message_slots_are_estimated_from_signals():
+    """Slots are filled by the sentences matching their question's signals;
+    the specialists due on them start, each fingerprinted by its slots."""
+    evidence = slot_evidence([FIRST_MESSAGE])
+    assert set(evidence) == {"idea_core", "target_customer", "revenue_model"}
+    assert evidence["revenue_model"] == ("Subscription at $20/month.",)
+    assert slot_evidence(["An AI bookkeeper", "Thanks!"]) == {}
+
+    due = speculative_specialists([FIRST_MESSAGE])
+    assert list(due) == ["market", "customer", "business_model"]
+    assert due["market"] == due["customer"] != due["business_model"]
+    assert speculative_specialists(["For freelance designers"]) == {}
+
+
+def test_speculative_runs_are_held_until_adopted_or_stale():
+    """A held run keeps its result from the session until adopted; it goes
+    stale when a later message or a later record touches its slots."""
+    session = SimpleNamespace(session_id="s", thread_id="t", results={})
+    session.store_agent_result = lambda agent_id, result: session.results.update({agent_id: result})
+    due = speculative_specialists([FIRST_MESSAGE])
+    book = SessionSpeculations()
+    book.runs = {aid: Speculation(session, aid, fp) for aid, fp in due.items()}
+
+    book.runs["market"].store_agent_result("market", {"summary": "ok"})
+    assert session.results == {}
+    book.runs["market"].adopt()
+    assert session.results == {"market": {"summary": "ok"}}
+
+    assert book.stale([FIRST_MESSAGE], {"idea_core"}) == []
+    assert book.first_answers == {"idea_core"}
+    # Recorded only after a later message: every run depends on the required questions
+    assert book.stale([FIRST_MESSAGE, "Yes"], {"idea_core", "target_customer"}) == list(due)
+    book.first_answers = frozenset({"idea_core", "target_customer"})
+    # Unrelated details leave the runs alone; a new pricing sentence only touches business_model
+    texts = [FIRST_MESSAGE, "We have a prototype."]
+    assert book.stale(texts, {"idea_core", "target_customer", "current_stage"}) == []
+    assert book.stale([*texts, "Actually we charge a 5% commission."], {"idea_core", "target_customer"}) == [
+        "business_model"
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Test 16: Orchestrator dispatches subagents when given full context
 # ---------------------------------------------------------------------------
 
 @pytest.mark.slow
@@ -132,7 +999,7 @@ def test_orchestrator_dispatches_subagents(fresh_orchestrator):
 
 
 # ---------------------------------------------------------------------------
-# Test 6: Each specialist can be invoked independently
+# Test 17: Each specialist can be invoked independently
 # ---------------------------------------------------------------------------
 
 @pytest.mark.slow
@@ -0,0 +1,585 @@
+"""Area 6: HTTP API — the FastAPI routes behind the Next.js proxy.
+
+Runs against a fake orchestrator (no LLM calls) to test that:
+- /api/chat streams the expected SSE event sequence
+- Specialist summaries and widgets stream before the final agent_result
+- Direct dispatch mode starts specialists in the background as their questions
+  are answered, delivers their events in later turns and ends with a synthesis
+- A specialist past its deadline is reported with agent_timeout and left out of
+  the synthesis; a slow one is hedged with a duplicate run after its p95
+- With speculative dispatch the first message starts the specialists it seems
+  to make due; held runs are adopted when their answers hold and cancelled
+  (then dispatched normally) when a later answer changes them
+- Repeated specialist runs are served from the result cache unless bypassed,
+  and reworded ideas reuse a flagged prior analysis (optionally refreshed)
+- Stored results are served with ETags, 304s and field projection
+- Message coalescing can be negotiated per request
+- Events carry ids and a dropped stream can be resumed with Last-Event-ID
+- Extra viewers attach to a running turn instead of starting another one
+- A full run queue answers 429 + Retry-After and shows up in the gauges; a
+  message joins its session only once its turn is admitted
+- Importing main or cli does not load the LLM stack
+"""
+
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessageChunk, ToolMessage
+
+import main
+from agents.deadlines import LatencyTracker
+from agents.fanout import DIRECT, RESULTS_HEADER, record_answers
+from agents.neardup import NearDuplicateIndex
+from agents.resultcache import MemoryCache
+from agents.speculative import SpeculationStats
+
+
+class FakeOrchestrator:
+    """Streams a fixed reply token by token, like ``stream_mode="messages"``."""
+
+    def __init__(self, tokens: list[str], delay: float = 0.0):
+        self.tokens = tokens
+        self.delay = delay
+        self.calls = 0
+
+    def stream(self, input_msg, config=None, stream_mode="messages", subgraphs=False):
+        self.calls += 1
+        for tok in self.tokens:
+            if self.delay:
+                time.sleep(self.delay)
+            chunk = AIMessageChunk(content=tok), {"langgraph_node": "model"}
+            yield ((), chunk) if subgraphs else chunk
+
+
+class FakeSpecialistRun:
+    """Dispatches one specialist whose subgraph streams its JSON answer."""
+
+    RESULT = {
+        "summary": "Big market.",
+        "score": 74,
+        "score_label": "Market Score",
+        "bullets": ["one"],
+        "widgets": {"market_opportunity": {"vizType": "scoreCard"}, "segmentation": {"vizType": "stackedBar"}},
+    }
+
+    def stream(self, input_msg, config=None, stream_mode="messages", subgraphs=False):
+        assert subgraphs
+        args = json.dumps({"subagent_type": "market", "description": "Size it"})
+        yield (), (AIMessageChunk(content="", tool_call_chunks=[
+            {"name": "task", "id": "call_1", "args": args, "index": 0},
+        ]), {"langgraph_node": "model"})
+        doc = json.dumps(self.RESULT)
+        meta = {"langgraph_node": "model", "lc_agent_name": "market"}
+        for i in range(0, len(doc), 7):
+            yield ("tools:1",), (AIMessageChunk(content=doc[i:i + 7], id="run-1"), meta)
+        yield (), (ToolMessage(content=doc, tool_call_id="call_1"), {"langgraph_node": "tools"})
+
+
+class FakeDirectOrchestrator:
+    """DISPATCH_MODE=direct orchestrator: records answers, then synthesizes."""
+
+    def __init__(self, answered: list[str], delay: float = 0.0):
+        self.answered = answered
+        self.complete = False
+        self.delay = delay  # seconds before each reply
+        self.inputs: list[str] = []
+
+    def stream(self, input_msg, config=None, stream_mode="messages", subgraphs=False):
+        message = input_msg["messages"][0]["content"]
+        self.inputs.append(message)
+        time.sleep(self.delay)
+        if message.startswith(RESULTS_HEADER):
+            yield (), (AIMessageChunk(content="Synthesis."), {"langgraph_node": "model"})
+            return
+        yield (), (AIMessageChunk(content="Got it."), {"langgraph_node": "model"})
+        yield (), (ToolMessage(content=record_answers(self.answered, self.complete), name="record_answers",
+                               tool_call_id="call_r"), {"langgraph_node": "tools"})
+
+
+class FakeSpecialist:
+    """A directly dispatched specialist graph (``stream_mode="messages"``)."""
+
+    def __init__(self, agent_id: str, fail: bool = False, delays: tuple[float, ...] = ()):
+        self.agent_id = agent_id
+        self.fail = fail
+        self.delays = list(delays)  # seconds before the first token, per run
+        self.contexts: list[str] = []
+
+    def stream(self, input_msg, config=None, stream_mode="messages"):
+        self.contexts.append(input_msg["messages"][0]["content"])
+        if self.fail:
+            raise RuntimeError("rate limited")
+        if self.delays:
+            time.sleep(self.delays.pop(0))
+        doc = json.dumps({**FakeSpecialistRun.RESULT, "summary": f"{self.agent_id} done."})
+        meta = {"langgraph_node": "model", "lc_agent_name": self.agent_id}
+        for i in range(0, len(doc), 11):
+            yield AIMessageChunk(content=doc[i:i + 11], id=f"run-{self.agent_id}"), meta
+
+
+def parse_sse(body: str, with_ids: bool = False) -> list[tuple]:
+    """Split an SSE response body into ``(event, data)`` (or ``(id, event, data)``)."""
+    events = []
+    for block in body.replace("\r\n", "\n").split("\n\n"):
+        name, data, event_id = "message", None, None
+        for line in block.split("\n"):
+            if line.startswith("event:"):
+                name = line[6:].strip()
+            elif line.startswith("data:"):
+                data = line[5:].strip()
+            elif line.startswith("id:"):
+                event_id = int(line[3:].strip())
+        if data is not None:
+            payload = json.loads(data)
+            events.append((event_id, name, payload) if with_ids else (name, payload))
+    return events
+
+
+@pytest.fixture
+def fake():
+    return FakeOrchestrator([f"word{i} " for i in range(40)])
+
+
+@pytest.fixture
+def client(monkeypatch, fake):
+    """App client with one event loop for all requests (like uvicorn) and the
+    fake orchestrator installed by the lifespan."""
+    monkeypatch.setattr(main, "create_orchestrator", lambda: fake)
+    monkeypatch.setattr(main, "session_mgr", main.SessionManager())
+    monkeypatch.setattr(main, "run_registry", main.RunRegistry(main.ReplayStore()))
+    monkeypatch.setattr(main, "admission", main.AdmissionController())
+    monkeypatch.setattr(main, "result_cache", MemoryCache())
+    monkeypatch.setattr(main, "near_index", NearDuplicateIndex(threshold=0.9))
+    with TestClient(main.app) as c:
+        yield c
+
+
+def _chat(client, **extra) -> list[tuple[str, dict]]:
+    sid = client.post("/api/sessions").json()["session_id"]
+    res = client.post("/api/chat", json={"session_id": sid, "message": "hi", **extra})
+    assert res.status_code == 200
+    return parse_sse(res.text)
+
+
+# ---------------------------------------------------------------------------
+# /api/chat
+# ---------------------------------------------------------------------------
+
+def test_chat_unknown_session_404(client):
+    res = client.post("/api/chat", json={"session_id": "nope", "message": "hi"})
+    assert res.status_code == 404
+
+
+def test_chat_streams_messages_then_done(client):
+    events = _chat(client)
+    assert events[-1] == ("done", {"status": "complete"})
+    text = "".join(p["content"] for name, p in events if name == "message")
+    assert text == "".join(f"word{i} " for i in range(40))
+
+
+def test_chat_streams_specialist_widgets_before_result(client, monkeypatch):
+    monkeypatch.setattr(main, "_orchestrator", FakeSpecialistRun())
+    events = _chat(client)
+    names = [name for name, _ in events]
+
+    assert names == [
+        "agent_start", "agent_summary", "agent_widget", "agent_widget", "agent_result", "done",
+    ]
+    assert events[1][1] == {"agentId": "market", "summary": "Big market.", "score": 74, "scoreLabel": None}
+    assert [(p["key"], p["data"]) for n, p in events if n == "agent_widget"] == list(
+        FakeSpecialistRun.RESULT["widgets"].items()
+    )
+    assert events[4][1]["content"] == FakeSpecialistRun.RESULT
+
+
+def test_direct_mode_dispatches_specialists_as_questions_are_answered(client, monkeypatch):
+    specialists = {aid: FakeSpecialist(aid, fail=aid == "risks") for aid in main.AGENT_LABELS}
+    orchestrator = FakeDirectOrchestrator(["idea_core"])
+    monkeypatch.setattr(main, "DISPATCH_MODE", DIRECT)
+    monkeypatch.setattr(main, "get_specialists", lambda: specialists)
+    monkeypatch.setattr(main, "_orchestrator", orchestrator)
+    sid = client.post("/api/sessions").json()["session_id"]
+    session = main.session_mgr.get_session(sid)
+
+    def turn(message, *answered, complete=False):
+        orchestrator.answered += list(answered)
+        orchestrator.complete = complete
+        res = client.post("/api/chat", json={"session_id": sid, "message": message})
+        return parse_sse(res.text)
+
+    def started(events):
+        return [p["agentId"] for n, p in events if n == "agent_start"]
+
+    def results(events):
+        return {p["agentId"]: p["content"] for n, p in events if n == "agent_result"}
+
+    # Required questions not all answered yet: nothing starts
+    assert [n for n, _ in turn("An AI bookkeeper")] == ["message", "done"]
+
+    # target_customer unlocks market + customer; they run in the background
+    events = turn("For freelance designers", "target_customer")
+    assert [n for n, _ in events] == ["message", "agent_start", "agent_start", "done"]
+    assert started(events) == ["market", "customer"]
+    deadline = time.time() + 5
+    while len(session.agent_results) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+
+    # ...and their results are delivered with the next turn, before its reply
+    events = turn("Subscription, $20/month", "revenue_model", "differentiation")
+    first_reply = [n for n, _ in events].index("message")
+    assert set(results(events[:first_reply])) == {"market", "customer"}
+    assert results(events)["market"]["summary"] == "market done."
+    assert started(events) == ["competition", "business_model"]
+
+    # Interview complete: the rest start, every result arrives, then the synthesis
+    events = turn("That's all", complete=True)
+    assert started(events) == ["risks", "gtm"]
+    assert set(results(events)) >= {"risks", "gtm"}
+    assert results(events)["risks"] == "Analysis failed: rate limited"
+    assert [n for n, _ in events][-2:] == ["message", "done"] and events[-2][1]["content"] == "Synthesis."
+    assert set(session.agent_results) == set(specialists)
+
+    # Specialists got the user's own words up to their start; the orchestrator got every result
+    assert "2. For freelance designers" in specialists["market"].contexts[0]
+    assert "3. Subscription" not in specialists["market"].contexts[0]
+    assert "4. That's all" in specialists["gtm"].contexts[0]
+    synthesis = orchestrator.inputs[-1]
+    assert synthesis.startswith(RESULTS_HEADER) and all(f"({aid})" in synthesis for aid in specialists)
+
+    state = client.get(f"/api/sessions/{sid}").json()
+    assert state["interview_complete"] is True
+    assert state["dispatched_agents"] == sorted(specialists)
+
+    # Follow-ups never dispatch or synthesize again
+    assert [n for n, _ in turn("Thanks")] == ["message", "done"]
+    assert all(len(s.contexts) == 1 for s in specialists.values())
+
+
+def test_speculative_dispatch_adopts_held_runs_and_cancels_changed_ones(client, monkeypatch):
+    specialists = {aid: FakeSpecialist(aid) for aid in main.AGENT_LABELS}
+    orchestrator = FakeDirectOrchestrator(["idea_core", "target_customer"], delay=0.3)
+    stats = SpeculationStats()
+    monkeypatch.setattr(main, "DISPATCH_MODE", DIRECT)
+    monkeypatch.setattr(main, "SPECULATIVE_DISPATCH", True)
+    monkeypatch.setattr(main, "speculations", {})
+    monkeypatch.setattr(main, "speculation_stats", stats)
+    monkeypatch.setattr(main, "get_specialists", lambda: specialists)
+    monkeypatch.setattr(main, "_orchestrator", orchestrator)
+    sid = client.post("/api/sessions").json()["session_id"]
+    session = main.session_mgr.get_session(sid)
+
+    def turn(message, *answered):
+        orchestrator.answered += list(answered)
+        return parse_sse(client.post("/api/chat", json={"session_id": sid, "message": message}).text)
+
+    # The first message seems to answer idea, customer and pricing: three runs start
+    # during the reply. The orchestrator confirms idea + customer, so market and
+    # customer are adopted with their results; business_model stays held.
+    events = turn("We're building an AI bookkeeping assistant for freelance designers. "
+                  "Subscription at $20/month.")
+    names = [n for n, _ in events]
+    assert names.index("agent_start") > names.index("message")
+    starts = [p for n, p in events if n == "agent_start"]
+    assert starts == [{"agentId": "market", "speculative": True}, {"agentId": "customer", "speculative": True}]
+    assert {p["agentId"] for n, p in events if n == "agent_result"} == {"market", "customer"}
+    assert len(specialists["business_model"].contexts) == 1
+    assert set(session.agent_results) == {"market", "customer"}
+
+    # A later answer changes the pricing: the held run is dropped and business_model
+    # starts again with the whole conversation
+    events = turn("Actually we'll take a 5% commission on each invoice instead.", "revenue_model")
+    assert [p for n, p in events if n == "agent_start"] == [{"agentId": "business_model"}]
+    assert "commission" in specialists["business_model"].contexts[-1]
+    assert all(len(specialists[aid].contexts) == 1 for aid in ("market", "customer"))
+
+    info = client.get("/api/metrics").json()["speculation"]
+    assert (info["started"], info["adopted"], info["cancelled"], info["hit_rate"]) == (3, 2, 1, 0.667)
+    assert info["agents"]["market"]["head_start_s"] >= 0.25
+    assert info["agents"]["business_model"]["hit_rate"] == 0
+
+
+def test_direct_mode_serves_repeat_runs_from_result_cache(client, monkeypatch):
+    specialists = {aid: FakeSpecialist(aid) for aid in main.AGENT_LABELS}
+    orchestrator = FakeDirectOrchestrator(["idea_core", "target_customer"])
+    orchestrator.complete = True
+    monkeypatch.setattr(main, "DISPATCH_MODE", DIRECT)
+    monkeypatch.setattr(main, "get_specialists", lambda: specialists)
+    monkeypatch.setattr(main, "_orchestrator", orchestrator)
+
+    def run(**extra):
+        sid = client.post("/api/sessions").json()["session_id"]
+        res = client.post("/api/chat", json={"session_id": sid, "message": "An AI bookkeeper", **extra})
+        return {p["agentId"]: p["content"] for n, p in parse_sse(res.text) if n == "agent_result"}
+
+    first = run()
+    assert run() == first
+    assert all(len(s.contexts) == 1 for s in specialists.values())
+    assert client.get("/api/metrics").json()["result_cache"]["hits"] == len(specialists)
+
+    assert run(cache=False) == first
+    assert all(len(s.contexts) == 2 for s in specialists.values())
+
+
+@pytest.mark.parametrize("refresh", [False, True])
+def test_direct_mode_reuses_near_duplicate_analysis(client, monkeypatch, refresh):
+    specialists = {aid: FakeSpecialist(aid) for aid in main.AGENT_LABELS}
+    orchestrator = FakeDirectOrchestrator(["idea_core", "target_customer"])
+    orchestrator.complete = True
+    monkeypatch.setattr(main, "DISPATCH_MODE", DIRECT)
+    monkeypatch.setattr(main, "NEAR_DUP_REFRESH", refresh)
+    monkeypatch.setattr(main, "get_specialists", lambda: specialists)
+    monkeypatch.setattr(main, "_orchestrator", orchestrator)
+
+    def run(message):
+        sid = client.post("/api/sessions").json()["session_id"]
+        res = client.post("/api/chat", json={"session_id": sid, "message": message})
+        return [p for n, p in parse_sse(res.text) if n == "agent_result" and p["agentId"] == "market"]
+
+    idea = "An AI bookkeeping assistant for freelance designers who hate spreadsheets and invoices"
+    assert "reused" not in run(idea)[0]
+    results = run(idea.replace("AI bookkeeping", "AI-powered bookkeeping") + ".")
+
+    assert results[0]["reused"]["similarity"] >= main.near_index.threshold
+    assert results[0]["content"]["summary"] == "market done."
+    if refresh:
+        assert len(results) == 2 and "reused" not in results[1]
+    assert len(specialists["market"].contexts) == (2 if refresh else 1)
+
+
+@pytest.fixture
+def market_def(monkeypatch):
+    """market's agents.yaml entry, patchable for one test."""
+    market = next(d for d in main.config_registry.get().subagent_defs if d["name"] == "market")
+    monkeypatch.setitem(market, "deadline", market["deadline"])
+    monkeypatch.setitem(market, "hedge", market["hedge"])
+    return market
+
+
+def test_direct_mode_synthesizes_without_specialist_past_its_deadline(client, monkeypatch, market_def):
+    specialists = {aid: FakeSpecialist(aid) for aid in main.AGENT_LABELS}
+    specialists["market"] = FakeSpecialist("market", delays=(2.0,))
+    orchestrator = FakeDirectOrchestrator(["idea_core", "target_customer"])
+    orchestrator.complete = True
+    monkeypatch.setattr(main, "DISPATCH_MODE", DIRECT)
+    monkeypatch.setattr(main, "get_specialists", lambda: specialists)
+    monkeypatch.setattr(main, "_orchestrator", orchestrator)
+    monkeypatch.setattr(main, "latencies", LatencyTracker())
+    monkeypatch.setitem(market_def, "deadline", 0.3)
+
+    sid = client.post("/api/sessions").json()["session_id"]
+    t0 = time.perf_counter()
+    events = parse_sse(client.post("/api/chat", json={"session_id": sid, "message": "An AI bookkeeper"}).text)
+    assert time.perf_counter() - t0 < 1.5
+
+    names = [n for n, _ in events]
+    assert ("agent_timeout", {"agentId": "market", "deadline": 0.3}) in events
+    assert {p["agentId"] for n, p in events if n == "agent_result"} == set(main.AGENT_LABELS) - {"market"}
+    assert names.index("agent_timeout") < names.index("message", names.index("agent_timeout")) < names.index("done")
+    synthesis = orchestrator.inputs[-1]
+    assert synthesis.startswith(RESULTS_HEADER) and "did not finish within its 0.3 s deadline" in synthesis
+    assert client.get(f"/api/sessions/{sid}").json()["agent_timeouts"] == {"market": 0.3}
+    assert client.get("/api/metrics").json()["deadlines"]["agents"]["market"]["timeouts"] == 1
+
+
+def test_direct_mode_hedges_a_slow_run_after_its_p95(client, monkeypatch, market_def):
+    """Past the learned p95 a duplicate run starts; the first to finish is the result."""
+    specialists = {aid: FakeSpecialist(aid) for aid in main.AGENT_LABELS}
+    specialists["market"] = FakeSpecialist("market", delays=(2.0, 0.0))
+    orchestrator = FakeDirectOrchestrator(["idea_core", "target_customer"])
+    orchestrator.complete = True
+    monkeypatch.setattr(main, "DISPATCH_MODE", DIRECT)
+    monkeypatch.setattr(main, "get_specialists", lambda: specialists)
+    monkeypatch.setattr(main, "_orchestrator", orchestrator)
+    tracker = LatencyTracker(min_samples=3)
+    for seconds in (0.05, 0.1, 0.1):
+        tracker.record("market", seconds)
+    monkeypatch.setattr(main, "latencies", tracker)
+    monkeypatch.setitem(market_def, "hedge", True)
+
+    t0 = time.perf_counter()
+    events = _chat(client, message="An AI bookkeeper")
+    assert time.perf_counter() - t0 < 1.5
+
+    (market,) = [p for n, p in events if n == "agent_result" and p["agentId"] == "market"]
+    assert market["content"]["summary"] == "market done."
+    assert "agent_timeout" not in [n for n, _ in events]
+    assert len(specialists["market"].contexts) == 2
+    stats = tracker.info()["agents"]["market"]
+    assert stats["hedges"] == stats["hedge_wins"] == 1 and stats["runs"] == 4
+
+
+def test_session_serves_stored_results_with_etag(client, monkeypatch):
+    monkeypatch.setattr(main, "_orchestrator", FakeSpecialistRun())
+    sid = client.post("/api/sessions").json()["session_id"]
+    client.post("/api/chat", json={"session_id": sid, "message": "hi"})
+
+    res = client.get(f"/api/sessions/{sid}")
+    assert res.status_code == 200
+    assert res.json()["agent_results"] == {"market": FakeSpecialistRun.RESULT}
+    etag = res.headers["etag"]
+
+    cached = client.get(f"/api/sessions/{sid}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+
+    part = client.get(f"/api/sessions/{sid}", params={"fields": "agent_results.market.widgets,version"})
+    assert part.json() == {
+        "agent_results": {"market": {"widgets": FakeSpecialistRun.RESULT["widgets"]}},
+        "version": res.json()["version"],
+    }
+    assert part.headers["etag"] != etag
+
+    main.session_mgr.get_session(sid).add_user_message("again")
+    assert client.get(f"/api/sessions/{sid}", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_chat_coalescing_is_negotiable(client):
+    uncoalesced = _chat(client, coalesce_ms=0, coalesce_bytes=0)
+    coalesced = _chat(client, coalesce_ms=1000, coalesce_bytes=64)
+
+    raw_frames = [e for e in uncoalesced if e[0] == "message"]
+    merged_frames = [e for e in coalesced if e[0] == "message"]
+    assert len(raw_frames) == 40
+    assert len(merged_frames) < 10
+    assert "".join(p["content"] for _, p in merged_frames) == "".join(
+        p["content"] for _, p in raw_frames
+    )
+
+
+# ---------------------------------------------------------------------------
+# Event ids and resume
+# ---------------------------------------------------------------------------
+
+def test_chat_events_have_increasing_ids(client):
+    sid = client.post("/api/sessions").json()["session_id"]
+    first = parse_sse(client.post("/api/chat", json={"session_id": sid, "message": "a"}).text, True)
+    second = parse_sse(client.post("/api/chat", json={"session_id": sid, "message": "b"}).text, True)
+
+    ids = [e[0] for e in first + second]
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    assert second[0][0] == first[-1][0] + 1
+
+
+def test_resume_after_dropped_connection(client, fake):
+    """A client that lost the stream after a few events and resumes with
+    Last-Event-ID gets exactly the missing events, without re-running the
+    orchestrator. (Following a still-running turn is covered in test_streaming.)"""
+    sid = client.post("/api/sessions").json()["session_id"]
+    body = {"session_id": sid, "message": "hi", "coalesce_ms": 0, "coalesce_bytes": 0}
+    seen = parse_sse(client.post("/api/chat", json=body).text, with_ids=True)[:5]
+
+    last_id = seen[-1][0]
+    res = client.get(f"/api/sessions/{sid}/events", headers={"Last-Event-ID": str(last_id)})
+    resumed = parse_sse(res.text, with_ids=True)
+
+    assert resumed[0][0] == last_id + 1
+    assert resumed[-1][1] == "done"
+    text = "".join(p["content"] for _, name, p in seen + resumed if name == "message")
+    assert text == "".join(f"word{i} " for i in range(40))
+    assert fake.calls == 1
+
+
+def test_resume_unknown_session_404(client):
+    assert client.get("/api/sessions/nope/events").status_code == 404
+
+
+# ---------------------------------------------------------------------------
+# Runs and extra subscribers
+# ---------------------------------------------------------------------------
+
+def test_chat_reports_run_id_and_status(client):
+    sid = client.post("/api/sessions").json()["session_id"]
+    res = client.post("/api/chat", json={"session_id": sid, "message": "hi"})
+    run_id = res.headers["x-run-id"]
+
+    status = client.get(f"/api/sessions/{sid}/run").json()
+    assert status["run_id"] == run_id
+    assert status["status"] == "complete"
+    assert status["last_event_id"] == parse_sse(res.text, with_ids=True)[-1][0]
+
+
+def test_second_viewer_shares_the_run(client, fake):
+    sid = client.post("/api/sessions").json()["session_id"]
+    res = client.post("/api/chat", json={"session_id": sid, "message": "hi"})
+    run_id = res.headers["x-run-id"]
+
+    viewer = client.get(f"/api/runs/{run_id}/events")
+    assert parse_sse(viewer.text, with_ids=True) == parse_sse(res.text, with_ids=True)
+    assert fake.calls == 1
+
+
+def test_run_events_stop_at_the_end_of_the_run(client):
+    sid = client.post("/api/sessions").json()["session_id"]
+    first = client.post("/api/chat", json={"session_id": sid, "message": "a"})
+    client.post("/api/chat", json={"session_id": sid, "message": "b"})
+
+    # The first run was replaced by the second, the second is still readable
+    assert client.get(f"/api/runs/{first.headers['x-run-id']}/events").status_code == 404
+    latest = client.get(f"/api/sessions/{sid}/run").json()
+    events = parse_sse(client.get(f"/api/runs/{latest['run_id']}/events").text, with_ids=True)
+    assert events[0][0] == latest["start_event_id"] + 1
+    assert [e[1] for e in events].count("done") == 1
+
+
+def test_run_unknown_404(client):
+    assert client.get("/api/runs/nope/events").status_code == 404
+    sid = client.post("/api/sessions").json()["session_id"]
+    assert client.get(f"/api/sessions/{sid}/run").status_code == 404
+
+
+# ---------------------------------------------------------------------------
+# Admission control
+# ---------------------------------------------------------------------------
+
+def test_chat_rejects_with_retry_after_when_session_queue_full(client, monkeypatch):
+    monkeypatch.setattr(main, "admission", main.AdmissionController(session_queue=0))
+    sid = client.post("/api/sessions").json()["session_id"]
+    main.admission.reserve(sid)  # a turn already in flight for this session
+
+    res = client.post("/api/chat", json={"session_id": sid, "message": "hi"})
+    assert res.status_code == 429
+    assert int(res.headers["retry-after"]) >= 1
+    assert main.session_mgr.get_session(sid).messages == []
+
+
+def test_message_joins_the_session_only_once_admitted(client, fake, monkeypatch):
+    monkeypatch.setattr(main, "admission", main.AdmissionController(limit=1, max_wait=0.05))
+    fake.delay = 0.01
+    busy, queued = (client.post("/api/sessions").json()["session_id"] for _ in range(2))
+
+    with ThreadPoolExecutor(1) as pool:
+        running = pool.submit(client.post, "/api/chat", json={"session_id": busy, "message": "first"})
+        time.sleep(0.05)
+        res = client.post("/api/chat", json={"session_id": queued, "message": "second"})
+        running.result()
+
+    assert parse_sse(res.text)[-1] == ("done", {"status": "rejected"})
+    assert main.session_mgr.get_session(queued).messages == []
+    assert [m["role"] for m in main.session_mgr.get_session(busy).messages] == ["user", "assistant"]
+
+
+def test_metrics_reports_admission_gauges(client):
+    _chat(client)
+    stats = client.get("/api/metrics").json()["admission"]
+    assert stats["admitted"] == 1
+    assert stats["running"] == 0 and stats["waiting"] == 0
+    assert set(stats["wait_ms"]) == {"last", "avg", "p95", "max"}
+
+
+# ---------------------------------------------------------------------------
+# Cold start
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("module", ["main", "cli"])
+def test_import_does_not_load_llm_stack(module):
+    heavy = ("deepagents", "langgraph", "langchain", "anthropic", "tavily", "langfuse")
+    code = f"import sys, {module}; print(' '.join(m for m in {heavy!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).parent.parent,
+                         check=True, capture_output=True, text=True).stdout
+    assert out.split() == []
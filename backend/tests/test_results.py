@@ -3,8 +3,13 @@
 Tests that:
 - A full multi-turn conversation produces a substantive final report
 - SessionManager correctly tracks messages per session
+- Every session change bumps its version; views project requested fields
 - Sessions are isolated from each other
 - Specialists can return structured Pydantic output with required fields
+- Specialist results are cached by context + agent definition, with LRU/TTL
+  eviction in memory and on disk, and answer the orchestrator's task calls
+- Near-duplicate contexts reuse a prior analysis, flagged with its similarity;
+  ledger dispatches are matched on the founder's words, not the ledger's prompts
 """
 
 import uuid
@@ -14,7 +19,12 @@ from pydantic import BaseModel, Field
 from deepagents import create_deep_agent
 from langgraph.checkpoint.memory import MemorySaver
 
+from agents.ledger import dispatch_context, expand_description
+from agents.neardup import NearDuplicateIndex, shingles, signature, similarity
+from agents.resultcache import DiskCache, MemoryCache, cache_key, lookup, remember, task_cache_middleware
+from agents.specialist import build_subagent_defs
 from sessions.manager import SessionManager
+from sessions.views import parse_fields, project
 from tests.conftest import invoke_agent, stream_events, tool_names_used
 
 
@@ -155,6 +165,22 @@ def test_session_stores_agent_results():
     assert session.agent_results["market"] == market_result
     assert session.agent_results["risks"] == risks_result
     assert len(session.agent_results) == 2
+    assert session.version == 2
+
+
+def test_session_view_projection():
+    """project() keeps only the requested dotted paths and skips missing ones."""
+    doc = {"version": 3, "agent_results": {"market": {"score": 80, "widgets": {"a": 1}}}}
+
+    assert project(doc, parse_fields("")) == doc
+    assert project(doc, parse_fields("agent_results.market.widgets, agent_results.gtm")) == {
+        "agent_results": {"market": {"widgets": {"a": 1}}}
+    }
+    # A covering path wins and the source document is never written to.
+    assert project(doc, parse_fields("agent_results.market.score,agent_results")) == {
+        "agent_results": doc["agent_results"]
+    }
+    assert doc["agent_results"]["market"] == {"score": 80, "widgets": {"a": 1}}
 
 
 # ---------------------------------------------------------------------------
@@ -268,3 +294,193 @@ def test_full_pipeline_with_session(fresh_orchestrator):
     # Final response should be substantive
     final = session.messages[3]["content"]
     assert len(final) > 200, f"Final report too short: {len(final)} chars"
+
+
+# ---------------------------------------------------------------------------
+# Test 8: Specialist result cache
+# ---------------------------------------------------------------------------
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_result_cache_key_covers_context_and_agent_definition():
+    market = next(d for d in build_subagent_defs() if d["name"] == "market")
+    key = cache_key(market, "A tool for  solo founders\n")
+
+    assert cache_key(market, " A tool for solo founders") == key  # whitespace-normalized
+    assert cache_key(market, "A tool for solo designers") != key
+    assert cache_key({**market, "system_prompt": market["system_prompt"] + "!"}, "A tool for solo founders") != key
+    assert cache_key({**market, "model": "claude-sonnet-4-5"}, "A tool for solo founders") != key
+    assert cache_key({**market, "tools": []}, "A tool for solo founders") != key
+
+
+@pytest.mark.parametrize("backend", ["memory", "disk"])
+def test_result_cache_lru_and_ttl(backend, tmp_path):
+    clock = _Clock()
+    if backend == "memory":
+        cache = MemoryCache(max_entries=2, ttl=60, clock=clock)
+    else:
+        cache = DiskCache(tmp_path, max_entries=2, ttl=60, clock=clock)
+
+    cache.set("a", "A")
+    clock.now += 1
+    cache.set("b", "B")
+    clock.now += 1
+    assert cache.get("a") == "A"  # a is now the most recently used
+    clock.now += 1
+    cache.set("c", "C")
+    assert cache.get("b") is None  # least recently used, evicted
+    assert (cache.get("a"), cache.get("c")) == ("A", "C")
+
+    clock.now += 61
+    assert cache.get("a") is None
+    info = cache.info()
+    assert info["backend"] == backend
+    assert (info["hits"], info["misses"], info["evictions"], info["expired"]) == (3, 2, 1, 1)
+
+
+def test_disk_cache_is_shared_and_size_bounded(tmp_path):
+    DiskCache(tmp_path).set("k", "result")
+    assert DiskCache(tmp_path).get("k") == "result"
+
+    small = DiskCache(tmp_path, max_bytes=200)
+    small.set("big", "x" * 500)
+    assert small.get("big") is None and len(small) == 0
+
+
+def test_task_middleware_serves_hits_and_stores_misses():
+    from langchain.agents.middleware.types import ToolCallRequest
+    from langchain_core.messages import ToolMessage
+    from langgraph.types import Command
+
+    cache = MemoryCache()
+    middleware = task_cache_middleware(build_subagent_defs(), cache)
+    runs = []
+
+    def handler(request):
+        runs.append(request.tool_call["args"]["description"])
+        msg = ToolMessage('{"summary": "ok"}', tool_call_id=request.tool_call["id"])
+        return Command(update={"messages": [msg]})
+
+    def call(description, config=None):
+        tool_call = {"name": "task", "id": "call_1", "args": {"subagent_type": "market", "description": description}}
+        runtime = type("Runtime", (), {"config": config or {}})()
+        return middleware.wrap_tool_call(ToolCallRequest(tool_call, None, {}, runtime), handler)
+
+    call("Size the market for X")
+    hit = call("Size the market  for X")
+    assert runs == ["Size the market for X"]
+    assert isinstance(hit, ToolMessage) and hit.content == '{"summary": "ok"}' and hit.tool_call_id == "call_1"
+
+    call("Size the market for X", {"configurable": {"result_cache": False}})
+    assert len(runs) == 2
+    assert cache.info()["hits"] == 1
+
+
+# ---------------------------------------------------------------------------
+# Test 9: Near-duplicate reuse
+# ---------------------------------------------------------------------------
+
+IDEA = (
+    "An AI tool that helps solo founders write cold outreach emails. "
+    "Target: pre-seed B2B SaaS founders in the US with no sales team."
+)
+REWORDED = (
+    "An AI-powered tool that helps solo founders write cold outreach emails! "
+    "Target: pre-seed B2B SaaS founders in the US with no sales team."
+)
+OTHER = "A marketplace connecting freelance designers with DTC brands doing $1-10M on Shopify."
+
+
+def test_minhash_estimates_jaccard_similarity():
+    a, b = shingles(IDEA), shingles(REWORDED)
+    jaccard = len(a & b) / len(a | b)
+    assert abs(similarity(signature(IDEA), signature(REWORDED)) - jaccard) < 0.1
+    assert similarity(signature(IDEA), signature(OTHER)) < 0.2
+    assert signature(IDEA) == signature(IDEA.upper())  # case/punctuation-insensitive
+
+
+def test_near_duplicate_index_matches_within_scope_and_caps_size():
+    index = NearDuplicateIndex(threshold=0.8, max_entries=2)
+    index.add("market", IDEA, "k1")
+    index.add("market", OTHER, "k2")
+
+    assert [m.key for m in index.query("market", REWORDED)] == ["k1"]
+    assert index.query("customer", REWORDED) == []
+    assert index.query("market", "Something else entirely, a fintech app for teens") == []
+
+    index.add("market", "A third idea about solar panels for farms", "k3")  # evicts k1, the oldest
+    assert index.query("market", REWORDED) == []
+    index.discard("market", "k2")
+    assert len(index) == 1
+
+
+def test_lookup_reuses_near_duplicate_analysis():
+    market = next(d for d in build_subagent_defs() if d["name"] == "market")
+    cache, index = MemoryCache(), NearDuplicateIndex(threshold=0.8)
+    key, hit = lookup(market, IDEA, cache, index)
+    assert hit is None
+    remember(market, IDEA, key, '{"summary": "prior"}', cache, index)
+
+    exact_key, exact = lookup(market, IDEA, cache, index)
+    assert exact_key == key and not exact.reused
+
+    new_key, near = lookup(market, REWORDED, cache, index)
+    assert new_key != key
+    assert near.text == '{"summary": "prior"}' and near.reused and 0.8 <= near.similarity < 1
+
+    # Another agent, or an edited definition, never reuses it
+    risks = next(d for d in build_subagent_defs() if d["name"] == "risks")
+    assert lookup(risks, REWORDED, cache, index)[1] is None
+    assert lookup({**market, "system_prompt": "v2"}, REWORDED, cache, index)[1] is None
+
+
+def _interview(*answers: str) -> list:
+    """Founder messages, each followed by its ``record_answers`` call."""
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    ids = ["idea_core", "target_customer", "revenue_model"]
+    messages = []
+    for i, answer in enumerate(answers):
+        call = {"name": "record_answers", "args": {"question_ids": ids[:i + 1]}, "id": f"call_r{i}"}
+        messages += [HumanMessage(answer), AIMessage("", tool_calls=[call])]
+    return messages
+
+
+def test_ledger_dispatches_of_distinct_short_ideas_do_not_match():
+    """The rendered ledger is mostly the same headings and question prompts;
+    two unrelated ideas with short answers must not be near-duplicates."""
+    from langchain.agents.middleware.types import ToolCallRequest
+    from langchain_core.messages import ToolMessage
+    from langgraph.types import Command
+
+    dogs = _interview("Dog walking app.", "Busy pet owners.", "Per walk fee.")
+    taxes = _interview("Tax filing bot.", "Gig workers.", "Monthly plan.")
+    assert dispatch_context(expand_description("Size the market.", dogs), dogs) == (
+        "Size the market.\n\nDog walking app.\n\nBusy pet owners.\n\nPer walk fee."
+    )
+
+    # With a margin below the default 0.9: the rendered ledgers estimate ~0.88.
+    cache, index = MemoryCache(), NearDuplicateIndex(threshold=0.8)
+    middleware = task_cache_middleware(build_subagent_defs(), cache, index, context=dispatch_context)
+    runs = []
+
+    def handler(request):
+        runs.append(request.tool_call["args"]["description"])
+        return Command(update={"messages": [ToolMessage('{"summary": "ok"}', tool_call_id="call_1")]})
+
+    def dispatch(messages):
+        description = expand_description("Size the market.", messages)
+        tool_call = {"name": "task", "id": "call_1", "args": {"subagent_type": "market", "description": description}}
+        runtime = type("Runtime", (), {"config": {}})()
+        return middleware.wrap_tool_call(ToolCallRequest(tool_call, None, {"messages": messages}, runtime), handler)
+
+    dispatch(dogs)
+    assert isinstance(dispatch(taxes), Command) and len(runs) == 2
+    hit = dispatch(dogs)
+    assert isinstance(hit, ToolMessage) and hit.artifact is None and len(runs) == 2
@@ -0,0 +1,799 @@
+"""Area 5: Streaming engine for the SSE chat path.
+
+Tests that:
+- Blocking iterators are bridged onto the event loop in order
+- Worker exceptions surface in the consumer
+- Concurrent blocking streams interleave instead of running back to back
+- Closing the consumer early stops the worker thread
+- Background jobs saturating their pool never hold up an admitted turn
+- Merged streams arrive in completion order and close together
+- The incremental JSON scanner reports watched values as soon as they close
+- Specialist results are extracted from fenced, embedded and truncated text
+- Task dispatches are announced before the description finishes streaming
+- Specialist widgets are reported per agent as soon as each one closes
+- The debug log sink batches writes, honours verbosity, formats token trace on
+  its writer thread and drops trace when behind
+- Message coalescing merges token frames and flushes on window, size and events
+- The replay log assigns increasing ids and resumes after Last-Event-ID
+- A run has one producer and any number of subscribers, and outlives them
+- Background jobs deliver their events with later turns and can be awaited;
+  held jobs keep theirs until released, or are cancelled with them; a job
+  that raises ends with its error item
+- Admission control serializes a session's turns (a queued one cancelled
+  leaves the running one's stream alone), caps concurrent runs (at
+  most one per turn worker) and rejects fast when the queues are full
+"""
+
+import asyncio
+import io
+import json
+import threading
+import time
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from streaming.admission import AdmissionController, Overloaded
+from streaming import bridge
+from streaming.bridge import JOBS, TURNS, iterate_in_thread, merge
+from streaming.coalesce import CoalesceSettings, coalesce_messages, resolve_settings
+from streaming.jobs import SessionJobs
+from streaming.jsonextract import extract_json
+from streaming.jsonscan import JSONScanner
+from streaming.logsink import FULL, OFF, SUMMARY, LogSink, parse_level
+from streaming.replay import EventLog, ReplayStore
+from streaming.runs import RunRegistry
+from streaming.toolcalls import TaskCallTracker
+from streaming.widgets import WidgetStreamer
+
+
+def _slow_range(n: int, delay: float = 0.0):
+    for i in range(n):
+        if delay:
+            time.sleep(delay)
+        yield i
+
+
+async def _collect(aiter) -> list:
+    return [item async for item in aiter]
+
+
+# ---------------------------------------------------------------------------
+# Thread bridge
+# ---------------------------------------------------------------------------
+
+@pytest.mark.asyncio
+async def test_bridge_yields_items_in_order():
+    items = await _collect(iterate_in_thread(_slow_range, 50, maxsize=4))
+    assert items == list(range(50))
+
+
+@pytest.mark.asyncio
+async def test_bridge_propagates_worker_exception():
+    def boom():
+        yield 1
+        raise RuntimeError("provider exploded")
+
+    seen = []
+    with pytest.raises(RuntimeError, match="provider exploded"):
+        async for item in iterate_in_thread(boom):
+            seen.append(item)
+    assert seen == [1]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_streams_interleave():
+    """Four streams of 5 x 50ms blocking waits should finish in ~one stream's
+    time, and the event loop should stay responsive while they run."""
+    order: list[int] = []
+    lags: list[float] = []
+
+    async def consume(idx: int):
+        async for _ in iterate_in_thread(_slow_range, 5, 0.05):
+            order.append(idx)
+
+    async def ticker():
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - t0 - 0.01)
+
+    tick = asyncio.create_task(ticker())
+    t0 = time.perf_counter()
+    await asyncio.gather(*(consume(i) for i in range(4)))
+    elapsed = time.perf_counter() - t0
+    tick.cancel()
+
+    assert elapsed < 0.25 * 2, f"streams ran serially ({elapsed:.2f}s)"
+    # Interleaved: the first four items come from four different sessions
+    assert len(set(order[:4])) > 1, f"no interleaving: {order}"
+    assert max(lags) < 0.05, f"event loop stalled for {max(lags):.3f}s"
+
+
+@pytest.mark.asyncio
+async def test_busy_job_pool_does_not_hold_up_turns(monkeypatch):
+    monkeypatch.setattr(bridge, "_POOL_SIZES", {TURNS: 1, JOBS: 1})
+    monkeypatch.setattr(bridge, "_executors", {})
+    release = threading.Event()
+
+    def blocked():
+        release.wait(2.0)
+        yield "job"
+
+    jobs = [asyncio.ensure_future(_collect(iterate_in_thread(blocked, pool=JOBS))) for _ in range(3)]
+    try:
+        turn = await asyncio.wait_for(_collect(iterate_in_thread(_slow_range, 3)), 1.0)
+        assert turn == [0, 1, 2]
+        assert not any(job.done() for job in jobs)
+    finally:
+        release.set()
+        assert await asyncio.gather(*jobs) == [["job"]] * 3
+        bridge.shutdown_stream_workers()
+
+
+@pytest.mark.asyncio
+async def test_early_close_stops_worker():
+    produced = []
+    finished = threading.Event()
+
+    def endless():
+        try:
+            i = 0
+            while True:
+                produced.append(i)
+                yield i
+                i += 1
+                time.sleep(0.001)
+        finally:
+            finished.set()
+
+    stream = iterate_in_thread(endless, maxsize=2)
+    async for item in stream:
+        if item >= 3:
+            break
+    await stream.aclose()
+
+    assert await asyncio.to_thread(finished.wait, 2.0), "worker generator was not closed"
+    assert len(produced) < 20
+
+
+@pytest.mark.asyncio
+async def test_merge_yields_in_arrival_order():
+    """A fast stream is not held up behind a slow one."""
+    slow = iterate_in_thread(lambda: (("slow", i) for i in _slow_range(3, 0.05)))
+    fast = iterate_in_thread(lambda: (("fast", i) for i in range(3)))
+    items = await _collect(merge(slow, fast))
+
+    assert sorted(items) == sorted([("slow", i) for i in range(3)] + [("fast", i) for i in range(3)])
+    assert [name for name, _ in items[:3]] == ["fast"] * 3
+
+
+@pytest.mark.asyncio
+async def test_merge_error_closes_the_other_streams():
+    finished = threading.Event()
+
+    def endless():
+        try:
+            while True:
+                time.sleep(0.001)
+                yield 0
+        finally:
+            finished.set()
+
+    async def failing():
+        await asyncio.sleep(0.02)
+        yield 1
+        raise RuntimeError("specialist exploded")
+
+    with pytest.raises(RuntimeError, match="specialist exploded"):
+        await _collect(merge(iterate_in_thread(endless, maxsize=2), failing()))
+    assert await asyncio.to_thread(finished.wait, 2.0), "sibling stream was not closed"
+
+
+# ---------------------------------------------------------------------------
+# Incremental JSON scanner
+# ---------------------------------------------------------------------------
+
+def _feed_in_pieces(scanner: JSONScanner, text: str, size: int) -> list:
+    out = []
+    for i in range(0, len(text), size):
+        out.extend(scanner.feed(text[i:i + size]))
+    return out
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 10_000])
+def test_scanner_reports_watched_values(size):
+    doc = {
+        "description": 'Quote " brace { backslash \\ newline\n',
+        "subagent_type": "market",
+        "widgets": {"a": {"vizType": "kpiCard", "items": [1, 2]}, "b": {"vizType": "donut"}},
+        "score": 72,
+    }
+    scanner = JSONScanner(watch=[("subagent_type",), ("widgets", "*"), ("score",)])
+    found = dict(_feed_in_pieces(scanner, "preamble " + json.dumps(doc), size))
+
+    assert scanner.complete
+    assert found[("subagent_type",)] == "market"
+    assert found[("widgets", "a")] == doc["widgets"]["a"]
+    assert found[("widgets", "b")] == doc["widgets"]["b"]
+    assert found[("score",)] == 72
+    assert ("description",) not in found
+
+
+def test_scanner_reports_value_before_document_ends():
+    scanner = JSONScanner(watch=[("subagent_type",)])
+    assert scanner.feed('{"subagent_type": "compet') == []
+    assert scanner.feed('ition", "description": "Long') == [(("subagent_type",), "competition")]
+    assert not scanner.complete
+
+
+def test_scanner_is_linear_on_long_input():
+    """A 200KB value fed one character at a time must not re-parse the buffer."""
+    text = json.dumps({"description": "x" * 200_000, "subagent_type": "gtm"})
+    scanner = JSONScanner(watch=[("subagent_type",)])
+    t0 = time.perf_counter()
+    found = _feed_in_pieces(scanner, text, 1)
+    assert found == [(("subagent_type",), "gtm")]
+    assert time.perf_counter() - t0 < 2.0
+
+
+# ---------------------------------------------------------------------------
+# Specialist result extraction
+# ---------------------------------------------------------------------------
+
+_RESULT = {"summary": "Text with } and { and \\\" inside", "score": 71, "widgets": {"a": {"items": [1, 2]}}}
+
+
+@pytest.mark.parametrize("text,method", [
+    (json.dumps(_RESULT), "direct"),
+    ("Here you go:\n```json\n" + json.dumps(_RESULT) + "\n```\n", "fenced"),
+    ("Shape is {summary, score}.\n" + json.dumps(_RESULT), "embedded"),
+    (json.dumps(_RESULT) + "\n\nFigures in {braces} are estimates.}", "embedded"),
+])
+def test_extract_json_finds_first_balanced_object(text, method):
+    result = extract_json(text)
+    assert result.value == _RESULT
+    assert result.method == method
+
+
+def test_extract_json_closes_truncated_string_and_containers():
+    result = extract_json('{"score": 71, "widgets": {"a": {"items": [1, 2], "note": "Launch in Chic')
+    assert result.method == "repaired"
+    assert result.value == {"score": 71, "widgets": {"a": {"items": [1, 2], "note": "Launch in Chic"}}}
+    assert result.repairs == ("closed string", "closed 3 containers")
+
+
+def test_extract_json_trims_to_last_complete_value():
+    result = extract_json('{"score": 71, "bullets": ["one", "two"], "widgets": {"a": {"value": tr')
+    assert result.method == "repaired"
+    assert result.value == {"score": 71, "bullets": ["one", "two"], "widgets": {"a": {}}}
+    assert result.repairs[0] == "trimmed to last complete value"
+
+
+def test_extract_json_never_returns_an_object_nested_in_a_malformed_one():
+    broken = '{"summary": "Sell to studios" "score": 71, "widgets": {"a": {"vizType": "donut"}}}'
+    assert extract_json(broken).method == "failed"
+    assert extract_json(broken + '\n\nFixed: {"summary": "Sell to studios"}').value == {"summary": "Sell to studios"}
+
+
+def test_extract_json_reports_failure():
+    assert extract_json("No JSON here, only {prose}.").method == "failed"
+    assert not extract_json("").ok
+
+
+# ---------------------------------------------------------------------------
+# Task call tracker
+# ---------------------------------------------------------------------------
+
+def _tool_chunks(tc_id: str, args: str, size: int) -> list[AIMessageChunk]:
+    chunks = [AIMessageChunk(
+        content="",
+        tool_call_chunks=[{"name": "task", "id": tc_id, "args": "", "index": 0}],
+    )]
+    for i in range(0, len(args), size):
+        chunks.append(AIMessageChunk(
+            content="",
+            tool_call_chunks=[{"name": None, "id": None, "args": args[i:i + size], "index": 0}],
+        ))
+    return chunks
+
+
+def test_tracker_starts_agent_before_description_completes():
+    args = json.dumps({"subagent_type": "customer", "description": "Context " * 500})
+    tracker = TaskCallTracker()
+
+    timeline = []
+    for i, chunk in enumerate(_tool_chunks("call_1", args, 5)):
+        for ev in tracker.feed(chunk):
+            timeline.append((i, ev.kind, ev.agent_id))
+
+    (start_i, kind, agent), (done_i, kind2, _) = timeline
+    assert (kind, agent) == ("start", "customer")
+    assert kind2 == "dispatched"
+    assert start_i < done_i / 10, "agent_start should fire long before the args finish"
+    assert tracker.agent_for("call_1") == "customer"
+
+
+def test_tracker_handles_description_first():
+    args = json.dumps({"description": "Analyze this idea", "subagent_type": "risks"})
+    tracker = TaskCallTracker()
+    events = [ev for chunk in _tool_chunks("call_2", args, 4) for ev in tracker.feed(chunk)]
+
+    assert [e.kind for e in events] == ["start", "dispatched"]
+    assert events[1].description == "Analyze this idea"
+
+
+# ---------------------------------------------------------------------------
+# Widget streamer
+# ---------------------------------------------------------------------------
+
+def test_widget_streamer_reports_each_agent_as_it_writes():
+    streamer = WidgetStreamer(["market", "gtm"])
+    market = json.dumps({"summary": "M", "score": 70, "widgets": {"a": {"v": 1}, "b": {"v": 2}}})
+    gtm = json.dumps({"summary": "G", "score": 60, "widgets": {"t": {"v": 3}}})
+
+    events = []
+    for i in range(0, max(len(market), len(gtm)), 5):
+        events += streamer.feed("market", "run-1", market[i:i + 5])
+        events += streamer.feed("gtm", "run-2", gtm[i:i + 5])
+
+    by_agent = {}
+    for ev in events:
+        by_agent.setdefault(ev.agent_id, []).append((ev.kind, ev.key, ev.payload))
+    assert by_agent["market"] == [
+        ("summary", "", {"summary": "M", "score": 70, "scoreLabel": None}),
+        ("widget", "a", {"v": 1}),
+        ("widget", "b", {"v": 2}),
+    ]
+    assert by_agent["gtm"][1:] == [("widget", "t", {"v": 3})]
+
+
+def test_widget_streamer_ignores_unknown_agents_and_repeats():
+    streamer = WidgetStreamer(["market"])
+    assert streamer.agent_for({"lc_agent_name": "general-purpose"}) == ""
+    assert streamer.agent_for({"lc_agent_name": "market"}) == "market"
+
+    doc = json.dumps({"widgets": {"a": {"v": 1}}})
+    assert len(streamer.feed("market", "run-1", doc)) == 1
+    assert streamer.feed("market", "run-2", doc) == []
+    streamer.finish("market")
+    assert len(streamer.feed("market", "run-3", doc)) == 1
+
+
+# ---------------------------------------------------------------------------
+# Debug log sink
+# ---------------------------------------------------------------------------
+
+class _SlowStream(io.StringIO):
+    def __init__(self, delay: float = 0.0):
+        super().__init__()
+        self.delay = delay
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        time.sleep(self.delay)
+        return super().write(text)
+
+
+def test_parse_level():
+    assert parse_level("off") == OFF
+    assert parse_level("Summary") == SUMMARY
+    assert parse_level(None) == FULL
+    assert parse_level("bogus", default=SUMMARY) == SUMMARY
+
+
+def test_sink_batches_writes():
+    stream = _SlowStream()
+    sink = LogSink(level=FULL, flush_interval=0.02, stream=stream)
+    for i in range(1000):
+        sink.emit(f"tok{i} ", FULL)
+    sink.close()
+
+    text = stream.getvalue()
+    assert text.startswith("tok0 ") and text.endswith("tok999 ")
+    assert stream.writes < 20, f"expected batched writes, got {stream.writes}"
+
+
+def test_sink_respects_level():
+    stream = _SlowStream()
+    sink = LogSink(level=SUMMARY, flush_interval=0.0, stream=stream)
+    sink.emit("header\n", SUMMARY)
+    sink.emit("token", FULL)
+    sink.close()
+    assert stream.getvalue() == "header\n"
+
+    off = LogSink(level=OFF, stream=stream)
+    off.emit("anything\n", SUMMARY)
+    off.close()
+    assert off.records == 0
+
+
+def test_sink_prefixes_trace_lines_on_the_writer_thread():
+    stream = _SlowStream()
+    sink = LogSink(level=FULL, flush_interval=0.01, stream=stream)
+    sink.emit("header\n", SUMMARY)
+    for token in ["Market", " is", " large.\nGrowing", " fast", "\n"]:
+        sink.trace("> ", token)
+    sink.emit("footer\n", SUMMARY)
+    sink.trace("> ", "next")
+    sink.close()
+    assert stream.getvalue() == "header\n> Market is large.\n> Growing fast\nfooter\n> next"
+
+
+def test_sink_drops_trace_but_keeps_summary_when_behind():
+    stream = _SlowStream(delay=0.05)
+    sink = LogSink(level=FULL, max_pending=10, flush_interval=0.0, stream=stream)
+    for i in range(500):
+        sink.emit("t", FULL)
+    sink.emit("RESULT\n", SUMMARY)
+    sink.close()
+
+    assert sink.dropped > 0
+    assert "RESULT" in stream.getvalue()
+    assert "dropped" in stream.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# Message coalescing
+# ---------------------------------------------------------------------------
+
+async def _events(items, delay: float = 0.0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+def _msg(text: str, node: str = "model"):
+    return "message", {"content": text, "node": node}
+
+
+@pytest.mark.asyncio
+async def test_coalesce_merges_and_flushes_on_events():
+    items = [
+        _msg("Hel"), _msg("lo"),
+        ("agent_start", {"agentId": "market"}),
+        _msg(" wor"), _msg("ld"),
+        ("done", {"status": "complete"}),
+    ]
+    out = await _collect(coalesce_messages(_events(items), CoalesceSettings(window_ms=1000)))
+    assert out == [
+        _msg("Hello"),
+        ("agent_start", {"agentId": "market"}),
+        _msg(" world"),
+        ("done", {"status": "complete"}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_splits_on_node_change():
+    items = [_msg("a"), _msg("b"), _msg("x", node="tools"), _msg("c")]
+    out = await _collect(coalesce_messages(_events(items), CoalesceSettings(window_ms=1000)))
+    assert out == [_msg("ab"), _msg("x", node="tools"), _msg("c")]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_flushes_on_byte_threshold():
+    items = [_msg("x" * 10) for _ in range(10)]
+    out = await _collect(coalesce_messages(_events(items), CoalesceSettings(max_bytes=25)))
+    assert [len(p["content"]) for _, p in out] == [30, 30, 30, 10]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_flushes_on_window_while_idle():
+    """A buffered fragment must go out after the window even if nothing else arrives."""
+
+    async def slow():
+        yield _msg("first")
+        await asyncio.sleep(0.3)
+        yield _msg("second")
+
+    stream = coalesce_messages(slow(), CoalesceSettings(window_ms=20))
+    t0 = time.perf_counter()
+    first = await stream.__anext__()
+    assert first == _msg("first")
+    assert time.perf_counter() - t0 < 0.2
+    assert await _collect(stream) == [_msg("second")]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_disabled_passes_through():
+    items = [_msg("a"), _msg("b")]
+    out = await _collect(coalesce_messages(_events(items), CoalesceSettings()))
+    assert out == items
+
+
+def test_resolve_settings_clamps_overrides():
+    assert resolve_settings(0, 0) == CoalesceSettings(0, 0)
+    assert resolve_settings(10_000, -5).window_ms == 1000
+    assert resolve_settings(10_000, -5).max_bytes == 0
+
+
+# ---------------------------------------------------------------------------
+# Replay log
+# ---------------------------------------------------------------------------
+
+def test_event_log_ids_increase_across_turns():
+    log = EventLog(maxlen=10)
+    first = [log.append("message", {"i": i}).id for i in range(3)]
+    second = [log.append("message", {"i": i}).id for i in range(3)]
+    assert first + second == [1, 2, 3, 4, 5, 6]
+
+    events, gap = log.since(4)
+    assert [e.id for e in events] == [5, 6]
+    assert not gap
+
+
+def test_event_log_reports_evicted_gap():
+    log = EventLog(maxlen=3)
+    for i in range(6):
+        log.append("message", {"i": i})
+    events, gap = log.since(1)
+    assert gap
+    assert [e.id for e in events] == [4, 5, 6]
+
+
+@pytest.mark.asyncio
+async def test_subscribe_replays_then_follows_live_turn():
+    log = EventLog()
+    start = log.begin()
+    log.append("message", {"content": "a"})
+    log.append("message", {"content": "b"})
+
+    async def finish_turn():
+        await asyncio.sleep(0.02)
+        log.append("done", {"status": "complete"})
+        log.end()
+
+    producer = asyncio.create_task(finish_turn())
+    resumed = await _collect(log.subscribe(start + 1))
+    await producer
+
+    assert [(e.id, e.name) for e in resumed] == [(2, "message"), (3, "done")]
+
+
+@pytest.mark.asyncio
+async def test_subscribe_ends_when_idle_and_caught_up():
+    log = EventLog()
+    log.append("done", {})
+    assert [e.name for e in await _collect(log.subscribe(0))] == ["done"]
+    assert await _collect(log.subscribe(1)) == []
+
+
+# ---------------------------------------------------------------------------
+# Run registry
+# ---------------------------------------------------------------------------
+
+async def _slow_turn(n: int, produced: list[int], fail: bool = False):
+    for i in range(n):
+        await asyncio.sleep(0.005)
+        produced.append(i)
+        yield "message", {"content": str(i)}
+    if fail:
+        raise RuntimeError("provider down")
+    yield "done", {"status": "complete"}
+
+
+@pytest.mark.asyncio
+async def test_run_fans_out_to_every_subscriber():
+    registry = RunRegistry(ReplayStore())
+    produced: list[int] = []
+    run = registry.start("s1", _slow_turn(10, produced))
+
+    early = asyncio.create_task(_collect(run.events()))
+    await asyncio.sleep(0.02)
+    late = asyncio.create_task(_collect(run.events()))
+    first, second = await asyncio.gather(early, late)
+
+    assert produced == list(range(10))
+    assert [e.id for e in first] == [e.id for e in second]
+    assert first[-1].name == "done"
+    assert run.status == "complete" and run.subscribers == 0
+
+
+@pytest.mark.asyncio
+async def test_run_survives_subscriber_leaving():
+    registry = RunRegistry(ReplayStore())
+    produced: list[int] = []
+    run = registry.start("s1", _slow_turn(6, produced))
+
+    async for _ in run.events():
+        break
+    await run.task
+
+    assert produced == list(range(6))
+    assert [e.name for e in await _collect(run.events())][-1] == "done"
+
+
+@pytest.mark.asyncio
+async def test_run_error_is_recorded_and_streamed():
+    registry = RunRegistry(ReplayStore())
+    errors = []
+    run = registry.start("s1", _slow_turn(2, [], fail=True), on_error=lambda r, e: errors.append(e))
+    events = await _collect(run.events())
+
+    assert [e.name for e in events][-2:] == ["error", "done"]
+    assert run.status == "error" and run.error == "provider down"
+    assert len(errors) == 1
+
+
+# ---------------------------------------------------------------------------
+# Background jobs
+# ---------------------------------------------------------------------------
+
+async def _job(name: str, n: int, delay: float):
+    for i in range(n):
+        await asyncio.sleep(delay)
+        yield name, {"i": i}
+
+
+@pytest.mark.asyncio
+async def test_jobs_interleave_with_a_turn_and_queue_the_rest():
+    jobs = SessionJobs()
+    jobs.start("fast", _job("fast", 2, 0.001))
+    jobs.start("slow", _job("slow", 3, 0.2))
+
+    turn = await _collect(jobs.alongside(_job("message", 3, 0.01)))
+    assert [p["i"] for n, p in turn if n == "message"] == [0, 1, 2]
+    assert [n for n, _ in turn].count("fast") == 2
+    assert "slow" not in [n for n, _ in turn]
+    assert jobs.running == ["slow"]
+
+    rest = await _collect(jobs.until_idle())
+    assert rest == [("slow", {"i": 0}), ("slow", {"i": 1}), ("slow", {"i": 2})]
+    assert jobs.running == [] and jobs.drain() == []
+
+
+@pytest.mark.asyncio
+async def test_jobs_drain_returns_events_from_between_turns():
+    jobs = SessionJobs()
+    jobs.start("a", _job("a", 2, 0))
+    await _collect(jobs.until_idle())
+    assert jobs.drain() == []
+
+    jobs.start("b", _job("b", 2, 0))
+    await asyncio.sleep(0.01)
+    assert jobs.drain() == [("b", {"i": 0}), ("b", {"i": 1})]
+    assert await _collect(jobs.until_idle()) == []
+
+
+@pytest.mark.asyncio
+async def test_held_jobs_deliver_nothing_until_released():
+    jobs = SessionJobs()
+    jobs.start("kept", _job("kept", 3, 0.01), held=True)
+    jobs.start("dropped", _job("dropped", 3, 0.01), held=True)
+    await asyncio.sleep(0.025)
+    assert jobs.drain() == []
+
+    jobs.release("kept")
+    jobs.discard("dropped")
+    assert jobs.running == ["kept"]
+    early = jobs.drain()
+    assert early and {n for n, _ in early} == {"kept"}
+    rest = await _collect(jobs.until_idle())
+    assert [p["i"] for _, p in early + rest] == [0, 1, 2]
+    assert "dropped" not in [n for n, _ in rest]
+
+
+@pytest.mark.asyncio
+async def test_a_failing_job_ends_with_its_error_item():
+    async def failing():
+        yield "job", {"i": 0}
+        raise RuntimeError("config removed")
+
+    jobs = SessionJobs()
+    jobs.start("job", failing(), held=True, on_error=lambda exc: ("job", {"error": str(exc)}))
+    await asyncio.sleep(0.01)
+    jobs.release("job")
+    assert await _collect(jobs.until_idle()) == [("job", {"i": 0}), ("job", {"error": "config removed"})]
+    assert jobs.running == []
+
+
+# ---------------------------------------------------------------------------
+# Admission control
+# ---------------------------------------------------------------------------
+
+class _Gauge:
+    def __init__(self):
+        self.now = 0
+        self.peak = 0
+
+    async def turn(self, label: str, order: list[str]):
+        self.now += 1
+        self.peak = max(self.peak, self.now)
+        order.append(f"{label}:start")
+        await asyncio.sleep(0.01)
+        order.append(f"{label}:end")
+        self.now -= 1
+        yield "done", {"status": "complete"}
+
+
+@pytest.mark.asyncio
+async def test_session_turns_are_serialized():
+    registry = RunRegistry(ReplayStore())
+    admission = AdmissionController(limit=4)
+    gauge, order = _Gauge(), []
+
+    first = registry.start("s1", gauge.turn("a", order), ticket=admission.reserve("s1"))
+    second = registry.start("s1", gauge.turn("b", order), ticket=admission.reserve("s1"))
+    assert second.status == "queued"
+    a_events, b_events = await asyncio.gather(_collect(first.events()), _collect(second.events()))
+
+    assert order == ["a:start", "a:end", "b:start", "b:end"]
+    assert b_events[0].id > a_events[-1].id
+    assert admission.stats()["running"] == 0 and admission.stats()["waiting"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelling_a_queued_turn_leaves_the_session_log_alone():
+    registry = RunRegistry(ReplayStore())
+    admission = AdmissionController(limit=4)
+    produced: list[int] = []
+
+    first = registry.start("s1", _slow_turn(10, produced), ticket=admission.reserve("s1"))
+    second = registry.start("s1", _slow_turn(10, []), ticket=admission.reserve("s1"))
+    await asyncio.sleep(0.01)
+    watcher = asyncio.create_task(_collect(first.log.subscribe(0)))
+    second.task.cancel()
+    await asyncio.gather(second.task, return_exceptions=True)
+
+    assert second.status == "cancelled" and second.start_id is None
+    assert await _collect(second.events()) == []
+    assert first.log.active
+    watched = await watcher
+    assert [e.name for e in watched].count("message") == 10 and watched[-1].name == "done"
+    assert admission.stats()["running"] == 0 and admission.stats()["waiting"] == 0
+
+
+@pytest.mark.asyncio
+async def test_global_limit_caps_concurrent_runs():
+    registry = RunRegistry(ReplayStore())
+    admission = AdmissionController(limit=2, max_waiting=8)
+    gauge, order = _Gauge(), []
+
+    runs = [
+        registry.start(f"s{i}", gauge.turn(str(i), order), ticket=admission.reserve(f"s{i}"))
+        for i in range(6)
+    ]
+    await asyncio.gather(*(run.task for run in runs))
+
+    assert gauge.peak == 2
+    stats = admission.stats()
+    assert stats["admitted"] == 6 and stats["running"] == 0
+    assert stats["wait_ms"]["max"] >= 10
+
+
+def test_global_limit_never_exceeds_the_turn_workers():
+    assert AdmissionController(limit=bridge.STREAM_WORKERS + 8).limit == bridge.STREAM_WORKERS
+
+
+def test_admission_rejects_fast_when_queues_are_full():
+    admission = AdmissionController(limit=1, max_waiting=2, session_queue=1)
+    admission.reserve("a")
+    admission.reserve("a")
+    with pytest.raises(Overloaded):
+        admission.reserve("a")  # one running + one queued for this session
+
+    with pytest.raises(Overloaded) as exc:
+        admission.reserve("b")  # global queue already holds two
+    assert exc.value.retry_after >= 1
+    assert admission.stats()["rejected"] == 2
+
+
+@pytest.mark.asyncio
+async def test_queued_run_times_out_and_releases():
+    admission = AdmissionController(limit=1, max_wait=0.02)
+    holder = admission.reserve("a")
+    await holder.acquire()
+
+    registry = RunRegistry(ReplayStore())
+    run = registry.start("b", _slow_turn(1, []), ticket=admission.reserve("b"))
+    events = await _collect(run.events())
+    holder.release()
+
+    assert run.status == "rejected"
+    assert [e.name for e in events] == ["error", "done"]
+    stats = admission.stats()
+    assert stats["timed_out"] == 1
+    assert (stats["running"], stats["waiting"], stats["sessions_queued"]) == (0, 0, 0)
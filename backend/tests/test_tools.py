@@ -3,6 +3,8 @@
 Tests that:
 - Deep Agents built-in file tools (write_file, read_file, ls) work correctly
 - web_search() returns usable results or a clean fallback when key is absent
+- Provider calls are paced by a shared token bucket, retried on throttling with
+  Retry-After honored, and short-circuited while the provider keeps failing
 - The tool registry validates names and resolves callables correctly
 """
 
@@ -191,6 +193,104 @@ def test_web_search_fallback_message():
             os.environ["TAVILY_API_KEY"] = original
 
 
+class FakeTavily:
+    """Raises ``errors`` in turn, then answers."""
+
+    def __init__(self, *errors: Exception):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def search(self, query, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"query": query, "results": [{"title": "ok"}]}
+
+
+@pytest.fixture
+def tavily_guard(monkeypatch):
+    from agents import tools
+    from agents.providers import CircuitBreaker, ProviderGuard
+
+    guard = ProviderGuard("tavily", rpm=60_000, burst=100, max_retries=2, base=0.001,
+                          breaker=CircuitBreaker(failures=3, reset=60))
+    monkeypatch.setitem(tools.guards, "tavily", guard)
+    return guard
+
+
+def test_web_search_retries_then_degrades_and_short_circuits(tavily_guard, monkeypatch):
+    """Rate-limited searches are retried; once retries run out, or the circuit
+    is open, the search answers with the unavailable fallback instead of failing."""
+    from tavily.errors import BadRequestError, UsageLimitExceededError
+    from agents import tools
+
+    client = FakeTavily(UsageLimitExceededError("slow down"), UsageLimitExceededError("slow down"))
+    monkeypatch.setattr(tools, "_get_tavily_client", lambda: client)
+    assert tools.web_search("ai bookkeeping")["results"] == [{"title": "ok"}]
+    assert client.calls == 3 and tavily_guard.info()["retried"] == 2
+
+    # Each failed search counts once towards the breaker, not once per attempt.
+    client = FakeTavily(*[UsageLimitExceededError("slow down")] * 9)
+    monkeypatch.setattr(tools, "_get_tavily_client", lambda: client)
+    for searches in (1, 2, 3):
+        result = tools.web_search("ai bookkeeping")
+        assert result.startswith("[Web search unavailable — search provider busy") and "ai bookkeeping" in result
+        assert tavily_guard.breaker.state == ("open" if searches == 3 else "closed")
+    assert client.calls == 9 and tavily_guard.info()["failed"] == 3
+
+    client = FakeTavily()
+    monkeypatch.setattr(tools, "_get_tavily_client", lambda: client)
+    assert "circuit open" in tools.web_search("ai bookkeeping")
+    assert client.calls == 0 and tavily_guard.info()["short_circuited"] == 1
+
+    tavily_guard.breaker.success()
+    monkeypatch.setattr(tools, "_get_tavily_client", lambda: FakeTavily(BadRequestError("bad query")))
+    with pytest.raises(BadRequestError):
+        tools.web_search("ai bookkeeping")
+
+
+def test_token_bucket_paces_bursts_and_honors_retry_after():
+    from types import SimpleNamespace
+    from agents.providers import TokenBucket, retry_after, retryable
+
+    now = [0.0]
+    bucket = TokenBucket(rate=1.0, burst=2, clock=lambda: now[0])
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 1.0, 2.0]
+    now[0] = 10.0
+    bucket.hold(5.0)
+    assert bucket.reserve() == 6.0
+
+    def error(status, headers):
+        return SimpleNamespace(status_code=status, response=SimpleNamespace(status_code=status, headers=headers))
+
+    assert retry_after(error(429, {"retry-after": "3"})) == 3.0
+    assert retry_after(error(429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after(error(503, {"retry-after": "Wed, 21 Oct 2026 07:28:00 GMT"}),
+                       now=lambda: 1792567670.0) == 10.0
+    assert retry_after(error(429, {})) is None
+    assert retryable(error(529, {})) and retryable(error(429, {})) and not retryable(error(400, {}))
+    assert retryable(TimeoutError()) and not retryable(ValueError())
+
+
+def test_circuit_breaker_lets_one_probe_through_after_reset():
+    from agents.providers import CircuitBreaker
+
+    now = [0.0]
+    breaker = CircuitBreaker(failures=2, reset=30, clock=lambda: now[0])
+    breaker.failure()
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open" and not breaker.allow()
+    now[0] = 31.0
+    assert breaker.allow() and not breaker.allow()  # one probe at a time
+    breaker.failure()
+    assert breaker.state == "open" and breaker.opened == 2
+    now[0] = 62.0
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
 @pytest.mark.slow
 def test_agent_uses_web_search():
     """A specialist agent given a research prompt should call web_search in its stream."""
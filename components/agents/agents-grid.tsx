@@ -7,7 +7,7 @@ import { getVizColSpan } from "@/lib/viz-layout";
 import { AgentCard } from "./agent-card";
 import { CompactAgentCard } from "./CompactAgentCard";
 import { AgentDetailModal } from "./AgentDetailModal";
-import { Loader2, CheckCircle2 } from "lucide-react";
+import { Loader2, CheckCircle2, Clock } from "lucide-react";
 
 function hasAnyWidgetData(content: AgentContent, widgets: WidgetDef[]): boolean {
   if (!content.vizWidgets) return false;
@@ -43,6 +43,7 @@ export function AgentsGrid({ results }: AgentsGridProps) {
     results.find((r) => r.agentId === agentId);
 
   const doneCount = results.filter((r) => r.status === "done").length;
+  const timedOutCount = results.filter((r) => r.status === "timeout").length;
   const totalCount = AGENTS.length;
 
   return (
@@ -54,7 +55,9 @@ export function AgentsGrid({ results }: AgentsGridProps) {
           <p className="text-sm text-muted-foreground">
             {doneCount === totalCount
               ? "All agents complete — your venture has been analyzed."
-              : `${doneCount}/${totalCount} agents complete…`}
+              : doneCount + timedOutCount === totalCount
+                ? `${doneCount}/${totalCount} agents complete — ${timedOutCount} timed out.`
+                : `${doneCount}/${totalCount} agents complete…`}
           </p>
         </div>
         <div className="text-right">
@@ -108,22 +111,59 @@ export function AgentsGrid({ results }: AgentsGridProps) {
                   </span>
                 </div>
               )}
+              {status === "done" && result?.reused && (
+                <span
+                  className="text-xs text-muted-foreground flex-shrink-0"
+                  title="Reused the analysis of a near-identical earlier idea"
+                >
+                  Reused · {Math.round(result.reused.similarity * 100)}% match
+                </span>
+              )}
               {status === "done" && (
                 <CheckCircle2 className="h-4 w-4 text-emerald-500 flex-shrink-0" />
               )}
+              {status === "timeout" && (
+                <div
+                  className="flex items-center gap-1.5 flex-shrink-0"
+                  title="The report was finished without this analysis"
+                >
+                  <Clock className="h-3.5 w-3.5 text-amber-500" />
+                  <span className="text-xs text-muted-foreground">
+                    Timed out after {result?.timeout?.deadline}s
+                  </span>
+                </div>
+              )}
             </div>
 
-            {/* Widget sub-grid */}
+            {/* Widget sub-grid: streamed widgets fill in as they arrive */}
             {status === "loading" && (
-              <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-3 auto-rows-[220px]">
+              <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-3 auto-rows-[300px]">
                 {widgets.map((w) => {
                   const colSpan = getVizColSpan(w.vizType);
+                  const vizData = content?.vizWidgets?.[w.id];
+                  const widgetContent: AgentContent | null =
+                    content && vizData ? { ...content, vizData } : null;
                   return (
                     <div
                       key={w.id}
-                      className={colSpan === 2 ? "md:col-span-2" : ""}
+                      className={`h-full ${colSpan === 2 ? "md:col-span-2" : ""}`}
                     >
-                      <WidgetSkeleton label={w.label} />
+                      {widgetContent ? (
+                        <CompactAgentCard
+                          agent={agent}
+                          content={widgetContent}
+                          widgetLabel={w.label}
+                          onClick={() =>
+                            setActiveModal({
+                              agent,
+                              content: widgetContent,
+                              widgetLabel: w.label,
+                            })
+                          }
+                        />
+                      ) : (
+                        <WidgetSkeleton label={w.label} />
+                      )}
                     </div>
                   );
                 })}
@@ -6,8 +6,8 @@ import { Textarea } from "@/components/ui/textarea";
 import { Markdown } from "@/components/ui/markdown";
 import { AgentsGrid } from "@/components/agents/agents-grid";
 import { AgentResult, ChatMessage } from "@/lib/agents";
-import { parseAgentResult } from "@/lib/agent-widget-config";
-import { Loader2, Sparkles, RotateCcw, ArrowUp } from "lucide-react";
+import { parseAgentResult, parseWidget } from "@/lib/agent-widget-config";
+import { Loader2, Sparkles, RotateCcw, ArrowUp, FileText } from "lucide-react";
 
 const EXAMPLE_PROMPTS = [
   "An AI tool that helps solo founders write cold outreach emails",
@@ -15,10 +15,18 @@ const EXAMPLE_PROMPTS = [
   "A marketplace connecting freelance designers with DTC brands",
 ];
 
+function reportHref(sessionId: string, idea: string, runId: string | null) {
+  const params = new URLSearchParams({ session: sessionId, q: idea });
+  if (runId) params.set("run", runId);
+  return `/report?${params}`;
+}
+
 export function ResearchInput() {
   const [query, setQuery] = useState("");
   const [phase, setPhase] = useState<"input" | "chat">("input");
   const [sessionId, setSessionId] = useState<string | null>(null);
+  const [idea, setIdea] = useState("");
+  const [runId, setRunId] = useState<string | null>(null);
   const [messages, setMessages] = useState<ChatMessage[]>([]);
   const [streamingText, setStreamingText] = useState("");
   const [agentResults, setAgentResults] = useState<AgentResult[]>([]);
@@ -48,20 +56,14 @@ export function ResearchInput() {
     setStreamingText("");
     setIsStreaming(true);
 
-    try {
-      const res = await fetch("/api/chat", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ session_id: sid, message: text }),
-        signal: controller.signal,
-      });
+    let accumulated = "";
+    let lastEventId = "";
+    let sawDone = false;
 
-      if (!res.ok || !res.body) throw new Error("Stream failed");
-
-      const reader = res.body.getReader();
+    const readStream = async (res: Response) => {
+      const reader = res.body!.getReader();
       const decoder = new TextDecoder();
       let buffer = "";
-      let accumulated = "";
       let currentEvent = "";
 
       while (true) {
@@ -73,6 +75,10 @@ export function ResearchInput() {
         buffer = lines.pop() ?? "";
 
         for (const line of lines) {
+          if (line.startsWith("id: ")) {
+            lastEventId = line.slice(4).trim();
+            continue;
+          }
           if (line.startsWith("event: ")) {
             currentEvent = line.slice(7).trim();
             continue;
@@ -116,6 +122,53 @@ export function ResearchInput() {
                   }
                   break;
                 }
+                case "agent_summary": {
+                  if (data.agentId) {
+                    setAgentResults((prev) =>
+                      prev.map((r) =>
+                        r.agentId === data.agentId
+                          ? {
+                              ...r,
+                              content: {
+                                bullets: [],
+                                ...r.content,
+                                summary: data.summary ?? "",
+                                score: data.score,
+                                scoreLabel: data.scoreLabel ?? undefined,
+                              },
+                            }
+                          : r
+                      )
+                    );
+                  }
+                  break;
+                }
+                case "agent_widget": {
+                  const viz = data.agentId
+                    ? parseWidget(data.agentId, data.key, data.data)
+                    : null;
+                  if (viz) {
+                    setAgentResults((prev) =>
+                      prev.map((r) =>
+                        r.agentId === data.agentId
+                          ? {
+                              ...r,
+                              content: {
+                                summary: "",
+                                bullets: [],
+                                ...r.content,
+                                vizWidgets: {
+                                  ...r.content?.vizWidgets,
+                                  [viz[0]]: viz[1],
+                                },
+                              },
+                            }
+                          : r
+                      )
+                    );
+                  }
+                  break;
+                }
                 case "agent_result": {
                   if (data.agentId) {
                     const rawContent =
@@ -131,6 +184,7 @@ export function ResearchInput() {
                           ? {
                               ...r,
                               status: "done" as const,
+                              reused: data.reused,
                               content: parsed ?? {
                                 summary: rawContent.slice(0, 200),
                                 bullets: [],
@@ -143,7 +197,24 @@ export function ResearchInput() {
                   }
                   break;
                 }
+                case "agent_timeout": {
+                  if (data.agentId) {
+                    setAgentResults((prev) =>
+                      prev.map((r) =>
+                        r.agentId === data.agentId
+                          ? {
+                              ...r,
+                              status: "timeout" as const,
+                              timeout: { deadline: data.deadline },
+                            }
+                          : r
+                      )
+                    );
+                  }
+                  break;
+                }
                 case "done":
+                  sawDone = true;
                   break;
               }
             } catch {
@@ -152,6 +223,50 @@ export function ResearchInput() {
           }
         }
       }
+    };
+
+    const isAbort = (err: unknown) =>
+      err instanceof Error && err.name === "AbortError";
+
+    try {
+      const res = await fetch("/api/chat", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ session_id: sid, message: text }),
+        signal: controller.signal,
+      });
+
+      if (!res.ok || !res.body) throw new Error("Stream failed");
+      const runId = res.headers.get("x-run-id") ?? "";
+      setRunId(runId || null);
+
+      try {
+        await readStream(res);
+      } catch (err) {
+        if (isAbort(err)) throw err;
+      }
+
+      // Connection dropped mid-turn: rejoin from the last event we saw
+      // instead of re-sending the message (which would re-run every agent).
+      // The run's own stream starts at its first event, so a drop before any
+      // event arrived does not replay the session's earlier turns.
+      const resumeUrl = runId
+        ? `/api/runs/${encodeURIComponent(runId)}/events`
+        : `/api/session/${sid}/events`;
+      for (let attempt = 0; !sawDone && attempt < 3; attempt++) {
+        if (!runId && !lastEventId) break;
+        await new Promise((r) => setTimeout(r, 500 * (attempt + 1)));
+        const resumed = await fetch(resumeUrl, {
+          headers: lastEventId ? { "Last-Event-ID": lastEventId } : {},
+          signal: controller.signal,
+        });
+        if (!resumed.ok || !resumed.body) continue;
+        try {
+          await readStream(resumed);
+        } catch (err) {
+          if (isAbort(err)) throw err;
+        }
+      }
 
       if (accumulated) {
         setMessages((prev) => [
@@ -184,6 +299,7 @@ export function ResearchInput() {
 
     if (phase === "input") {
       setPhase("chat");
+      setIdea(text);
       try {
         const sid = await createSession();
         await sendMessage(text, sid);
@@ -207,6 +323,8 @@ export function ResearchInput() {
     setPhase("input");
     setQuery("");
     setSessionId(null);
+    setIdea("");
+    setRunId(null);
     setMessages([]);
     setStreamingText("");
     setAgentResults([]);
@@ -226,10 +344,26 @@ export function ResearchInput() {
               Interactive analysis with AI orchestrator
             </p>
           </div>
-          <Button variant="outline" size="sm" onClick={handleReset}>
-            <RotateCcw className="h-3.5 w-3.5 mr-1.5" />
-            New idea
-          </Button>
+          <div className="flex gap-2">
+            {/* The report views this session: a running turn is followed
+                through its run id, never started again. */}
+            {hasAgents && sessionId && (
+              <Button variant="outline" size="sm" asChild>
+                <a
+                  href={reportHref(sessionId, idea, isStreaming ? runId : null)}
+                  target="_blank"
+                  rel="noreferrer"
+                >
+                  <FileText className="h-3.5 w-3.5 mr-1.5" />
+                  Report
+                </a>
+              </Button>
+            )}
+            <Button variant="outline" size="sm" onClick={handleReset}>
+              <RotateCcw className="h-3.5 w-3.5 mr-1.5" />
+              New idea
+            </Button>
+          </div>
         </div>
 
         {/* Chat messages -- centered column */}
@@ -75,6 +75,24 @@ function extractJson(text: string): Record<string, unknown> | null {
   return null;
 }
 
+/**
+ * Map one entry of an agent's `widgets` object to its widget id and vizData.
+ * Used for whole results and for widgets streamed one at a time.
+ */
+export function parseWidget(
+  agentId: string,
+  dataKey: string,
+  data: unknown
+): [string, VizData] | null {
+  const widget = AGENT_WIDGETS[agentId]?.find((w) => w.dataKey === dataKey);
+  if (!widget || !data || typeof data !== "object") return null;
+  const d = data as Record<string, unknown>;
+  if (!d.vizType) {
+    d.vizType = widget.vizType;
+  }
+  return [widget.id, d as unknown as VizData];
+}
+
 /**
  * Parse an agent's raw JSON result and extract per-widget vizData.
  * Returns an AgentContent with the vizWidgets map populated.
@@ -96,14 +114,8 @@ export function parseAgentResult(agentId: string, rawContent: string): AgentCont
   const widgetsData = (parsed.widgets as Record<string, unknown>) ?? parsed;
 
   for (const widget of widgets) {
-    const data = widgetsData[widget.dataKey];
-    if (data && typeof data === "object") {
-      const d = data as Record<string, unknown>;
-      if (!d.vizType) {
-        d.vizType = widget.vizType;
-      }
-      vizWidgets[widget.id] = d as unknown as VizData;
-    }
+    const viz = parseWidget(agentId, widget.dataKey, widgetsData[widget.dataKey]);
+    if (viz) vizWidgets[viz[0]] = viz[1];
   }
 
   return {
@@ -9,7 +9,7 @@ import {
 } from "lucide-react";
 import type { VizData } from "@/lib/viz-schemas";
 
-export type AgentStatus = "idle" | "loading" | "done" | "error";
+export type AgentStatus = "idle" | "loading" | "done" | "error" | "timeout";
 
 export interface AgentConfig {
   id: string;
@@ -26,6 +26,10 @@ export interface AgentResult {
   status: AgentStatus;
   content?: AgentContent;
   error?: string;
+  /** Set when the analysis of a near-duplicate earlier idea was reused. */
+  reused?: { similarity: number };
+  /** Set when the agent passed its deadline and the report went on without it. */
+  timeout?: { deadline: number };
 }
 
 export interface AgentContent {